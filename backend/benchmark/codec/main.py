@@ -0,0 +1,63 @@
+"""Compare landmark session payload size and decode throughput: JSON vs binary.
+
+    python -m benchmark.codec.main --frames 1800 --repeat 20
+"""
+import argparse
+import gzip
+import json
+import time
+import numpy as np
+from workout.codec.main import encode_session, decode_session
+
+
+def synthetic_session(frames: int, seed: int = 0) -> np.ndarray:
+    """A smooth random walk of 33 landmarks, similar to a real pose track."""
+    rng = np.random.default_rng(seed)
+    start = rng.random((1, 33, 4), dtype=np.float32)
+    steps = rng.normal(0, 0.003, (frames, 33, 4)).astype(np.float32)
+    steps[:, :, 3] = 0
+    return start + np.cumsum(steps, axis=0)
+
+
+def as_mediapipe_json(frames: np.ndarray) -> bytes:
+    """The JSON a client would send today: one {x, y, z, visibility} object per landmark."""
+    return json.dumps([[{"x": float(x), "y": float(y), "z": float(z), "visibility": float(v)} for x, y, z, v in frame]
+                       for frame in frames]).encode("utf-8")
+
+
+def decode_json(payload: bytes) -> np.ndarray:
+    return np.array([[[l["x"], l["y"], l["z"], l["visibility"]] for l in frame] for frame in json.loads(payload)], dtype=np.float32)
+
+
+def timed(func, payload: bytes, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(payload)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=1800, help="frames per session (1800 = 1 minute at 30 fps)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    frames = synthetic_session(args.frames)
+    payloads = {"json": (as_mediapipe_json(frames), decode_json)}
+    for float16 in (False, True):
+        for delta in (False, True):
+            name = f"binary {'f16' if float16 else 'f32'}{' delta' if delta else ''}"
+            payloads[name] = (encode_session(frames, float16=float16, delta=delta), decode_session)
+
+    print(f"{args.frames} frames x 33 landmarks")
+    print(f"{'format':<20}{'bytes':>12}{'gzip bytes':>12}{'decode ms':>12}{'frames/s':>14}{'max error':>12}")
+    for name, (payload, decode) in payloads.items():
+        seconds = timed(decode, payload, args.repeat)
+        decoded = decode(payload)
+        decoded = decoded[0] if isinstance(decoded, tuple) else decoded
+        error = float(np.abs(decoded - frames).max())
+        print(f"{name:<20}{len(payload):>12}{len(gzip.compress(payload)):>12}{seconds * 1000:>12.3f}{args.frames / seconds:>14.0f}{error:>12.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Load-test the API in-process against local Supabase and Groq stand-ins.
+
+    python -m benchmark.load.main --users 100 --concurrency 25 --rounds 5
+    python -m benchmark.load.main --save load.json
+    python -m benchmark.load.main --baseline load.json --tolerance 20
+
+Requests go through httpx's ASGI transport straight into `main.app`, with
+`main.db` replaced by a MemoryDatabase (or, with `--backend sqlite`, a
+SqliteDatabase in a temporary file) and the LLM by FAKE_GROQ_SERVER, each
+answering after the configured latency. Every virtual user registers, logs
+in and personalizes, then runs `--rounds` rounds of profile, recommendation
+and leaderboard reads and a leaderboard update. Per endpoint the run reports
+p50/p95/p99 latency and requests per second.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+PROFILE = {
+    "your_gender": "Female",
+    "weight": 62,
+    "height": 168,
+    "date_of_birth": "1995-04-12",
+    "primary_goal_for_exercising": "Build strength",
+    "how_often_exercised_at_past": "Twice a week",
+    "workout_intensity": "Moderate",
+    "workout_duration": "30 minutes",
+    "what_days_a_week_you_will_workout": "Monday, Wednesday, Friday",
+    "what_time_of_day_you_will_workout": "Morning",
+}
+EXERCISES = ("Pushups", "Squats", "Crunches", "Bicep Curls")
+
+
+class Recorder:
+    """Latency samples and error counts per endpoint name."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def call(self, client, name: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.samples[name].append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+        return response
+
+
+def percentiles(values: list) -> dict:
+    if len(values) < 2:
+        return {"p50": values[0], "p95": values[0], "p99": values[0]}
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+
+async def user_journey(client, recorder: Recorder, index: int, rounds: int):
+    email = f"user{index}@example.com"
+    credentials = {"email": email, "password": f"password-{index}"}
+    await recorder.call(client, "register", "POST", "/api/auth/register", json={**credentials, "username": f"user{index}"})
+    login = await recorder.call(client, "login", "POST", "/api/auth/login", json=credentials)
+    if login.status_code != 200:
+        # Counted as an error by the recorder; the rest of the journey needs a token.
+        return
+    headers = {"Authorization": f"Bearer {login.json()['data']}"}
+    await recorder.call(client, "personalize", "POST", "/api/auth/personalize", json=PROFILE, headers=headers)
+    for round_index in range(rounds):
+        await recorder.call(client, "user profile", "GET", "/api/auth/user/profile", headers=headers)
+        await recorder.call(client, "workout profile", "GET", "/api/auth/user/workout/profile", headers=headers)
+        await recorder.call(client, "recommendation", "GET", "/api/auth/workout/recommendation", headers=headers)
+        await recorder.call(client, "leaderboard", "GET", "/api/auth/leaderboard", headers=headers)
+        await recorder.call(client, "leaderboard top", "GET", "/api/auth/leaderboard?scope=today&limit=10", headers=headers)
+        entry = {"date": "", "exercise": EXERCISES[(index + round_index) % len(EXERCISES)], "score": 1 + index % 5}
+        await recorder.call(client, "leaderboard update", "PATCH", "/api/auth/leaderboard/update", json=entry, headers=headers)
+
+
+async def run(args) -> dict:
+    import httpx
+    import main
+    import tempfile
+    from database.memory.main import MemoryDatabase
+    from database.sqlite.main import SqliteDatabase
+    from config.bot.fake.main import FAKE_GROQ_SERVER
+
+    if args.backend == "sqlite":
+        directory = tempfile.TemporaryDirectory()
+        main.db = SqliteDatabase(os.path.join(directory.name, "load.db"))
+    else:
+        main.db = MemoryDatabase(latency=args.db_latency_ms / 1000)
+    main.groq = main.recommendations.groq = FAKE_GROQ_SERVER(latency=args.llm_latency_ms / 1000)
+    recorder = Recorder()
+    gate = asyncio.Semaphore(args.concurrency)
+
+    async def guarded(client, index):
+        async with gate:
+            await user_journey(client, recorder, index, args.rounds)
+
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(guarded(client, index) for index in range(args.users)))
+            elapsed = time.perf_counter() - start
+
+    endpoints = {}
+    for name, samples in recorder.samples.items():
+        endpoints[name] = {"requests": len(samples), "errors": recorder.errors[name],
+                           "rps": len(samples) / elapsed, **percentiles(samples)}
+    every = [sample for samples in recorder.samples.values() for sample in samples]
+    total = {"requests": len(every), "errors": sum(recorder.errors.values()), "rps": len(every) / elapsed,
+             "seconds": elapsed, **percentiles(every)}
+    config = {key: getattr(args, key) for key in ("users", "concurrency", "rounds", "backend", "db_latency_ms", "llm_latency_ms", "bcrypt_rounds")}
+    return {"config": config, "endpoints": endpoints, "total": total}
+
+
+def report(results: dict):
+    print(f"{'endpoint':<22}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+    for name, row in list(results["endpoints"].items()) + [("total", results["total"])]:
+        print(f"{name:<22}{row['requests']:>10}{row['errors']:>8}{row['p50']:>10.2f}{row['p95']:>10.2f}{row['p99']:>10.2f}{row['rps']:>10.1f}")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Print the change against `baseline`; return endpoints that got slower than `tolerance` percent."""
+    regressions = []
+    print(f"\n{'vs baseline':<22}{'p95':>12}{'req/s':>12}")
+    for name, before in list(baseline["endpoints"].items()) + [("total", baseline["total"])]:
+        after = results["total"] if name == "total" else results["endpoints"].get(name)
+        if after is None:
+            continue
+        p95_change = (after["p95"] / before["p95"] - 1) * 100 if before["p95"] else 0.0
+        rps_change = (after["rps"] / before["rps"] - 1) * 100 if before["rps"] else 0.0
+        print(f"{name:<22}{p95_change:>+11.1f}%{rps_change:>+11.1f}%")
+        if p95_change > tolerance or rps_change < -tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=25, help="virtual users in flight at once")
+    parser.add_argument("--rounds", type=int, default=5, help="read/update rounds per user after sign-up")
+    parser.add_argument("--backend", choices=("memory", "sqlite"), default="memory", help="store behind main.db")
+    parser.add_argument("--db-latency-ms", type=float, default=5.0, help="delay of every memory database call")
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0, help="delay of every LLM completion")
+    parser.add_argument("--bcrypt-rounds", type=int, default=None, help="override PASSWORD_BCRYPT_ROUNDS")
+    parser.add_argument("--save", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON file from an earlier --save to compare against")
+    parser.add_argument("--tolerance", type=float, default=20.0, help="allowed p95 increase or req/s drop, in percent")
+    args = parser.parse_args()
+
+    # Settings are read when `main` is imported, so the environment is set up first.
+    os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+    os.environ.setdefault("JWT_ALGORITHM", "HS256")
+    # Every virtual user comes from the same address, so per-IP limits would only measure the limiter.
+    os.environ.setdefault("LIMIT_AUTH_PER_IP", "")
+    # All users sign up at once; queue them behind the bcrypt cap instead of shedding them.
+    os.environ.setdefault("LIMIT_QUEUE_TIMEOUT", "300")
+    os.environ.setdefault("LIMIT_MAX_WAITING", "100000")
+    if args.bcrypt_rounds is not None:
+        os.environ["PASSWORD_BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+
+    results = asyncio.run(run(args))
+    report(results)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline["config"] != results["config"]:
+            print(f"\nwarning: baseline was run with {baseline['config']}")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"regression over {args.tolerance:.0f}%: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Measure cold import and startup time of the `main:app` entry point.
+
+    python -m benchmark.startup.main --repeat 10
+    python -m benchmark.startup.main --save startup.json
+    python -m benchmark.startup.main --baseline startup.json --tolerance 20
+
+Every sample runs in a fresh interpreter, as a new dyno would. "import" is
+`import main`; "startup" is the lifespan startup with an in-memory database,
+so network round-trips to Supabase are not part of the number.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SAMPLE = """
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+from database.memory.main import MemoryDatabase
+from fastapi.testclient import TestClient
+main.db = MemoryDatabase()
+client = TestClient(main.app)
+started_at = time.perf_counter()
+client.__enter__()
+started = time.perf_counter()
+client.__exit__(None, None, None)
+print(json.dumps({"import_ms": (imported - start) * 1000, "startup_ms": (started - started_at) * 1000}))
+"""
+
+
+def sample() -> dict:
+    output = subprocess.run([sys.executable, "-c", SAMPLE], cwd=BACKEND, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(limit: int) -> list:
+    """Top-level packages by cumulative import time, from `python -X importtime`."""
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND, capture_output=True, text=True, check=True)
+    packages = {}
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line[13:]:
+            continue
+        _, cumulative, name = line[12:].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        package = name.strip().split(".")[0]
+        if package == "main":
+            continue
+        packages[package] = max(packages.get(package, 0), int(cumulative) / 1000)
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+def summarize(samples: list, key: str) -> dict:
+    values = [sample[key] for sample in samples]
+    return {"median": statistics.median(values), "min": min(values), "max": max(values)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest imported packages to list")
+    parser.add_argument("--save", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON file from an earlier --save to compare against")
+    parser.add_argument("--tolerance", type=float, default=20.0, help="allowed slowdown over the baseline median, in percent")
+    args = parser.parse_args()
+
+    samples = [sample() for _ in range(args.repeat)]
+    results = {key: summarize(samples, key) for key in ("import_ms", "startup_ms")}
+    results["slowest_imports_ms"] = dict(slowest_imports(args.top))
+
+    print(f"{'':<12}{'median ms':>12}{'min ms':>12}{'max ms':>12}")
+    for key in ("import_ms", "startup_ms"):
+        print(f"{key[:-3]:<12}{results[key]['median']:>12.1f}{results[key]['min']:>12.1f}{results[key]['max']:>12.1f}")
+    print("\nslowest imports (cumulative ms)")
+    for package, milliseconds in results["slowest_imports_ms"].items():
+        print(f"  {package:<24}{milliseconds:>10.1f}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = []
+        for key in ("import_ms", "startup_ms"):
+            limit = baseline[key]["median"] * (1 + args.tolerance / 100)
+            change = (results[key]["median"] / baseline[key]["median"] - 1) * 100
+            print(f"{key[:-3]}: {results[key]['median']:.1f} ms vs baseline {baseline[key]['median']:.1f} ms ({change:+.1f}%)")
+            if results[key]["median"] > limit:
+                regressions.append(key)
+        if regressions:
+            print(f"regression over {args.tolerance:.0f}%: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+from typing import Optional, Dict
+import jwt
+from jwt import PyJWTError
+from schema.main import TokenData
+from utils.cache.main import TTLCache
+from config.settings.main import settings
+
+
+class AUTH_SERVER:
+
+    jwt_secret = settings.jwt_secret
+    jwt_algorithm = settings.jwt_algorithm
+    access_token_expire_minutes = settings.access_token_expire_minutes
+    token_cache_size = settings.auth_token_cache_size
+    issuer = "techverse"
+
+    def __init__(self):
+        self.token_cache = TTLCache(maxsize=self.token_cache_size)
+
+    def generate_access_token(self, data: Dict, expires_delta: Optional[timedelta] = None):
+        """Sign `data` (must carry `sub`, `email` and `username`) into a JWT."""
+        to_encode = data.copy()
+        now = datetime.utcnow()
+        expire = now + (expires_delta or timedelta(minutes=self.access_token_expire_minutes))
+        to_encode.update({"exp": expire, "sub": data["sub"], "iss": self.issuer, "iat": now, "nbf": now})
+        return jwt.encode(to_encode, self.jwt_secret, algorithm=self.jwt_algorithm, headers={"typ": "JWT", "alg": self.jwt_algorithm})
+
+    def verify_token(self, token: str) -> Optional[TokenData]:
+        """Decode a token into TokenData, or return None when it is invalid.
+
+        Successful decodes are cached by token until the token's `exp`.
+        """
+        token_data = self.token_cache.get(token)
+        if token_data is not None:
+            return token_data
+        try:
+            payload = jwt.decode(token, self.jwt_secret, algorithms=[self.jwt_algorithm])
+        except PyJWTError:
+            return None
+        if payload.get("sub") is None or payload.get("email") is None:
+            return None
+        token_data = TokenData(
+            id=payload["sub"],
+            email=payload["email"],
+            username=payload.get("username"),
+            created_at=payload.get("created_at"),
+            role=payload.get("role"),
+        )
+        self.token_cache.set(token, token_data, expires_at=payload.get("exp"))
+        return token_data
@@ -0,0 +1,42 @@
+import json
+import asyncio
+from utils.metrics.main import instrument, timed
+
+
+class FAKE_GROQ_SERVER:
+    """Local stand-in for GROQ_SERVER with a canned plan and configurable latency."""
+
+    plan = [
+        {"exercise_name": "Bicep Curls", "exercise_reps": "12", "exercise_sets": "3", "duration": "8 minutes", "day": "Monday, Wednesday, Friday"},
+        {"exercise_name": "Pushups", "exercise_reps": "10", "exercise_sets": "3", "duration": "8 minutes", "day": "Monday, Wednesday, Friday"},
+        {"exercise_name": "Squats", "exercise_reps": "15", "exercise_sets": "3", "duration": "8 minutes", "day": "Monday, Wednesday, Friday"},
+        {"exercise_name": "Crunches", "exercise_reps": "15", "exercise_sets": "2", "duration": "6 minutes", "day": "Monday, Wednesday, Friday"},
+    ]
+    # Mirrors GROQ_SERVER's attributes so readiness probes treat the stand-in as configured.
+    groq_api_key = "fake"
+
+    def __init__(self, latency: float = 0.0, first_token_latency: float = 0.0, chunk_size: int = 16, chunk_delay: float = 0.0):
+        self.latency = latency
+        self.first_token_latency = first_token_latency
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.calls = 0
+        self.client = None
+
+    @instrument("llm")
+    async def ask(self, query):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return json.dumps(self.plan)
+
+    async def ask_stream(self, query):
+        self.calls += 1
+        with timed("llm"):
+            await asyncio.sleep(self.first_token_latency)
+        text = json.dumps(self.plan, indent=2)
+        for start in range(0, len(text), self.chunk_size):
+            yield text[start:start + self.chunk_size]
+            await asyncio.sleep(self.chunk_delay)
+
+    async def close(self):
+        pass
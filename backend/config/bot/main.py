@@ -1,32 +1,60 @@
-import os
-from dotenv import load_dotenv
-from groq import Groq
-from groq import GroqError
+from config.settings.main import settings
+from utils.metrics.main import instrument, timed
 
-load_dotenv()
 
 class GROQ_SERVER:
     
-    groq_api_key = os.getenv("APP_LLM_KEY")
+    groq_api_key = settings.app_llm_key
+    model = settings.app_llm_model
+    system_prompt = "you are a knowledgable and experienced fitness coach."
     
     def __init__(self):
-        self.groq = Groq(
-            api_key=self.groq_api_key,
-        )
+        self.client = None
+
+    @property
+    def groq(self):
+        """The AsyncGroq client; the SDK is imported and the client built on first use."""
+        if self.client is None:
+            from groq import AsyncGroq
+            self.client = AsyncGroq(
+                api_key=self.groq_api_key,
+            )
+        return self.client
+    
+    def messages(self, query):
+        return [
+            {
+                "role": "system",
+                "content": self.system_prompt
+            },
+            {
+                "role": "user",
+                "content": query,
+            },
+        ]
     
+    @instrument("llm")
     async def ask(self, query):
-        chat = self.groq.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "you are a knowledgable and experienced fitness coach."
-                },
-                {
-                    "role": "user",
-                    "content": query,
-                },
-            ],
-            model="llama-3.3-70b-versatile",
+        chat = await self.groq.chat.completions.create(
+            messages=self.messages(query),
+            model=self.model,
         )
         
-        return chat.choices[0].message.content
\ No newline at end of file
+        return chat.choices[0].message.content
+    
+    async def ask_stream(self, query):
+        """Yield the completion text in chunks as the model produces it."""
+        with timed("llm"):
+            stream = await self.groq.chat.completions.create(
+                messages=self.messages(query),
+                model=self.model,
+                stream=True,
+            )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    
+    async def close(self):
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
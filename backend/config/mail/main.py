@@ -1,34 +1,183 @@
-from dotenv import load_dotenv
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-import os
+from email.message import EmailMessage
+from email.utils import formataddr
+from typing import Optional, List, Tuple, Dict
+import aiosmtplib
+import asyncio
+import logging
+from config.settings.main import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class MailQueueFull(Exception):
+    """Raised when the outgoing mail queue cannot take more messages."""
 
-load_dotenv()
 
 class MAIL_SERVER:
-    
-    conf = ConnectionConfig(
-        MAIL_USERNAME=os.getenv("MAIL_USER"),
-        MAIL_PASSWORD=os.getenv("MAIL_SECRET"),
-        MAIL_FROM=os.getenv("MAIL_USER"),
-        MAIL_PORT=os.getenv("MAIL_PORT"),
-        MAIL_SERVER=os.getenv("MAIL_HOST"),
-        MAIL_FROM_NAME="Techflow Industry Pvt. Ltd.",
-        MAIL_STARTTLS = True,
-        MAIL_SSL_TLS = False,
-        USE_CREDENTIALS = True,
-        VALIDATE_CERTS = True
-    )
-    
+    """Background mail dispatcher over one persistent SMTP connection.
+
+    `send_mail` only queues the message. A single worker sends queued
+    messages in batches over a connection it keeps open between batches
+    and closes after `idle_seconds` without mail. Failed messages are
+    retried with exponential backoff up to `max_retries` times. Set
+    MAIL_STARTTLS and MAIL_USE_CREDENTIALS to false to deliver to a local
+    stand-in such as aiosmtpd (a dev-only dependency, see requirements-dev.txt).
+    """
+
+    host = settings.mail_host
+    port = settings.mail_port
+    username = settings.mail_user
+    password = settings.mail_secret
+    from_name = "Techflow Industry Pvt. Ltd."
+    starttls = settings.mail_starttls
+    ssl_tls = settings.mail_ssl_tls
+    use_credentials = settings.mail_use_credentials
+    validate_certs = settings.mail_validate_certs
+    timeout = settings.mail_timeout_seconds
+    queue_size = settings.mail_queue_size
+    batch_size = settings.mail_batch_size
+    max_retries = settings.mail_max_retries
+    retry_base_seconds = settings.mail_retry_base_seconds
+    idle_seconds = settings.mail_idle_seconds
+
+    def __init__(self):
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        self.smtp: Optional[aiosmtplib.SMTP] = None
+        # retry task -> the mail it will requeue
+        self.retries: Dict[asyncio.Task, Tuple[str, str, str]] = {}
+        # mails of the batch being sent that are not yet sent or handed to a retry
+        self.inflight: List[Tuple[str, str, str]] = []
+        self.sent = 0
+        self.failed = 0
+
+    def start(self):
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.task = asyncio.create_task(self._run())
+
+    def build_message(self, mail_recepient, mail_subject, mail_body) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = formataddr((self.from_name, self.username))
+        message["To"] = mail_recepient
+        message["Subject"] = mail_subject
+        message.set_content(mail_body, subtype="html")
+        return message
+
     async def send_mail(self, mail_recepient, mail_subject, mail_body):
-        try :
-            message = MessageSchema(
-                subject=mail_subject,
-                recipients=[mail_recepient],
-                body=mail_body,
-                subtype=MessageType.html
-            )
-            fm = FastMail(self.conf)
-            await fm.send_message(message)
-            return True
-        except Exception as e:
-            raise e
\ No newline at end of file
+        """Queue an HTML mail for delivery and return without waiting for SMTP."""
+        if self.task is None:
+            self.start()
+        try:
+            self.queue.put_nowait(((mail_recepient, mail_subject, mail_body), 0))
+        except asyncio.QueueFull:
+            raise MailQueueFull("Too many mails waiting to be sent")
+        return True
+
+    async def _connection(self) -> aiosmtplib.SMTP:
+        if self.smtp is None or not self.smtp.is_connected:
+            credentials = {"username": self.username, "password": self.password} if self.use_credentials else {}
+            self.smtp = aiosmtplib.SMTP(hostname=self.host, port=self.port, timeout=self.timeout, use_tls=self.ssl_tls,
+                                        start_tls=self.starttls and not self.ssl_tls, validate_certs=self.validate_certs,
+                                        **credentials)
+            await self.smtp.connect()
+        return self.smtp
+
+    async def _disconnect(self):
+        if self.smtp is not None and self.smtp.is_connected:
+            try:
+                await self.smtp.quit()
+            except aiosmtplib.SMTPException:
+                self.smtp.close()
+        self.smtp = None
+
+    def _retry(self, mail: Tuple[str, str, str], attempt: int):
+        if attempt >= self.max_retries:
+            self.failed += 1
+            logger.error("Giving up on mail to %s after %d attempts", mail[0], attempt + 1)
+            return
+        delay = self.retry_base_seconds * 2 ** attempt
+        task = asyncio.create_task(self._requeue(mail, attempt + 1, delay))
+        self.retries[task] = mail
+        task.add_done_callback(lambda done: self.retries.pop(done, None))
+
+    async def _requeue(self, mail: Tuple[str, str, str], attempt: int, delay: float):
+        await asyncio.sleep(delay)
+        await self.queue.put((mail, attempt))
+
+    async def _send_batch(self, batch: List[Tuple[Tuple[str, str, str], int]]):
+        self.inflight = [mail for mail, _ in batch]
+        try:
+            await self._send(batch)
+        finally:
+            self.inflight = []
+
+    async def _send(self, batch: List[Tuple[Tuple[str, str, str], int]]):
+        try:
+            smtp = await self._connection()
+        except (aiosmtplib.SMTPException, OSError):
+            logger.exception("Could not connect to the mail server")
+            await self._disconnect()
+            for mail, attempt in batch:
+                self._retry(mail, attempt)
+            self.inflight = []
+            return
+        for mail, attempt in batch:
+            try:
+                await smtp.send_message(self.build_message(*mail))
+                self.sent += 1
+            except (aiosmtplib.SMTPException, OSError):
+                logger.exception("Sending mail to %s failed", mail[0])
+                if not smtp.is_connected:
+                    await self._disconnect()
+                self._retry(mail, attempt)
+            self.inflight.remove(mail)
+
+    async def _run(self):
+        while True:
+            try:
+                first = await asyncio.wait_for(self.queue.get(), self.idle_seconds)
+            except asyncio.TimeoutError:
+                await self._disconnect()
+                continue
+            batch = [first]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self._send_batch(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def drain(self, timeout: float = 10.0):
+        """Send what is queued (waiting at most `timeout` seconds), then stop."""
+        if self.task is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._log_dropped()
+        tasks = [self.task, *self.retries]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.task = None
+        self.retries = {}
+        self.inflight = []
+        await self._disconnect()
+
+    def _log_dropped(self):
+        """Report every mail that stopping now loses: queued, waiting for a retry or mid-send."""
+        queued = []
+        while not self.queue.empty():
+            queued.append(self.queue.get_nowait()[0])
+        waiting = list(self.retries.values())
+        dropped = queued + waiting + self.inflight
+        if not dropped:
+            return
+        self.failed += len(dropped)
+        logger.error("Stopping with %d mails unsent (%d queued, %d waiting to retry, %d in flight)",
+                     len(dropped), len(queued), len(waiting), len(self.inflight))
+        for mail in dropped:
+            logger.error("Dropped mail to %s: %s", mail[0], mail[1])
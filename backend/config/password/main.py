@@ -0,0 +1,56 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from config.settings.main import settings
+from utils.metrics.main import timed
+
+
+class PASSWORD_SERVER:
+    """bcrypt on a thread pool of `workers` threads.
+
+    Admission is left to the limiter's "bcrypt" cost class
+    (LIMIT_BCRYPT_CONCURRENCY), which every caller goes through, so
+    `pending` never exceeds that cap.
+    """
+
+    workers = settings.password_workers
+    bcrypt_rounds = settings.password_bcrypt_rounds
+
+    def __init__(self):
+        self.executor = None
+        self.pending = 0
+
+    async def _run(self, func, *args):
+        if self.executor is None:
+            # bcrypt releases the GIL while hashing, so threads give real parallelism.
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+        self.pending += 1
+        try:
+            with timed("bcrypt"):
+                return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    def _hash(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=self.bcrypt_rounds)).decode("utf-8")
+
+    def _verify(self, password: str, hashed_password: str) -> bool:
+        return bcrypt.checkpw(password.encode("utf-8"), hashed_password.encode("utf-8"))
+
+    async def hash_password(self, password: str) -> str:
+        return await self._run(self._hash, password)
+
+    async def verify_password(self, password: str, hashed_password: str) -> bool:
+        return await self._run(self._verify, password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """True when the stored hash was made with a different cost factor."""
+        try:
+            return int(hashed_password.split("$")[2]) != self.bcrypt_rounds
+        except (IndexError, ValueError):
+            return True
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
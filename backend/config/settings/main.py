@@ -0,0 +1,140 @@
+import os
+from typing import Mapping, Optional
+from dotenv import load_dotenv
+
+
+class Settings:
+    """Every environment setting the backend reads, loaded once.
+
+    Attribute names are the variable names in lower case. Nothing here
+    talks to a service, so a missing or wrong value shows up when the
+    client that needs it is first used (and in /api/check/ready), not as
+    an import error.
+    """
+
+    def __init__(self, environ: Optional[Mapping[str, str]] = None):
+        if environ is None:
+            load_dotenv()
+            environ = os.environ
+        self.environ = environ
+
+        # database/main.py, database/sqlite/main.py
+        self.app_db_backend = self._str("APP_DB_BACKEND", "supabase")
+        self.app_db_sqlite_path = self._str("APP_DB_SQLITE_PATH", "app.db")
+        self.app_db_url = self._str("APP_DB_URL")
+        self.app_db_pass = self._str("APP_DB_PASS")
+        self.app_db_pool_max_connections = self._int("APP_DB_POOL_MAX_CONNECTIONS", 20)
+        self.app_db_pool_max_keepalive = self._int("APP_DB_POOL_MAX_KEEPALIVE", 10)
+        self.app_db_pool_keepalive_expiry = self._float("APP_DB_POOL_KEEPALIVE_EXPIRY", 30)
+        self.app_db_connect_timeout = self._float("APP_DB_CONNECT_TIMEOUT", 5)
+        self.app_db_timeout = self._float("APP_DB_TIMEOUT", 10)
+        self.app_db_pool_timeout = self._float("APP_DB_POOL_TIMEOUT", 5)
+
+        # config/bot/main.py
+        self.app_llm_key = self._str("APP_LLM_KEY")
+        self.app_llm_model = self._str("APP_LLM_MODEL", "llama-3.3-70b-versatile")
+
+        # config/auth/main.py
+        self.jwt_secret = self._str("JWT_SECRET")
+        self.jwt_algorithm = self._str("JWT_ALGORITHM")
+        self.access_token_expire_minutes = self._int("ACCESS_TOKEN_EXPIRE_MINUTES", 15)
+        self.auth_token_cache_size = self._int("AUTH_TOKEN_CACHE_SIZE", 10000)
+
+        # config/password/main.py
+        self.password_workers = self._int("PASSWORD_WORKERS", 4)
+        self.password_bcrypt_rounds = self._int("PASSWORD_BCRYPT_ROUNDS", 12)
+
+        # config/mail/main.py
+        self.mail_host = self._str("MAIL_HOST")
+        self.mail_port = self._int("MAIL_PORT", 587)
+        self.mail_user = self._str("MAIL_USER")
+        self.mail_secret = self._str("MAIL_SECRET")
+        self.mail_starttls = self._bool("MAIL_STARTTLS", True)
+        self.mail_ssl_tls = self._bool("MAIL_SSL_TLS", False)
+        self.mail_use_credentials = self._bool("MAIL_USE_CREDENTIALS", True)
+        self.mail_validate_certs = self._bool("MAIL_VALIDATE_CERTS", True)
+        self.mail_timeout_seconds = self._float("MAIL_TIMEOUT_SECONDS", 30)
+        self.mail_queue_size = self._int("MAIL_QUEUE_SIZE", 1000)
+        self.mail_batch_size = self._int("MAIL_BATCH_SIZE", 20)
+        self.mail_max_retries = self._int("MAIL_MAX_RETRIES", 5)
+        self.mail_retry_base_seconds = self._float("MAIL_RETRY_BASE_SECONDS", 1)
+        self.mail_idle_seconds = self._float("MAIL_IDLE_SECONDS", 60)
+
+        # recommendation/main.py
+        self.recommendation_cache_size = self._int("RECOMMENDATION_CACHE_SIZE", 1024)
+        self.recommendation_cache_ttl = self._float("RECOMMENDATION_CACHE_TTL", 86400)
+
+        # recommendation/worker/main.py
+        self.recommendation_workers = self._int("RECOMMENDATION_WORKERS", 2)
+        self.recommendation_rate_per_minute = self._float("RECOMMENDATION_RATE_PER_MINUTE", 30)
+        self.recommendation_queue_size = self._int("RECOMMENDATION_QUEUE_SIZE", 10000)
+        self.recommendation_scan_seconds = self._float("RECOMMENDATION_SCAN_SECONDS", 3600)
+        self.recommendation_max_retries = self._int("RECOMMENDATION_MAX_RETRIES", 3)
+        self.recommendation_retry_base_seconds = self._float("RECOMMENDATION_RETRY_BASE_SECONDS", 30)
+        # Server processes (uvicorn reads the same variable for --workers); each gets an equal share of the rate.
+        self.web_concurrency = self._int("WEB_CONCURRENCY", 1)
+
+        # utils/cache/main.py RowCache for user-profile and leaderboard rows
+        self.row_cache_size = self._int("ROW_CACHE_SIZE", 10000)
+        self.row_cache_ttl = self._float("ROW_CACHE_TTL", 60)
+
+        # leaderboard/
+        self.app_timezone = self._str("APP_TIMEZONE", "UTC")
+        self.leaderboard_refresh_seconds = self._float("LEADERBOARD_REFRESH_SECONDS", 300)
+        self.leaderboard_period_cache_size = self._int("LEADERBOARD_PERIOD_CACHE_SIZE", 24)
+        self.leaderboard_flush_interval_ms = self._int("LEADERBOARD_FLUSH_INTERVAL_MS", 500)
+        self.leaderboard_flush_max_entries = self._int("LEADERBOARD_FLUSH_MAX_ENTRIES", 500)
+        self.leaderboard_rollover_grace_seconds = self._float("LEADERBOARD_ROLLOVER_GRACE_SECONDS", 5)
+        self.leaderboard_rollover_retry_seconds = self._float("LEADERBOARD_ROLLOVER_RETRY_SECONDS", 60)
+        self.leaderboard_push_interval_ms = self._int("LEADERBOARD_PUSH_INTERVAL_MS", 250)
+        self.leaderboard_push_tick_seconds = self._float("LEADERBOARD_PUSH_TICK_SECONDS", 5)
+        self.leaderboard_push_top = self._int("LEADERBOARD_PUSH_TOP", 50)
+        self.leaderboard_push_queue_size = self._int("LEADERBOARD_PUSH_QUEUE_SIZE", 32)
+        self.leaderboard_push_max_subscribers = self._int("LEADERBOARD_PUSH_MAX_SUBSCRIBERS", 10000)
+        self.leaderboard_push_heartbeat_seconds = self._float("LEADERBOARD_PUSH_HEARTBEAT_SECONDS", 15)
+
+        # workout/
+        self.workout_min_visibility = self._float("WORKOUT_MIN_VISIBILITY", 0)
+        self.workout_max_session_bytes = self._int("WORKOUT_MAX_SESSION_BYTES", 8 * 1024 * 1024)
+        self.workout_session_dir = self._str("WORKOUT_SESSION_DIR", os.path.join("data", "sessions"))
+        self.workout_session_compact_after_days = self._int("WORKOUT_SESSION_COMPACT_AFTER_DAYS", 30)
+
+        # utils/limiter/main.py; rates are "<count>/<second|minute|hour|day>", empty disables
+        self.limiter_redis_url = self._str("LIMITER_REDIS_URL")
+        self.limiter_trust_forwarded = self._bool("LIMITER_TRUST_FORWARDED", False)
+        self.limit_auth_per_ip = self._str("LIMIT_AUTH_PER_IP", "20/minute")
+        self.limit_recommendation_per_user = self._str("LIMIT_RECOMMENDATION_PER_USER", "30/minute")
+        self.limit_bcrypt_concurrency = self._int("LIMIT_BCRYPT_CONCURRENCY", 8)
+        self.limit_llm_concurrency = self._int("LIMIT_LLM_CONCURRENCY", 4)
+        self.limit_queue_timeout = self._float("LIMIT_QUEUE_TIMEOUT", 2)
+        self.limit_max_waiting = self._int("LIMIT_MAX_WAITING", 64)
+
+        # main.py startup and readiness
+        self.startup_warmup_timeout = self._float("STARTUP_WARMUP_TIMEOUT", 5)
+        self.readiness_timeout = self._float("READINESS_TIMEOUT", 2)
+
+        # export/main.py; the admin endpoints (export, /metrics/profile) are disabled while EXPORT_TOKEN is unset
+        self.export_token = self._str("EXPORT_TOKEN")
+        self.export_page_size = self._int("EXPORT_PAGE_SIZE", 1000)
+
+        # utils/metrics/main.py
+        self.metrics_enabled = self._bool("METRICS_ENABLED", True)
+        self.metrics_server_timing = self._bool("METRICS_SERVER_TIMING", False)
+        self.profiler_enabled = self._bool("PROFILER_ENABLED", False)
+        self.profiler_interval_ms = self._float("PROFILER_INTERVAL_MS", 5)
+        self.profiler_max_seconds = self._float("PROFILER_MAX_SECONDS", 60)
+
+    def _str(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self.environ.get(name, default)
+
+    def _int(self, name: str, default: int) -> int:
+        return int(self.environ.get(name, default))
+
+    def _float(self, name: str, default: float) -> float:
+        return float(self.environ.get(name, default))
+
+    def _bool(self, name: str, default: bool) -> bool:
+        return str(self.environ.get(name, default)).lower() in ("1", "true", "yes")
+
+
+settings = Settings()
@@ -1,28 +1,138 @@
-import supabase
-from dotenv import load_dotenv
-from urllib.parse import quote_plus
-import os
+import httpx
+from postgrest import AsyncPostgrestClient
+from typing import Optional, List, Dict, Any
+from config.settings.main import settings
+from utils.metrics.main import instrument
+from database.repository.main import Repository, TableRepository
 
-load_dotenv()
 
-class Database:
-    supabase_url: str = os.getenv("APP_DB_URL")
-    supabase_key: str = os.getenv("APP_DB_PASS")
-    
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """Async PostgREST client sharing one keep-alive connection pool."""
+
+    def __init__(self, base_url: str, *, limits: httpx.Limits, **kwargs):
+        self.limits = limits
+        super().__init__(base_url, **kwargs)
+
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            verify=verify,
+            proxy=proxy,
+            limits=self.limits,
+            follow_redirects=True,
+            http2=True,
+        )
+
+
+class Database(TableRepository):
+    """`TableRepository` over Supabase through its PostgREST API."""
+
+    supabase_url: str = settings.app_db_url
+    supabase_key: str = settings.app_db_pass
+    pool_max_connections: int = settings.app_db_pool_max_connections
+    pool_max_keepalive: int = settings.app_db_pool_max_keepalive
+    pool_keepalive_expiry: float = settings.app_db_pool_keepalive_expiry
+    connect_timeout: float = settings.app_db_connect_timeout
+    request_timeout: float = settings.app_db_timeout
+    pool_timeout: float = settings.app_db_pool_timeout
+
     def __init__(self):
-        self.db = supabase.create_client(self.supabase_url, self.supabase_key)
-    
-    def check_connection(self):
-        try:
-            connection = self.db
-            return connection
-        except Exception as e:
-            return f"{str(e)}"
-    
-    
-        
-    
-    
-    
-        
-    
\ No newline at end of file
+        self.client: Optional[PooledPostgrestClient] = None
+
+    @property
+    def db(self) -> PooledPostgrestClient:
+        """The pooled PostgREST client, built on first use."""
+        if self.client is None:
+            self.client = self._create_client()
+        return self.client
+
+    def _create_client(self) -> PooledPostgrestClient:
+        if not self.supabase_url or not self.supabase_key:
+            raise RuntimeError("APP_DB_URL and APP_DB_PASS must be set")
+        return PooledPostgrestClient(
+            f"{self.supabase_url}/rest/v1",
+            headers={
+                "Accept": "application/json",
+                "Content-Type": "application/json",
+                "apiKey": self.supabase_key,
+                "Authorization": f"Bearer {self.supabase_key}",
+            },
+            timeout=httpx.Timeout(self.request_timeout, connect=self.connect_timeout, pool=self.pool_timeout),
+            limits=httpx.Limits(
+                max_connections=self.pool_max_connections,
+                max_keepalive_connections=self.pool_max_keepalive,
+                keepalive_expiry=self.pool_keepalive_expiry,
+            ),
+        )
+
+    @instrument("db")
+    async def check_connection(self):
+        """Issue a minimal query so the pool holds a warm connection."""
+        await self.db.from_("auth-users").select("id").limit(1).execute()
+        return self.db
+
+    @instrument("db")
+    async def fetch_one(self, table: str, *columns: str, **filters: Any) -> Optional[Dict]:
+        """Return the first row of `table` matching the equality filters, or None."""
+        query = self.db.from_(table).select(*(columns or ("*",)))
+        for column, value in filters.items():
+            query = query.eq(column, value)
+        response = await query.limit(1).execute()
+        return response.data[0] if response.data else None
+
+    @instrument("db")
+    async def fetch_all(self, table: str, *columns: str, order: Optional[str] = None, desc: bool = False, **filters: Any) -> List[Dict]:
+        """Return every row of `table` matching the equality filters."""
+        query = self.db.from_(table).select(*(columns or ("*",)))
+        for column, value in filters.items():
+            query = query.eq(column, value)
+        if order:
+            query = query.order(order, desc=desc)
+        response = await query.execute()
+        return response.data
+
+    @instrument("db")
+    async def fetch_page(self, table: str, key: str, after: Optional[Any], limit: int,
+                         since_column: Optional[str] = None, since: Optional[Any] = None) -> List[Dict]:
+        """Keyset page of `table`: up to `limit` rows with `key` > `after`, in `key` order."""
+        query = self.db.from_(table).select("*")
+        if after is not None:
+            query = query.gt(key, after)
+        if since_column and since is not None:
+            query = query.gte(since_column, since)
+        response = await query.order(key).limit(limit).execute()
+        return response.data
+
+    @instrument("db")
+    async def insert(self, table: str, data: Dict) -> List[Dict]:
+        response = await self.db.from_(table).insert(data).execute()
+        return response.data
+
+    @instrument("db")
+    async def update(self, table: str, data: Dict, **filters: Any) -> List[Dict]:
+        query = self.db.from_(table).update(data)
+        for column, value in filters.items():
+            query = query.eq(column, value)
+        response = await query.execute()
+        return response.data
+
+    @instrument("db")
+    async def rpc(self, function: str, params: Dict) -> List[Dict]:
+        """Call a stored procedure and return the rows it produces."""
+        response = await self.db.rpc(function, params).execute()
+        return response.data
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+
+def create_database() -> Repository:
+    """The backend selected by APP_DB_BACKEND ("supabase" or "sqlite")."""
+    if settings.app_db_backend == "sqlite":
+        from database.sqlite.main import SqliteDatabase
+        return SqliteDatabase()
+    return Database()
@@ -0,0 +1,186 @@
+import asyncio
+import copy
+import heapq
+import time
+from contextlib import asynccontextmanager
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Any
+from leaderboard.main import EXERCISES, shift_day
+from utils.metrics.main import timed
+from database.repository.main import TableRepository
+
+
+class MemoryDatabase(TableRepository):
+    """In-process stand-in for `Database` with the same awaitable helpers.
+
+    Tables are plain lists of dicts and stored procedures are Python
+    coroutines, so store-side behaviour (such as atomic score increments)
+    can be exercised without a Supabase project. `latency` seconds are
+    awaited on every call to stand in for the PostgREST round-trip, split
+    around the moment the call reads or commits, so callers see the same
+    gaps between a write landing and its response arriving as over HTTP.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.tables: Dict[str, List[Dict]] = {"auth-users": [], "user-profile": [], "leaderboard": [],
+                                              "leaderboard-history": [], "leaderboard-periods": [],
+                                              "leaderboard-batches": [], "job-leases": []}
+        self.procedures = {"increment_leaderboard_score": self._increment_leaderboard_score,
+                           "increment_leaderboard_scores": self._increment_leaderboard_scores,
+                           "roll_over_leaderboard_day": self._roll_over_leaderboard_day,
+                           "leaderboard_rank": self._leaderboard_rank,
+                           "acquire_lease": self._acquire_lease}
+        # Rows of the per-user tables by email, standing in for their unique index.
+        self.by_email: Dict[str, Dict[str, List[Dict]]] = {"auth-users": {}, "user-profile": {}, "leaderboard": {}}
+        self.lock = asyncio.Lock()
+        self.next_id = 1
+
+    def _match(self, table: str, filters: Dict[str, Any]) -> List[Dict]:
+        if table in self.by_email and "email" in filters:
+            rows = self.by_email[table].get(filters["email"], [])
+        else:
+            rows = self.tables.setdefault(table, [])
+        return [row for row in rows if all(row.get(k) == v for k, v in filters.items())]
+
+    @staticmethod
+    def _project(row: Dict, columns) -> Dict:
+        if not columns or "*" in columns:
+            return copy.deepcopy(row)
+        return {column: copy.deepcopy(row.get(column)) for column in columns}
+
+    @asynccontextmanager
+    async def _round_trip(self):
+        """Half of `latency` before the block runs (the request) and half after it (the response)."""
+        with timed("db"):
+            if self.latency:
+                await asyncio.sleep(self.latency / 2)
+            yield
+            if self.latency:
+                await asyncio.sleep(self.latency / 2)
+
+    async def check_connection(self):
+        async with self._round_trip():
+            return self
+
+    async def fetch_one(self, table: str, *columns: str, **filters: Any) -> Optional[Dict]:
+        async with self._round_trip():
+            rows = self._match(table, filters)
+            row = self._project(rows[0], columns) if rows else None
+        return row
+
+    async def fetch_all(self, table: str, *columns: str, order: Optional[str] = None, desc: bool = False, **filters: Any) -> List[Dict]:
+        async with self._round_trip():
+            rows = self._match(table, filters)
+            if order:
+                rows = sorted(rows, key=lambda row: (row.get(order) is None, row.get(order)), reverse=desc)
+            rows = [self._project(row, columns) for row in rows]
+        return rows
+
+    async def fetch_page(self, table: str, key: str, after: Optional[Any], limit: int,
+                         since_column: Optional[str] = None, since: Optional[Any] = None) -> List[Dict]:
+        async with self._round_trip():
+            rows = (row for row in self.tables.setdefault(table, [])
+                    if (after is None or row.get(key) > after)
+                    and (since is None or not since_column or (row.get(since_column) is not None and row[since_column] >= since)))
+            rows = [copy.deepcopy(row) for row in heapq.nsmallest(limit, rows, key=lambda row: row.get(key))]
+        return rows
+
+    async def insert(self, table: str, data: Dict) -> List[Dict]:
+        async with self._round_trip():
+            row = {column: copy.deepcopy(value) for column, value in data.items()}
+            if table == "auth-users":
+                row.setdefault("id", self.next_id)
+                row.setdefault("created_at", datetime.utcnow().isoformat())
+                self.next_id += 1
+            self.tables.setdefault(table, []).append(row)
+            if table in self.by_email:
+                self.by_email[table].setdefault(row.get("email"), []).append(row)
+            rows = [copy.deepcopy(row)]
+        return rows
+
+    async def update(self, table: str, data: Dict, **filters: Any) -> List[Dict]:
+        async with self._round_trip():
+            rows = self._match(table, filters)
+            for row in rows:
+                row.update({column: copy.deepcopy(value) for column, value in data.items()})
+            rows = [copy.deepcopy(row) for row in rows]
+        return rows
+
+    async def rpc(self, function: str, params: Dict) -> List[Dict]:
+        async with self._round_trip():
+            rows = await self.procedures[function](**params)
+        return rows
+
+    async def close(self):
+        pass
+
+    async def _increment_leaderboard_score(self, p_email: str, p_exercise: str, p_score: int, p_today: str) -> List[Dict]:
+        """Mirror of database/sql/increment_leaderboard_score.sql."""
+        async with self.lock:
+            rows = self._match("leaderboard", {"email": p_email})
+            for row in rows:
+                if row.get("last_updated") != p_today:
+                    row["today_points"] = {exercise: 0 for exercise in EXERCISES}
+                row["today_points"][p_exercise] = row["today_points"].get(p_exercise, 0) + p_score
+                row["total_points"][p_exercise] = row["total_points"].get(p_exercise, 0) + p_score
+                row["last_updated"] = p_today
+                history = self._match("leaderboard-history", {"email": p_email, "day": p_today, "exercise": p_exercise})
+                if history:
+                    history[0]["points"] += p_score
+                else:
+                    self.tables["leaderboard-history"].append({"email": p_email, "day": p_today, "exercise": p_exercise, "points": p_score})
+            return [copy.deepcopy(row) for row in rows]
+
+    async def _increment_leaderboard_scores(self, p_entries: List[Dict], p_batch_id: Optional[str] = None) -> List[Dict]:
+        """Mirror of database/sql/increment_leaderboard_scores.sql."""
+        batches = self.tables["leaderboard-batches"]
+        if p_batch_id is None or not any(batch["batch_id"] == p_batch_id for batch in batches):
+            if p_batch_id is not None:
+                now = datetime.utcnow()
+                batches[:] = [batch for batch in batches if batch["applied_at"] >= (now - timedelta(days=1)).isoformat()]
+                batches.append({"batch_id": p_batch_id, "applied_at": now.isoformat()})
+            for entry in sorted(p_entries, key=lambda entry: (entry["today"], entry["email"])):
+                await self._increment_leaderboard_score(entry["email"], entry["exercise"], entry["score"], entry["today"])
+        emails = {entry["email"] for entry in p_entries}
+        return [copy.deepcopy(row) for row in self.tables["leaderboard"] if row["email"] in emails]
+
+    async def _roll_over_leaderboard_day(self, p_day: str) -> None:
+        """Mirror of database/sql/roll_over_leaderboard_day.sql."""
+        async with self.lock:
+            periods = {"7d": shift_day(p_day, -5), "30d": shift_day(p_day, -28), p_day[:7]: p_day[:8] + "01"}
+            rows = [row for row in self.tables["leaderboard-periods"] if row["period"] not in periods]
+            for period, first_day in periods.items():
+                points: Dict[str, Dict[str, int]] = defaultdict(dict)
+                for history in self.tables["leaderboard-history"]:
+                    if first_day <= history["day"] <= p_day:
+                        exercises = points[history["email"]]
+                        exercises[history["exercise"]] = exercises.get(history["exercise"], 0) + history["points"]
+                rows.extend({"email": email, "period": period, "as_of": p_day, "points": exercises, "total": sum(exercises.values())}
+                            for email, exercises in points.items())
+            self.tables["leaderboard-periods"] = rows
+
+    async def _leaderboard_rank(self, p_email: str, p_exercise: Optional[str] = None) -> Optional[int]:
+        """Mirror of database/sql/leaderboard_rank.sql."""
+        def score(row: Dict) -> int:
+            points = row.get("total_points") or {}
+            return sum(points.values()) if p_exercise is None else points.get(p_exercise, 0)
+
+        rows = self._match("leaderboard", {"email": p_email})
+        if not rows:
+            return None
+        mine = score(rows[0])
+        return sum(1 for row in self.tables["leaderboard"] if score(row) > mine) + 1
+
+    async def _acquire_lease(self, p_name: str, p_holder: str, p_seconds: float) -> bool:
+        """Mirror of database/sql/job_leases.sql."""
+        now = time.time()
+        leases = self._match("job-leases", {"name": p_name})
+        if leases and leases[0]["holder"] != p_holder and leases[0]["expires_at"] >= now:
+            return False
+        if not leases:
+            leases = [{"name": p_name}]
+            self.tables["job-leases"].append(leases[0])
+        leases[0].update(holder=p_holder, expires_at=now + p_seconds)
+        return True
@@ -0,0 +1,193 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any
+
+
+def utc_now() -> str:
+    """ISO-8601 UTC timestamp, as stored in `updated_at`."""
+    return datetime.now(timezone.utc).isoformat()
+
+
+class Repository(ABC):
+    """The storage operations the app performs, whatever holds the data.
+
+    Callers only use these methods, and a backend must implement all of
+    them to be constructed. Rows come back in the Supabase shape with points
+    as {exercise: points} dicts, and writes return the rows they wrote.
+    `TableRepository` implements them over the Supabase table layout
+    (`Database`, `MemoryDatabase`); `SqliteDatabase` has its own schema.
+    """
+
+    @abstractmethod
+    async def check_connection(self):
+        """Make one round-trip to the store, raising if it is unreachable."""
+
+    async def close(self):
+        pass
+
+    # auth-users
+
+    @abstractmethod
+    async def user_by_email(self, email: str) -> Optional[Dict]: ...
+
+    @abstractmethod
+    async def user_by_id(self, user_id: Any) -> Optional[Dict]: ...
+
+    @abstractmethod
+    async def create_user(self, data: Dict) -> List[Dict]: ...
+
+    @abstractmethod
+    async def update_user(self, email: str, data: Dict) -> List[Dict]: ...
+
+    # user-profile
+
+    @abstractmethod
+    async def get_profile(self, email: str) -> Optional[Dict]: ...
+
+    @abstractmethod
+    async def list_profiles(self, *columns: str) -> List[Dict]: ...
+
+    @abstractmethod
+    async def create_profile(self, data: Dict) -> List[Dict]:
+        """Insert a profile, stamping `updated_at`."""
+
+    @abstractmethod
+    async def update_profile(self, email: str, data: Dict) -> List[Dict]:
+        """Update a profile, stamping `updated_at`."""
+
+    @abstractmethod
+    async def profiles_page(self, after: Optional[str], limit: int, since: Optional[str] = None) -> List[Dict]:
+        """Up to `limit` profiles with email > `after` in email order, optionally only those updated at or after `since`."""
+
+    # leaderboard
+
+    @abstractmethod
+    async def get_leaderboard(self, email: str) -> Optional[Dict]: ...
+
+    @abstractmethod
+    async def list_leaderboard(self) -> List[Dict]: ...
+
+    @abstractmethod
+    async def create_leaderboard(self, data: Dict) -> List[Dict]: ...
+
+    @abstractmethod
+    async def leaderboard_page(self, after: Optional[str], limit: int, since: Optional[str] = None) -> List[Dict]:
+        """Like `profiles_page` for leaderboard rows, with `since` a day compared to `last_updated`."""
+
+    @abstractmethod
+    async def increment_leaderboard(self, entries: List[Dict], batch_id: Optional[str] = None) -> List[Dict]:
+        """Apply {"email", "exercise", "score", "today"} increments; return the final row of every user touched.
+
+        A batch whose `batch_id` has already been applied is skipped, so a failed call can be resent safely.
+        """
+
+    @abstractmethod
+    async def roll_over_leaderboard(self, day: str):
+        """Rebuild the '7d', '30d' and calendar month period rows as of `day`."""
+
+    @abstractmethod
+    async def list_leaderboard_periods(self, period: str) -> List[Dict]: ...
+
+    @abstractmethod
+    async def leaderboard_rank(self, email: str, exercise: Optional[str] = None) -> Optional[int]:
+        """1-based competition rank of `email` by total points, for one exercise or all combined; None without a row.
+
+        The API ranks from its in-process `LeaderboardIndex`; this serves callers without one.
+        """
+
+    # job-leases
+
+    @abstractmethod
+    async def acquire_lease(self, name: str, holder: str, seconds: float) -> bool:
+        """Take or renew lease `name` for `holder` for `seconds`; False while another holder's lease is live."""
+
+
+class TableRepository(Repository):
+    """`Repository` over the Supabase table layout.
+
+    Every operation is one call to the generic table helpers a subclass
+    provides (`fetch_one`, `fetch_all`, `fetch_page`, `insert`, `update`,
+    `rpc`), so a backend that can address those tables and stored
+    procedures only has to implement the helpers.
+    """
+
+    @abstractmethod
+    async def fetch_one(self, table: str, *columns: str, **filters: Any) -> Optional[Dict]: ...
+
+    @abstractmethod
+    async def fetch_all(self, table: str, *columns: str, order: Optional[str] = None, desc: bool = False, **filters: Any) -> List[Dict]: ...
+
+    @abstractmethod
+    async def fetch_page(self, table: str, key: str, after: Optional[Any], limit: int,
+                         since_column: Optional[str] = None, since: Optional[Any] = None) -> List[Dict]: ...
+
+    @abstractmethod
+    async def insert(self, table: str, data: Dict) -> List[Dict]: ...
+
+    @abstractmethod
+    async def update(self, table: str, data: Dict, **filters: Any) -> List[Dict]: ...
+
+    @abstractmethod
+    async def rpc(self, function: str, params: Dict) -> List[Dict]: ...
+
+    # auth-users
+
+    async def user_by_email(self, email: str) -> Optional[Dict]:
+        return await self.fetch_one("auth-users", "*", email=email)
+
+    async def user_by_id(self, user_id: Any) -> Optional[Dict]:
+        return await self.fetch_one("auth-users", "*", id=user_id)
+
+    async def create_user(self, data: Dict) -> List[Dict]:
+        return await self.insert("auth-users", data)
+
+    async def update_user(self, email: str, data: Dict) -> List[Dict]:
+        return await self.update("auth-users", data, email=email)
+
+    # user-profile
+
+    async def get_profile(self, email: str) -> Optional[Dict]:
+        return await self.fetch_one("user-profile", "*", email=email)
+
+    async def list_profiles(self, *columns: str) -> List[Dict]:
+        return await self.fetch_all("user-profile", *columns)
+
+    async def create_profile(self, data: Dict) -> List[Dict]:
+        return await self.insert("user-profile", {**data, "updated_at": utc_now()})
+
+    async def update_profile(self, email: str, data: Dict) -> List[Dict]:
+        return await self.update("user-profile", {**data, "updated_at": utc_now()}, email=email)
+
+    async def profiles_page(self, after: Optional[str], limit: int, since: Optional[str] = None) -> List[Dict]:
+        return await self.fetch_page("user-profile", "email", after, limit, since_column="updated_at", since=since)
+
+    # leaderboard
+
+    async def get_leaderboard(self, email: str) -> Optional[Dict]:
+        return await self.fetch_one("leaderboard", "*", email=email)
+
+    async def list_leaderboard(self) -> List[Dict]:
+        return await self.fetch_all("leaderboard", "email", "username", "total_points", "today_points", "last_updated")
+
+    async def create_leaderboard(self, data: Dict) -> List[Dict]:
+        return await self.insert("leaderboard", data)
+
+    async def leaderboard_page(self, after: Optional[str], limit: int, since: Optional[str] = None) -> List[Dict]:
+        return await self.fetch_page("leaderboard", "email", after, limit, since_column="last_updated", since=since)
+
+    async def increment_leaderboard(self, entries: List[Dict], batch_id: Optional[str] = None) -> List[Dict]:
+        return await self.rpc("increment_leaderboard_scores", {"p_entries": entries, "p_batch_id": batch_id})
+
+    async def roll_over_leaderboard(self, day: str):
+        await self.rpc("roll_over_leaderboard_day", {"p_day": day})
+
+    async def list_leaderboard_periods(self, period: str) -> List[Dict]:
+        return await self.fetch_all("leaderboard-periods", "email", "points", "as_of", period=period)
+
+    async def leaderboard_rank(self, email: str, exercise: Optional[str] = None) -> Optional[int]:
+        return await self.rpc("leaderboard_rank", {"p_email": email, "p_exercise": exercise})
+
+    # job-leases
+
+    async def acquire_lease(self, name: str, holder: str, seconds: float) -> bool:
+        return bool(await self.rpc("acquire_lease", {"p_name": name, "p_holder": holder, "p_seconds": seconds}))
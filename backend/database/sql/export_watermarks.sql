@@ -0,0 +1,14 @@
+-- Columns the bulk export filters on for incremental runs.
+--
+-- "user-profile".updated_at is set by the API on every profile write
+-- (including stored workout plans); leaderboard rows already carry
+-- last_updated, the day their points last changed. Existing profiles are
+-- stamped now so the first incremental export after this migration
+-- includes them once.
+alter table "user-profile" add column if not exists updated_at timestamptz;
+
+update "user-profile" set updated_at = now() where updated_at is null;
+
+create index if not exists user_profile_updated_at_idx on "user-profile" (updated_at);
+
+create index if not exists leaderboard_last_updated_idx on leaderboard (last_updated);
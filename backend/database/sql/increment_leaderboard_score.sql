@@ -0,0 +1,41 @@
+-- Atomically add `p_score` points for `p_exercise` to a user's leaderboard row.
+--
+-- Applies the day rollover in the same statement: when `last_updated` is not
+-- `p_today`, today's points restart from zero before the increment. The
+-- UPDATE takes the row lock, so concurrent submissions for the same user are
+-- serialized and none of them is lost. The points are also added to the
+-- user's "leaderboard-history" row for `p_today`. Returns the updated row.
+create or replace function increment_leaderboard_score(
+    p_email text,
+    p_exercise text,
+    p_score integer,
+    p_today text
+)
+returns setof leaderboard
+language sql
+as $$
+    with updated as (
+        update leaderboard
+        set today_points = jsonb_set(
+                case when last_updated::text = p_today then today_points::jsonb
+                     else '{"Pushups": 0, "Squats": 0, "Crunches": 0, "Bicep Curls": 0}'::jsonb
+                end,
+                array[p_exercise],
+                to_jsonb(coalesce(case when last_updated::text = p_today
+                                       then (today_points::jsonb ->> p_exercise)::integer
+                                  end, 0) + p_score)),
+            total_points = jsonb_set(
+                total_points::jsonb,
+                array[p_exercise],
+                to_jsonb(coalesce((total_points::jsonb ->> p_exercise)::integer, 0) + p_score)),
+            last_updated = p_today
+        where email = p_email
+        returning *
+    ), history as (
+        insert into "leaderboard-history" (email, day, exercise, points)
+        select email, p_today::date, p_exercise, p_score from updated
+        on conflict (email, day, exercise)
+        do update set points = "leaderboard-history".points + excluded.points
+    )
+    select * from updated;
+$$;
@@ -0,0 +1,56 @@
+-- Apply a batch of buffered score increments in one round-trip.
+--
+-- `p_entries` is a JSON array of {"email", "exercise", "score", "today"}
+-- objects, already summed per user, day and exercise by the write-behind
+-- buffer. Entries are applied in (today, email) order through
+-- increment_leaderboard_score so the day rollover behaves exactly as for a
+-- single submission and row locks are always taken in the same order.
+-- Returns the final row of every user touched.
+--
+-- `p_batch_id` makes the call idempotent: the buffer resends a batch with
+-- the same id when a call fails, which may happen after this function has
+-- committed. The id is recorded in "leaderboard-batches" in the same
+-- transaction as the increments, and a batch whose id is already there is
+-- skipped (its users' rows are still returned). Ids older than a day are
+-- pruned as new batches arrive.
+create table if not exists "leaderboard-batches" (
+    batch_id text primary key,
+    applied_at timestamptz not null default now()
+);
+
+create index if not exists leaderboard_batches_applied_at_idx on "leaderboard-batches" (applied_at);
+
+drop function if exists increment_leaderboard_scores(jsonb);
+
+create or replace function increment_leaderboard_scores(p_entries jsonb, p_batch_id text default null)
+returns setof leaderboard
+language plpgsql
+as $$
+declare
+    entry jsonb;
+    v_applied boolean := false;
+begin
+    if p_batch_id is not null then
+        insert into "leaderboard-batches" (batch_id) values (p_batch_id)
+        on conflict (batch_id) do nothing;
+        v_applied := not found;
+        delete from "leaderboard-batches" where applied_at < now() - interval '1 day';
+    end if;
+    if not v_applied then
+        for entry in
+            select value from jsonb_array_elements(p_entries)
+            order by value ->> 'today', value ->> 'email'
+        loop
+            perform increment_leaderboard_score(
+                entry ->> 'email',
+                entry ->> 'exercise',
+                (entry ->> 'score')::integer,
+                entry ->> 'today'
+            );
+        end loop;
+    end if;
+    return query
+        select * from leaderboard
+        where email in (select distinct value ->> 'email' from jsonb_array_elements(p_entries));
+end;
+$$;
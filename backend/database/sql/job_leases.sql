@@ -0,0 +1,25 @@
+-- Named leases that let one server process run a periodic job at a time.
+--
+-- acquire_lease takes lease `p_name` for `p_holder` when it is free or has
+-- expired, or renews it when `p_holder` already holds it, in one statement:
+-- the row lock taken by the upsert serializes concurrent callers. Returns
+-- true when `p_holder` holds the lease for the next `p_seconds` seconds.
+create table if not exists "job-leases" (
+    name text primary key,
+    holder text not null,
+    expires_at timestamptz not null
+);
+
+create or replace function acquire_lease(p_name text, p_holder text, p_seconds double precision)
+returns boolean
+language plpgsql
+as $$
+begin
+    insert into "job-leases" (name, holder, expires_at)
+    values (p_name, p_holder, now() + make_interval(secs => p_seconds))
+    on conflict (name) do update
+    set holder = excluded.holder, expires_at = excluded.expires_at
+    where "job-leases".holder = excluded.holder or "job-leases".expires_at < now();
+    return found;
+end;
+$$;
@@ -0,0 +1,31 @@
+-- Daily points history and the period totals materialized from it.
+--
+-- "leaderboard-history" holds one row per user, day and exercise and is
+-- written by increment_leaderboard_score in the same statement as the
+-- leaderboard row, so days are kept after today_points rolls over.
+--
+-- "leaderboard-periods" is rebuilt by roll_over_leaderboard_day once a day
+-- ends. Its '7d' and '30d' rows hold the finalized part of the rolling
+-- window current on the following day (the 6 and 29 days up to as_of); the
+-- API adds that day's live points on top. 'YYYY-MM' rows hold a calendar
+-- month up to as_of.
+create table if not exists "leaderboard-history" (
+    email text not null,
+    day date not null,
+    exercise text not null,
+    points integer not null default 0,
+    primary key (email, day, exercise)
+);
+
+create index if not exists leaderboard_history_day_idx on "leaderboard-history" (day);
+
+create table if not exists "leaderboard-periods" (
+    email text not null,
+    period text not null,
+    as_of date not null,
+    points jsonb not null,
+    total integer not null,
+    primary key (email, period)
+);
+
+create index if not exists leaderboard_periods_period_total_idx on "leaderboard-periods" (period, total desc);
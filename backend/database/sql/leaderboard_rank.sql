@@ -0,0 +1,23 @@
+-- 1-based competition rank of `p_email` by total points: equal scores share
+-- a rank. `p_exercise` ranks by one exercise; null ranks by all of them
+-- combined. Returns null when the user has no leaderboard row.
+--
+-- The API ranks from its in-process index; this is for callers without one
+-- (scripts, other services) and scans the table once per call.
+create or replace function leaderboard_rank(p_email text, p_exercise text default null)
+returns integer
+language sql
+stable
+as $$
+    with scores as (
+        select email,
+               case when p_exercise is null
+                    then (select coalesce(sum(value::integer), 0) from jsonb_each_text(total_points::jsonb))
+                    else coalesce((total_points::jsonb ->> p_exercise)::integer, 0)
+               end as score
+        from leaderboard
+    )
+    select (select count(*) from scores where scores.score > me.score)::integer + 1
+    from scores me
+    where me.email = p_email;
+$$;
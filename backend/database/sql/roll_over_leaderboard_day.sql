@@ -0,0 +1,38 @@
+-- Finalize leaderboard day `p_day` (YYYY-MM-DD in APP_TIMEZONE).
+--
+-- Rebuilds the '7d', '30d' and calendar month rows of "leaderboard-periods"
+-- from "leaderboard-history". Each period is replaced as a whole, so running
+-- it again for the same day gives the same result. Concurrent runs from
+-- several workers are serialized by a transaction-scoped advisory lock:
+-- without it two delete+insert passes over the same period can interleave
+-- and leave duplicate-key errors or missing rows.
+create or replace function roll_over_leaderboard_day(p_day text)
+returns void
+language plpgsql
+as $$
+declare
+    v_day date := p_day::date;
+    v_period record;
+begin
+    -- Held until the calling transaction ends; every rollover takes the same key.
+    perform pg_advisory_xact_lock(hashtext('roll_over_leaderboard_day'));
+    for v_period in
+        select * from (values
+            ('7d', v_day - 5),
+            ('30d', v_day - 28),
+            (to_char(v_day, 'YYYY-MM'), date_trunc('month', v_day)::date)
+        ) as periods(name, first_day)
+    loop
+        delete from "leaderboard-periods" where period = v_period.name;
+        insert into "leaderboard-periods" (email, period, as_of, points, total)
+        select email, v_period.name, v_day, jsonb_object_agg(exercise, points), sum(points)::integer
+        from (
+            select email, exercise, sum(points)::integer as points
+            from "leaderboard-history"
+            where day between v_period.first_day and v_day
+            group by email, exercise
+        ) per_exercise
+        group by email;
+    end loop;
+end;
+$$;
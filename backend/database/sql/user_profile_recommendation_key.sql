@@ -0,0 +1,3 @@
+-- Hash of the profile fields the stored recommended_exercise_plan was
+-- generated from; the plan is reused while it matches the current profile.
+alter table "user-profile" add column if not exists recommendation_key text;
@@ -0,0 +1,353 @@
+import asyncio
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Dict, Any
+import orjson
+from leaderboard.main import EXERCISES, POINT_COLUMNS, shift_day
+from database.repository.main import Repository, utc_now
+from config.settings.main import settings
+from utils.metrics.main import instrument
+
+
+PROFILE_COLUMNS = ("email", "your_gender", "weight", "height", "date_of_birth", "primary_goal_for_exercising",
+                   "how_often_exercised_at_past", "workout_intensity", "workout_duration",
+                   "what_days_a_week_you_will_workout", "what_time_of_day_you_will_workout",
+                   "recommended_exercise_plan", "recommendation_key", "updated_at")
+# Stored as JSON text; everything else is a plain column.
+PROFILE_JSON_COLUMNS = ("recommended_exercise_plan",)
+USER_COLUMNS = ("email", "username", "password")
+
+SCHEMA = f"""
+create table if not exists auth_users (
+    id integer primary key,
+    email text not null unique,
+    username text not null,
+    password text not null,
+    created_at text not null
+);
+
+create table if not exists user_profile (
+    email text primary key,
+    your_gender text,
+    weight real,
+    height real,
+    date_of_birth text,
+    primary_goal_for_exercising text,
+    how_often_exercised_at_past text,
+    workout_intensity text,
+    workout_duration text,
+    what_days_a_week_you_will_workout text,
+    what_time_of_day_you_will_workout text,
+    recommended_exercise_plan text,
+    recommendation_key text,
+    updated_at text
+) without rowid;
+
+create index if not exists user_profile_updated_at_idx on user_profile (updated_at);
+
+create table if not exists leaderboard (
+    email text primary key,
+    username text not null,
+    created_on text not null,
+    last_updated text not null,
+    {", ".join(f"total_{column} integer not null default 0" for column in POINT_COLUMNS.values())},
+    {", ".join(f"today_{column} integer not null default 0" for column in POINT_COLUMNS.values())}
+) without rowid;
+
+create index if not exists leaderboard_last_updated_idx on leaderboard (last_updated);
+
+create table if not exists leaderboard_history (
+    email text not null,
+    day text not null,
+    exercise text not null,
+    points integer not null default 0,
+    primary key (email, day, exercise)
+) without rowid;
+
+create index if not exists leaderboard_history_day_idx on leaderboard_history (day);
+
+create table if not exists leaderboard_periods (
+    period text not null,
+    email text not null,
+    as_of text not null,
+    {", ".join(f"{column} integer not null default 0" for column in POINT_COLUMNS.values())},
+    total integer not null,
+    primary key (period, email)
+) without rowid;
+
+create index if not exists leaderboard_periods_period_total_idx on leaderboard_periods (period, total desc);
+
+create table if not exists leaderboard_batches (
+    batch_id text primary key,
+    applied_at text not null
+) without rowid;
+
+create index if not exists leaderboard_batches_applied_at_idx on leaderboard_batches (applied_at);
+
+create table if not exists job_leases (
+    name text primary key,
+    holder text not null,
+    expires_at real not null
+) without rowid;
+"""
+
+SELECT_USER_BY_EMAIL = "select * from auth_users where email = ?"
+SELECT_USER_BY_ID = "select * from auth_users where id = ?"
+INSERT_USER = "insert into auth_users (email, username, password, created_at) values (?, ?, ?, ?) returning *"
+
+SELECT_PROFILE = "select * from user_profile where email = ?"
+# Keyset pages; "" as `after` or `since` matches every row.
+SELECT_PROFILES_PAGE = "select * from user_profile where email > ? and coalesce(updated_at, '') >= ? order by email limit ?"
+
+SELECT_LEADERBOARD = "select * from leaderboard where email = ?"
+SELECT_LEADERBOARDS = "select * from leaderboard"
+SELECT_LEADERBOARD_PAGE = "select * from leaderboard where email > ? and last_updated >= ? order by email limit ?"
+INSERT_LEADERBOARD = (
+    f"insert into leaderboard (email, username, created_on, last_updated, "
+    f"{', '.join(f'total_{column}' for column in POINT_COLUMNS.values())}, "
+    f"{', '.join(f'today_{column}' for column in POINT_COLUMNS.values())}) "
+    f"values ({', '.join('?' * (4 + 2 * len(POINT_COLUMNS)))}) returning *")
+RESET_TODAY = (
+    f"update leaderboard set {', '.join(f'today_{column} = 0' for column in POINT_COLUMNS.values())} "
+    f"where email = ? and last_updated <> ?")
+INCREMENT = {exercise: f"update leaderboard set total_{column} = total_{column} + ?, today_{column} = today_{column} + ?, "
+                       f"last_updated = ? where email = ?"
+             for exercise, column in POINT_COLUMNS.items()}
+# No row inserted means the batch was applied before and is skipped.
+INSERT_BATCH = "insert into leaderboard_batches (batch_id, applied_at) values (?, ?) on conflict (batch_id) do nothing"
+PRUNE_BATCHES = "delete from leaderboard_batches where applied_at < ?"
+UPSERT_HISTORY = ("insert into leaderboard_history (email, day, exercise, points) values (?, ?, ?, ?) "
+                  "on conflict (email, day, exercise) do update set points = points + excluded.points")
+
+# Rank by one exercise column or, under None, by all of them combined; no row when the user has none.
+RANK_SCORES = {None: " + ".join(f"total_{column}" for column in POINT_COLUMNS.values()),
+               **{exercise: f"total_{column}" for exercise, column in POINT_COLUMNS.items()}}
+RANK = {exercise: f"select (select count(*) from leaderboard where {score} > me.score) + 1 "
+                  f"from (select {score} as score from leaderboard where email = ?) me"
+        for exercise, score in RANK_SCORES.items()}
+
+# No row written means another holder's lease is still live.
+ACQUIRE_LEASE = ("insert into job_leases (name, holder, expires_at) values (?, ?, ?) "
+                 "on conflict (name) do update set holder = excluded.holder, expires_at = excluded.expires_at "
+                 "where job_leases.holder = excluded.holder or job_leases.expires_at < ?")
+
+SELECT_PERIODS = "select * from leaderboard_periods where period = ?"
+DELETE_PERIOD = "delete from leaderboard_periods where period = ?"
+INSERT_PERIOD = (
+    f"insert into leaderboard_periods (period, email, as_of, {', '.join(POINT_COLUMNS.values())}, total) "
+    f"select ?, email, ?, "
+    f"{', '.join(f'sum(case when exercise = ? then points else 0 end)' for _ in POINT_COLUMNS)}, sum(points) "
+    f"from leaderboard_history where day between ? and ? group by email")
+
+
+def points(row: sqlite3.Row, prefix: str = "") -> Dict[str, int]:
+    return {exercise: row[prefix + column] for exercise, column in POINT_COLUMNS.items()}
+
+
+def leaderboard_row(row: sqlite3.Row) -> Dict:
+    return {"email": row["email"], "username": row["username"], "created_on": row["created_on"],
+            "last_updated": row["last_updated"], "total_points": points(row, "total_"), "today_points": points(row, "today_")}
+
+
+def profile_row(row: sqlite3.Row) -> Dict:
+    profile = dict(row)
+    for column in PROFILE_JSON_COLUMNS:
+        if profile[column] is not None:
+            profile[column] = orjson.loads(profile[column])
+    return profile
+
+
+def columns_of(data: Dict, allowed) -> List[str]:
+    unknown = set(data) - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(sorted(unknown))}")
+    return sorted(data)
+
+
+class SqliteDatabase(Repository):
+    """`Repository` in an embedded SQLite file, for single-host deployments without Supabase.
+
+    Users and profiles are keyed by email (users also by integer id) and
+    leaderboard points live in one integer column per exercise, so a score
+    increment is an in-place update rather than a JSON rewrite. Statements
+    are fixed strings, prepared once per connection by sqlite3's statement
+    cache. Calls run one at a time on a dedicated thread, which keeps the
+    event loop free and makes every operation atomic within the process;
+    writes from other processes wait on WAL locking for `busy_timeout`.
+    """
+
+    path: str = settings.app_db_sqlite_path
+    busy_timeout: float = settings.app_db_timeout
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or self.path
+        self.connection: Optional[sqlite3.Connection] = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                                         check_same_thread=False, cached_statements=256)
+            connection.row_factory = sqlite3.Row
+            connection.execute("pragma journal_mode = wal")
+            connection.execute("pragma synchronous = normal")
+            connection.executescript(SCHEMA)
+            self.connection = connection
+        return self.connection
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connect()
+        connection.execute("begin immediate")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("rollback")
+            raise
+        connection.execute("commit")
+
+    @instrument("db")
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def check_connection(self):
+        await self._run(lambda: self._connect().execute("select 1").fetchone())
+        return self
+
+    async def close(self):
+        if self.connection is not None:
+            await self._run(self.connection.close)
+            self.connection = None
+
+    def _one(self, sql: str, *params) -> Optional[sqlite3.Row]:
+        return self._connect().execute(sql, params).fetchone()
+
+    # auth-users
+
+    async def user_by_email(self, email: str) -> Optional[Dict]:
+        row = await self._run(self._one, SELECT_USER_BY_EMAIL, email)
+        return dict(row) if row else None
+
+    async def user_by_id(self, user_id: Any) -> Optional[Dict]:
+        row = await self._run(self._one, SELECT_USER_BY_ID, user_id)
+        return dict(row) if row else None
+
+    async def create_user(self, data: Dict) -> List[Dict]:
+        columns_of(data, USER_COLUMNS)
+        row = await self._run(self._one, INSERT_USER, data["email"], data["username"], data["password"],
+                              datetime.utcnow().isoformat())
+        return [dict(row)]
+
+    async def update_user(self, email: str, data: Dict) -> List[Dict]:
+        columns = columns_of(data, USER_COLUMNS)
+        sql = f"update auth_users set {', '.join(f'{column} = ?' for column in columns)} where email = ? returning *"
+        rows = await self._run(lambda: self._connect().execute(sql, [data[c] for c in columns] + [email]).fetchall())
+        return [dict(row) for row in rows]
+
+    # user-profile
+
+    @staticmethod
+    def _profile_values(data: Dict, columns: List[str]) -> List[Any]:
+        return [orjson.dumps(data[column]).decode() if column in PROFILE_JSON_COLUMNS and data[column] is not None
+                else data[column] for column in columns]
+
+    async def get_profile(self, email: str) -> Optional[Dict]:
+        row = await self._run(self._one, SELECT_PROFILE, email)
+        return profile_row(row) if row else None
+
+    async def list_profiles(self, *columns: str) -> List[Dict]:
+        columns = columns_of(dict.fromkeys(columns), PROFILE_COLUMNS) if columns else ["*"]
+        sql = f"select {', '.join(columns)} from user_profile"
+        rows = await self._run(lambda: self._connect().execute(sql).fetchall())
+        return [{key: orjson.loads(row[key]) if key in PROFILE_JSON_COLUMNS and row[key] is not None else row[key]
+                 for key in row.keys()} for row in rows]
+
+    async def create_profile(self, data: Dict) -> List[Dict]:
+        data = {**data, "updated_at": utc_now()}
+        columns = columns_of(data, PROFILE_COLUMNS)
+        sql = f"insert into user_profile ({', '.join(columns)}) values ({', '.join('?' * len(columns))}) returning *"
+        row = await self._run(self._one, sql, *self._profile_values(data, columns))
+        return [profile_row(row)]
+
+    async def update_profile(self, email: str, data: Dict) -> List[Dict]:
+        data = {**data, "updated_at": utc_now()}
+        columns = columns_of(data, PROFILE_COLUMNS)
+        # One statement per set of columns, so each is prepared once and then reused.
+        sql = f"update user_profile set {', '.join(f'{column} = ?' for column in columns)} where email = ? returning *"
+        rows = await self._run(lambda: self._connect().execute(sql, self._profile_values(data, columns) + [email]).fetchall())
+        return [profile_row(row) for row in rows]
+
+    async def profiles_page(self, after: Optional[str], limit: int, since: Optional[str] = None) -> List[Dict]:
+        rows = await self._run(lambda: self._connect().execute(SELECT_PROFILES_PAGE, (after or "", since or "", limit)).fetchall())
+        return [profile_row(row) for row in rows]
+
+    # leaderboard
+
+    async def get_leaderboard(self, email: str) -> Optional[Dict]:
+        row = await self._run(self._one, SELECT_LEADERBOARD, email)
+        return leaderboard_row(row) if row else None
+
+    async def list_leaderboard(self) -> List[Dict]:
+        rows = await self._run(lambda: self._connect().execute(SELECT_LEADERBOARDS).fetchall())
+        return [leaderboard_row(row) for row in rows]
+
+    async def leaderboard_page(self, after: Optional[str], limit: int, since: Optional[str] = None) -> List[Dict]:
+        rows = await self._run(lambda: self._connect().execute(SELECT_LEADERBOARD_PAGE, (after or "", since or "", limit)).fetchall())
+        return [leaderboard_row(row) for row in rows]
+
+    async def create_leaderboard(self, data: Dict) -> List[Dict]:
+        total, today = data.get("total_points") or {}, data.get("today_points") or {}
+        params = [data["email"], data["username"], data["created_on"], data["last_updated"]]
+        params += [total.get(exercise, 0) for exercise in EXERCISES] + [today.get(exercise, 0) for exercise in EXERCISES]
+        row = await self._run(self._one, INSERT_LEADERBOARD, *params)
+        return [leaderboard_row(row)]
+
+    def _increment(self, entries: List[Dict], batch_id: Optional[str]) -> List[Dict]:
+        with self._transaction() as connection:
+            increments = sorted(entries, key=lambda entry: (entry["today"], entry["email"]))
+            if batch_id is not None:
+                now = datetime.now(timezone.utc)
+                if not connection.execute(INSERT_BATCH, (batch_id, now.isoformat())).rowcount:
+                    increments = []
+                connection.execute(PRUNE_BATCHES, ((now - timedelta(days=1)).isoformat(),))
+            for entry in increments:
+                email, exercise, score, today = entry["email"], entry["exercise"], entry["score"], entry["today"]
+                connection.execute(RESET_TODAY, (email, today))
+                if connection.execute(INCREMENT[exercise], (score, score, today, email)).rowcount:
+                    connection.execute(UPSERT_HISTORY, (email, today, exercise, score))
+            rows = [connection.execute(SELECT_LEADERBOARD, (email,)).fetchone()
+                    for email in dict.fromkeys(entry["email"] for entry in entries)]
+        return [leaderboard_row(row) for row in rows if row is not None]
+
+    async def increment_leaderboard(self, entries: List[Dict], batch_id: Optional[str] = None) -> List[Dict]:
+        return await self._run(self._increment, entries, batch_id)
+
+    def _roll_over(self, day: str):
+        periods = {"7d": shift_day(day, -5), "30d": shift_day(day, -28), day[:7]: day[:8] + "01"}
+        with self._transaction() as connection:
+            for period, first_day in periods.items():
+                connection.execute(DELETE_PERIOD, (period,))
+                connection.execute(INSERT_PERIOD, (period, day, *EXERCISES, first_day, day))
+
+    async def roll_over_leaderboard(self, day: str):
+        await self._run(self._roll_over, day)
+
+    async def list_leaderboard_periods(self, period: str) -> List[Dict]:
+        rows = await self._run(lambda: self._connect().execute(SELECT_PERIODS, (period,)).fetchall())
+        return [{"email": row["email"], "period": row["period"], "as_of": row["as_of"], "points": points(row),
+                 "total": row["total"]} for row in rows]
+
+    async def leaderboard_rank(self, email: str, exercise: Optional[str] = None) -> Optional[int]:
+        row = await self._run(self._one, RANK[exercise], email)
+        return row[0] if row else None
+
+    def _acquire_lease(self, name: str, holder: str, seconds: float) -> bool:
+        now = time.time()
+        with self._transaction() as connection:
+            return bool(connection.execute(ACQUIRE_LEASE, (name, holder, now + seconds, now)).rowcount)
+
+    async def acquire_lease(self, name: str, holder: str, seconds: float) -> bool:
+        return await self._run(self._acquire_lease, name, holder, seconds)
@@ -0,0 +1,169 @@
+"""Bulk export of profiles, workout plans and leaderboard points.
+
+    python -m export.main points --format csv --output points.csv
+    python -m export.main profiles --since 2026-10-01T00:00:00+00:00
+    python -m export.main plans --watermark-file plans.watermark --output plans.ndjson
+
+Rows are read from the store configured by APP_DB_BACKEND in keyset pages
+of `--page-size` (email > last email seen), so memory stays flat however
+large the tables are, and are written as NDJSON or CSV one page at a time.
+The same pipeline backs GET /api/admin/export/{dataset}.
+
+Incremental runs pass the watermark printed (or saved to
+`--watermark-file`) by the previous run as `--since`. It is taken before
+the first page is read and `since` is inclusive, so a row changed during
+an export is sent again next time rather than missed.
+"""
+import argparse
+import asyncio
+import csv
+import io
+import os
+import sys
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from database.repository.main import utc_now
+from leaderboard.main import EXERCISES, POINT_COLUMNS, local_today
+from schema.main import UserProfile
+from utils.response.main import dumps
+from config.settings.main import settings
+
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def points_row(row: Dict) -> Dict:
+    """A leaderboard row with its points spread over total_<exercise> and today_<exercise> columns."""
+    flat = {column: row.get(column) for column in ("email", "username", "created_on", "last_updated")}
+    for prefix in ("total", "today"):
+        points = row.get(f"{prefix}_points") or {}
+        flat.update({f"{prefix}_{column}": points.get(exercise, 0) for exercise, column in POINT_COLUMNS.items()})
+    return flat
+
+
+class Dataset:
+    """One exportable view of a table.
+
+    `load` names the repository's keyset page method, `columns` fixes the
+    output columns (and CSV header), `watermark` gives the value the next
+    incremental run should pass as `since`, `shape` maps a stored row to an
+    output row and rows failing `keep` are skipped.
+    """
+
+    def __init__(self, load: str, columns: Tuple[str, ...], watermark: Callable[[], str],
+                 shape: Optional[Callable[[Dict], Dict]] = None, keep: Optional[Callable[[Dict], Any]] = None):
+        self.load = load
+        self.columns = columns
+        self.watermark = watermark
+        self.shape = shape
+        self.keep = keep
+
+    def row(self, row: Dict) -> Dict:
+        row = self.shape(row) if self.shape else row
+        return {column: row.get(column) for column in self.columns}
+
+
+DATASETS = {
+    "profiles": Dataset("profiles_page", ("email",) + tuple(UserProfile.model_fields) + ("recommendation_key", "updated_at"),
+                        utc_now),
+    "plans": Dataset("profiles_page", ("email", "recommendation_key", "recommended_exercise_plan", "updated_at"),
+                     utc_now, keep=lambda row: row.get("recommended_exercise_plan")),
+    "points": Dataset("leaderboard_page", ("email", "username", "created_on", "last_updated")
+                      + tuple(f"{prefix}_{POINT_COLUMNS[exercise]}" for prefix in ("total", "today") for exercise in EXERCISES),
+                      local_today, shape=points_row),
+}
+
+
+async def pages(db, dataset: Dataset, since: Optional[str] = None, page_size: int = 1000) -> AsyncIterator[List[Dict]]:
+    """Output rows of `dataset` one keyset page at a time."""
+    load = getattr(db, dataset.load)
+    after = None
+    while True:
+        page = await load(after, page_size, since)
+        rows = [dataset.row(row) for row in page if dataset.keep is None or dataset.keep(row)]
+        if rows:
+            yield rows
+        if len(page) < page_size:
+            return
+        after = page[-1]["email"]
+
+
+async def ndjson(dataset: Dataset, rows: AsyncIterator[List[Dict]]) -> AsyncIterator[bytes]:
+    async for page in rows:
+        yield b"".join(dumps(row) + b"\n" for row in page)
+
+
+def csv_cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return dumps(value).decode("utf-8")
+    return value
+
+
+async def csv_lines(dataset: Dataset, rows: AsyncIterator[List[Dict]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def drain() -> bytes:
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text.encode("utf-8")
+
+    writer.writerow(dataset.columns)
+    yield drain()
+    async for page in rows:
+        writer.writerows([csv_cell(row[column]) for column in dataset.columns] for row in page)
+        yield drain()
+
+
+ENCODERS = {"ndjson": ndjson, "csv": csv_lines}
+
+
+def export(db, dataset: Dataset, format: str = "ndjson", since: Optional[str] = None,
+           page_size: int = settings.export_page_size) -> AsyncIterator[bytes]:
+    """Encoded chunks of `dataset`, one per page."""
+    return ENCODERS[format](dataset, pages(db, dataset, since, page_size))
+
+
+async def run(args) -> str:
+    from database.main import create_database
+
+    dataset = DATASETS[args.dataset]
+    since = args.since
+    if since is None and args.watermark_file and os.path.exists(args.watermark_file):
+        with open(args.watermark_file) as f:
+            since = f.read().strip() or None
+    watermark = dataset.watermark()
+    db = create_database()
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        async for chunk in export(db, dataset, args.format, since, args.page_size):
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+        else:
+            output.flush()
+        await db.close()
+    if args.watermark_file:
+        with open(args.watermark_file, "w") as f:
+            f.write(watermark + "\n")
+    return watermark
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dataset", choices=sorted(DATASETS))
+    parser.add_argument("--format", choices=sorted(FORMATS), default="ndjson")
+    parser.add_argument("--since", help="only rows changed at or after this watermark")
+    parser.add_argument("--watermark-file", help="read --since from this file and store the new watermark in it")
+    parser.add_argument("--output", help="file to write instead of stdout")
+    parser.add_argument("--page-size", type=int, default=settings.export_page_size)
+    args = parser.parse_args()
+    watermark = asyncio.run(run(args))
+    print(f"watermark: {watermark}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
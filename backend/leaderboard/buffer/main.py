@@ -0,0 +1,144 @@
+import copy
+import uuid
+import asyncio
+import logging
+from typing import Optional, Callable, Awaitable, List, Dict, Tuple, TypeVar
+from leaderboard.main import EXERCISES
+from config.settings.main import settings
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ScoreBuffer:
+    """Write-behind buffer that coalesces leaderboard score submissions.
+
+    Submissions are summed per user, day and exercise in memory and written
+    with one `increment_leaderboard` call every `flush_interval_ms`
+    or once `flush_max_entries` submissions are waiting. Reads go through
+    `merge` so buffered points are visible before they reach the store; the
+    stored rows they merge must be loaded with `read`.
+
+    Each flush moves the pending points into one batch per day, each with
+    its own id, and writes the batches oldest day first. A batch that fails
+    stays at the head of `outbox` and is resent with the same id before
+    anything newer, so the store can drop it if the failed call had in fact
+    been applied, and a late retry never rolls a user's day back.
+    """
+
+    flush_interval_ms = settings.leaderboard_flush_interval_ms
+    flush_max_entries = settings.leaderboard_flush_max_entries
+
+    def __init__(self):
+        # email -> day -> exercise -> points not yet written
+        self.pending: Dict[str, Dict[str, Dict[str, int]]] = {}
+        # (batch id, email -> exercise -> points) per day, oldest first
+        self.outbox: List[Tuple[str, str, Dict[str, Dict[str, int]]]] = []
+        self.pending_count = 0
+        self.wakeup = asyncio.Event()
+        self.flush_lock = asyncio.Lock()
+        self.task: Optional[asyncio.Task] = None
+        self.db = None
+        self.on_rows: Optional[Callable[[List[Dict]], None]] = None
+
+    def start(self, db, on_rows: Optional[Callable[[List[Dict]], None]] = None):
+        """Begin periodic flushing; `on_rows` receives the stored rows each flush returns."""
+        self.db = db
+        self.on_rows = on_rows
+        self.wakeup = asyncio.Event()
+        self.flush_lock = asyncio.Lock()
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.flush_interval_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Leaderboard flush failed, keeping scores buffered")
+
+    async def read(self, load: Callable[..., Awaitable[T]], *args) -> T:
+        """`await load(*args)` with no flush in flight, for stored rows that will go through `merge`.
+
+        A batch stays in `outbox` until its call returns, so a row read
+        while the call is out may or may not include it, and `merge` would
+        count its points twice or not at all.
+        """
+        async with self.flush_lock:
+            return await load(*args)
+
+    def add(self, email: str, exercise: str, score: int, day: str):
+        exercises = self.pending.setdefault(email, {}).setdefault(day, {})
+        exercises[exercise] = exercises.get(exercise, 0) + score
+        self.pending_count += 1
+        if self.pending_count >= self.flush_max_entries:
+            self.wakeup.set()
+
+    @staticmethod
+    def _fold(target: Dict, source: Dict):
+        for email, days in source.items():
+            for day, exercises in days.items():
+                merged = target.setdefault(email, {}).setdefault(day, {})
+                for exercise, score in exercises.items():
+                    merged[exercise] = merged.get(exercise, 0) + score
+
+    def merge(self, row: Dict) -> Dict:
+        """Return a copy of a stored leaderboard row with buffered points applied."""
+        buffered: Dict[str, Dict[str, Dict[str, int]]] = {}
+        for _, day, batch in self.outbox:
+            if row["email"] in batch:
+                self._fold(buffered, {row["email"]: {day: batch[row["email"]]}})
+        if row["email"] in self.pending:
+            self._fold(buffered, {row["email"]: self.pending[row["email"]]})
+        days = buffered.get(row["email"])
+        if not days:
+            return row
+        row = copy.deepcopy(row)
+        for day in sorted(days):
+            if row.get("last_updated") != day:
+                row["today_points"] = {exercise: 0 for exercise in EXERCISES}
+                row["last_updated"] = day
+            for exercise, score in days[day].items():
+                row["today_points"][exercise] = row["today_points"].get(exercise, 0) + score
+                row["total_points"][exercise] = row["total_points"].get(exercise, 0) + score
+        return row
+
+    def _batch(self):
+        """Move the pending points into the outbox as one new batch per day."""
+        days: Dict[str, Dict[str, Dict[str, int]]] = {}
+        for email, pending in self.pending.items():
+            for day, exercises in pending.items():
+                days.setdefault(day, {})[email] = exercises
+        self.outbox.extend((uuid.uuid4().hex, day, days[day]) for day in sorted(days))
+        self.outbox.sort(key=lambda batch: batch[1])
+        self.pending, self.pending_count = {}, 0
+
+    async def flush(self):
+        async with self.flush_lock:
+            self._batch()
+            while self.outbox:
+                batch_id, day, batch = self.outbox[0]
+                entries = [{"email": email, "today": day, "exercise": exercise, "score": score}
+                           for email, exercises in sorted(batch.items())
+                           for exercise, score in exercises.items()]
+                rows = await self.db.increment_leaderboard(entries, batch_id)
+                self.outbox.pop(0)
+                if self.on_rows:
+                    self.on_rows(rows)
+
+    async def drain(self):
+        """Stop the flush loop and write everything still buffered."""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.flush()
@@ -0,0 +1,292 @@
+import time
+import asyncio
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from typing import Any, Optional, Callable, List, Dict, Tuple
+from sortedcontainers import SortedList
+from config.settings.main import settings
+from utils.cache.main import TTLCache
+
+
+EXERCISES = ("Pushups", "Squats", "Crunches", "Bicep Curls")
+# Column-safe name of each exercise, e.g. total_bicep_curls in flat rows.
+POINT_COLUMNS = {exercise: exercise.lower().replace(" ", "_") for exercise in EXERCISES}
+COMBINED = "combined"
+# "week" and "month" are the rolling 7 and 30 days ending today.
+SCOPES = ("overall", "today", "week", "month")
+SCOPE_POINTS = {"overall": "total_points", "today": "today_points", "week": "week_points", "month": "month_points"}
+# Period rows in `leaderboard-periods` that back the rolling scopes.
+ROLLING_PERIODS = {"week": ("7d", 7), "month": ("30d", 30)}
+# Leaderboard days are calendar days in this zone, not the server's local time.
+TIMEZONE = ZoneInfo(settings.app_timezone)
+
+
+def local_today(now: Optional[datetime] = None) -> str:
+    """Current leaderboard day (YYYY-MM-DD) in APP_TIMEZONE."""
+    return (now or datetime.now(TIMEZONE)).astimezone(TIMEZONE).strftime("%Y-%m-%d")
+
+
+def shift_day(day: str, days: int) -> str:
+    return (datetime.strptime(day, "%Y-%m-%d") + timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+def parse_month(period: str, today: str) -> str:
+    """Validate a "YYYY-MM" calendar month no later than `today`'s; raises ValueError."""
+    try:
+        month = datetime.strptime(period, "%Y-%m")
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid month {period}, expected YYYY-MM")
+    if period > today[:7]:
+        raise ValueError(f"Month {period} is in the future")
+    return month.strftime("%Y-%m")
+
+
+def seconds_until_next_day(now: Optional[datetime] = None) -> float:
+    """Seconds until the next midnight in APP_TIMEZONE."""
+    now = (now or datetime.now(TIMEZONE)).astimezone(TIMEZONE)
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=TIMEZONE)
+    return max(midnight.timestamp() - now.timestamp(), 0.0)
+
+
+class RankedBoard:
+    """Scores kept sorted as (-score, username, email) keys.
+
+    `keys` is a SortedList, so an update, a rank or position lookup and
+    indexing into the board are all O(log n).
+    """
+
+    def __init__(self):
+        self.keys: SortedList = SortedList()
+        self.by_email: Dict[str, Tuple[int, str, str]] = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def set(self, email: str, username: str, score: int) -> bool:
+        """Place `email` at `score`; returns False when nothing changed."""
+        key = (-score, username or "", email)
+        old = self.by_email.get(email)
+        if old == key:
+            return False
+        if old is not None:
+            self.keys.remove(old)
+        self.keys.add(key)
+        self.by_email[email] = key
+        return True
+
+    def remove(self, email: str) -> bool:
+        old = self.by_email.pop(email, None)
+        if old is None:
+            return False
+        self.keys.remove(old)
+        return True
+
+    def score(self, email: str) -> Optional[int]:
+        key = self.by_email.get(email)
+        return None if key is None else -key[0]
+
+    def rank_of_score(self, score: int) -> int:
+        """1-based competition rank: equal scores share a rank."""
+        return self.keys.bisect_left((-score,)) + 1
+
+    def position(self, email: str) -> Optional[int]:
+        key = self.by_email.get(email)
+        return None if key is None else self.keys.index(key)
+
+    def slice(self, start: int, stop: int) -> List[Tuple[int, str, str, int]]:
+        """Return (rank, username, email, score) for positions [start, stop)."""
+        return [(self.rank_of_score(-key[0]), key[1], key[2], -key[0])
+                for key in self.keys.islice(max(start, 0), max(start, stop, 0))]
+
+
+class LeaderboardIndex:
+    """In-memory per-exercise and combined rankings for every scope.
+
+    Loaded once from the `leaderboard` table and kept current by feeding
+    every written row back through `upsert`. Each worker process holds its
+    own copy, so it is reloaded every `refresh_seconds`, and on a new day,
+    to pick up writes made by other workers.
+
+    The week and month scopes are today's points plus the finalized part
+    of the window, read from the `leaderboard-periods` rows the daily
+    rollover materializes, so no history is scanned per request. Boards
+    for closed calendar months are loaded on demand by `ensure_period`.
+
+    `version` moves whenever a board changes, and `memo` caches values
+    derived from the boards (such as the encoded snapshot) until it does.
+    """
+
+    refresh_seconds = settings.leaderboard_refresh_seconds
+    period_cache_size = settings.leaderboard_period_cache_size
+
+    def __init__(self):
+        self.entries: Dict[str, Dict] = {}
+        self.boards: Dict[Tuple[str, str], RankedBoard] = {}
+        # scope -> email -> points of the rolling window finalized before today
+        self.bases: Dict[str, Dict[str, Dict[str, int]]] = {}
+        # "YYYY-MM" -> email -> points for that calendar month, the most recently used months only
+        self.periods = TTLCache(maxsize=self.period_cache_size)
+        self.day: Optional[str] = None
+        self.loaded_at: Optional[float] = None
+        self.lock = asyncio.Lock()
+        self.version = 0
+        self.memos: Dict = {}
+        self.memo_version = -1
+        self._reset_boards()
+
+    def memo(self, key, build: Callable[[], Any]) -> Any:
+        """Return `build()` for `key`, cached until the boards next change."""
+        if self.memo_version != self.version:
+            self.memos = {}
+            self.memo_version = self.version
+        if key not in self.memos:
+            self.memos[key] = build()
+        return self.memos[key]
+
+    def _reset_boards(self, scopes=SCOPES):
+        self.version += 1
+        for scope in scopes:
+            for exercise in EXERCISES + (COMBINED,):
+                self.boards[(scope, exercise)] = RankedBoard()
+
+    def _fresh(self) -> bool:
+        return self.loaded_at is not None and time.monotonic() - self.loaded_at < self.refresh_seconds
+
+    def invalidate(self):
+        """Reload on the next `ensure_loaded`, e.g. once the rollover rebuilt the periods."""
+        self.loaded_at = None
+        self.version += 1
+        self.periods.clear()
+        self._drop_period_boards()
+
+    def _drop_period_boards(self):
+        """Forget the boards of months no longer in `periods`."""
+        for scope, exercise in [key for key in self.boards if key[0] not in SCOPES and key[0] not in self.periods]:
+            del self.boards[(scope, exercise)]
+
+    async def ensure_loaded(self, db, today: str, buffer=None):
+        """Load or refresh from the store; `buffer` (a `ScoreBuffer`) overlays points not yet written."""
+        self.roll_over(today)
+        if self._fresh():
+            return
+        async with self.lock:
+            if self._fresh():
+                return
+
+            def load():
+                return asyncio.gather(db.list_leaderboard(),
+                                      *(db.list_leaderboard_periods(period) for period, _ in ROLLING_PERIODS.values()))
+
+            rows, *periods = await (buffer.read(load) if buffer else load())
+            yesterday = shift_day(today, -1)
+            # Rows finalized for an older day would double count, so they wait for the rollover.
+            self.bases = {scope: {row["email"]: row["points"] for row in period_rows if str(row["as_of"]) == yesterday}
+                          for scope, period_rows in zip(ROLLING_PERIODS, periods)}
+            self.entries = {}
+            self._reset_boards()
+            self.day = today
+            for row in rows:
+                self.upsert(buffer.merge(row) if buffer else row, today)
+            self.loaded_at = time.monotonic()
+
+    def roll_over(self, today: str):
+        """Empty the day-based boards once the date moves on and reload the rest."""
+        if self.day == today:
+            return
+        if self.day is not None:
+            self.loaded_at = None
+        self.day = today
+        self._reset_boards(("today",) + tuple(ROLLING_PERIODS))
+
+    def _set(self, scope: str, email: str, username: Optional[str], points: Optional[Dict]):
+        if points is None:
+            changed = [self.boards[(scope, exercise)].remove(email) for exercise in EXERCISES + (COMBINED,)]
+        else:
+            changed = [self.boards[(scope, exercise)].set(email, username, points.get(exercise, 0)) for exercise in EXERCISES]
+            changed.append(self.boards[(scope, COMBINED)].set(email, username, sum(points.get(exercise, 0) for exercise in EXERCISES)))
+        if any(changed):
+            self.version += 1
+
+    def upsert(self, row: Dict, today: str):
+        """Index one `leaderboard` row (email, username, total_points, today_points, last_updated)."""
+        self.roll_over(today)
+        email = row["email"]
+        entry = self.entries.setdefault(email, {})
+        entry.update({k: row[k] for k in ("username", "total_points", "today_points", "last_updated") if k in row})
+        today_points = entry.get("today_points") if entry.get("last_updated") == today else None
+        for scope in ROLLING_PERIODS:
+            base = self.bases.get(scope, {}).get(email)
+            entry[SCOPE_POINTS[scope]] = None if base is None and today_points is None else {
+                exercise: (base or {}).get(exercise, 0) + (today_points or {}).get(exercise, 0) for exercise in EXERCISES}
+        for scope in SCOPES:
+            points = today_points if scope == "today" else entry.get(SCOPE_POINTS[scope])
+            if scope == "overall":
+                points = points or {}
+            self._set(scope, email, entry.get("username"), points)
+
+    async def ensure_period(self, db, period: str):
+        """Load the materialized board of a calendar month (YYYY-MM), keeping the `period_cache_size` most recent."""
+        if period in self.periods:
+            return
+        rows = await db.list_leaderboard_periods(period)
+        self._reset_boards((period,))
+        points_by_email = {row["email"]: row["points"] for row in rows}
+        self.periods.set(period, points_by_email)
+        self._drop_period_boards()
+        for email, points in points_by_email.items():
+            self._set(period, email, self.entries.get(email, {}).get("username"), points)
+
+    def apply(self, email: str, exercise: str, score: int, today: str) -> Dict:
+        """Add `score` points to an indexed user and return the updated entry."""
+        entry = self.entries[email]
+        total_points = dict(entry.get("total_points") or {})
+        today_points = dict(entry.get("today_points") or {}) if entry.get("last_updated") == today else {e: 0 for e in EXERCISES}
+        total_points[exercise] = total_points.get(exercise, 0) + score
+        today_points[exercise] = today_points.get(exercise, 0) + score
+        self.upsert({"email": email, "total_points": total_points, "today_points": today_points, "last_updated": today}, today)
+        return {"email": email, **self.entries[email]}
+
+    def board(self, scope: str, exercise: Optional[str]) -> RankedBoard:
+        return self.boards[(scope, exercise or COMBINED)]
+
+    def _points(self, scope: str, email: str) -> Optional[Dict]:
+        if scope in SCOPE_POINTS:
+            return self.entries.get(email, {}).get(SCOPE_POINTS[scope])
+        return self.periods.get(scope, {}).get(email)
+
+    def _format(self, scope: str, items) -> List[Dict]:
+        return [{"rank": rank,
+                 "username": username,
+                 "score": score,
+                 "points": self._points(scope, email)}
+                for rank, username, email, score in items]
+
+    def top(self, scope: str, exercise: Optional[str], limit: int, offset: int = 0) -> List[Dict]:
+        return self._format(scope, self.board(scope, exercise).slice(offset, offset + limit))
+
+    def top_by_email(self, scope: str, exercise: Optional[str], limit: int) -> List[Tuple[str, Dict]]:
+        """`top` rows paired with the email each belongs to, for callers that track rows by user."""
+        items = self.board(scope, exercise).slice(0, limit)
+        return [(item[2], row) for item, row in zip(items, self._format(scope, items))]
+
+    def around(self, email: str, scope: str, exercise: Optional[str], neighbours: int) -> List[Dict]:
+        position = self.board(scope, exercise).position(email)
+        if position is None:
+            return []
+        return self._format(scope, self.board(scope, exercise).slice(position - neighbours, position + neighbours + 1))
+
+    def rank(self, email: str, scope: str, exercise: Optional[str]) -> Optional[Dict]:
+        board = self.board(scope, exercise)
+        score = board.score(email)
+        if score is None:
+            return None
+        return {"rank": board.rank_of_score(score), "score": score, "total": len(board)}
+
+    def snapshot(self) -> Dict:
+        """Full boards in the legacy `overall_leaderboard`/`today_leaderboard` shape, best first."""
+        data = {}
+        for scope in ("overall", "today"):
+            column = SCOPE_POINTS[scope]
+            data[f"{scope}_leaderboard"] = [{"username": username, column: self.entries[email].get(column)}
+                                           for _, username, email, _ in self.board(scope, None).slice(0, len(self.board(scope, None)))]
+        return data
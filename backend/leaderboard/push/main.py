@@ -0,0 +1,217 @@
+import os
+import hmac
+import asyncio
+import logging
+import hashlib
+from functools import cached_property
+from typing import Optional, Dict, List, Set, Tuple
+from leaderboard.main import local_today
+from utils.response.main import dumps
+from config.settings.main import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class PushMessage:
+    """One broadcast payload, encoded at most once per transport and shared by every subscriber."""
+
+    def __init__(self, payload: Dict):
+        self.payload = payload
+
+    @cached_property
+    def body(self) -> bytes:
+        return dumps(self.payload)
+
+    @cached_property
+    def text(self) -> str:
+        return self.body.decode("utf-8")
+
+    @cached_property
+    def sse(self) -> bytes:
+        return b"event: " + self.payload["type"].encode("ascii") + b"\ndata: " + self.body + b"\n\n"
+
+
+class Subscriber:
+    """A connected client's bounded queue of messages.
+
+    A client that falls `queue_size` messages behind loses its backlog and
+    gets a fresh snapshot instead (a `None` in the queue), so a slow
+    reader never holds up the broadcaster or grows memory.
+    """
+
+    def __init__(self, channel: "Channel", queue_size: int):
+        self.channel = channel
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.resyncs = 0
+
+    def offer(self, message: PushMessage):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+            self.resyncs += 1
+
+    async def next(self, timeout: float) -> Optional[PushMessage]:
+        """The next message to send, or None when only a heartbeat is due."""
+        try:
+            message = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return self.channel.snapshot() if message is None else message
+
+
+class Channel:
+    """The top rows of one (scope, exercise) board as last published.
+
+    Rows are tracked by an opaque per-user id, so a user moving up only
+    changes `order` and `ranks` for everyone else and sends their own row.
+    """
+
+    def __init__(self, scope: str, exercise: Optional[str]):
+        self.scope = scope
+        self.exercise = exercise
+        self.order: List[str] = []
+        self.ranks: List[int] = []
+        self.rows: Dict[str, Dict] = {}
+        self.total = 0
+        self.version = -1
+        self.subscribers: Set[Subscriber] = set()
+        self.snapshot_message: Optional[PushMessage] = None
+
+    def snapshot(self) -> PushMessage:
+        if self.snapshot_message is None:
+            rows = [{"id": row_id, "rank": rank, **self.rows[row_id]} for row_id, rank in zip(self.order, self.ranks)]
+            self.snapshot_message = PushMessage({"type": "snapshot", "version": self.version, "scope": self.scope,
+                                                 "exercise": self.exercise, "total": self.total, "rows": rows})
+        return self.snapshot_message
+
+    def update(self, rows: List[Tuple[str, Dict]], total: int, version: int) -> Optional[PushMessage]:
+        """Adopt the current rows as (id, row); return the diff message, or None when nothing visible changed."""
+        order = [row_id for row_id, _ in rows]
+        ranks = [row["rank"] for _, row in rows]
+        current = {row_id: {k: v for k, v in row.items() if k != "rank"} for row_id, row in rows}
+        payload = {"type": "diff", "version": version, "total": total}
+        if order != self.order or ranks != self.ranks:
+            payload["order"], payload["ranks"] = order, ranks
+        changed = {row_id: row for row_id, row in current.items() if self.rows.get(row_id) != row}
+        if changed:
+            payload["rows"] = changed
+        unchanged = total == self.total and len(payload) == 3
+        self.order, self.ranks, self.rows, self.total, self.version = order, ranks, current, total, version
+        if unchanged:
+            return None
+        self.snapshot_message = None
+        return PushMessage(payload)
+
+
+class LeaderboardPush:
+    """Pushes leaderboard changes to subscribed clients as small diffs.
+
+    `notify` marks the boards as changed; changes arriving within
+    `interval_ms` are coalesced into one publish. Each publish compares the
+    top `top` rows of every subscribed board with what was sent last and
+    fans one shared encoded diff (new order and ranks, changed rows) out
+    to its subscribers. Every `tick_seconds` the index is also refreshed, so
+    points written by other workers reach clients on the index's own
+    refresh schedule.
+    """
+
+    interval_ms = settings.leaderboard_push_interval_ms
+    tick_seconds = settings.leaderboard_push_tick_seconds
+    top = settings.leaderboard_push_top
+    queue_size = settings.leaderboard_push_queue_size
+    max_subscribers = settings.leaderboard_push_max_subscribers
+    heartbeat_seconds = settings.leaderboard_push_heartbeat_seconds
+
+    def __init__(self):
+        self.channels: Dict[Tuple[str, Optional[str]], Channel] = {}
+        self.subscriber_count = 0
+        self.changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.db = None
+        self.index = None
+        self.score_buffer = None
+        self.published_version = -1
+        self.row_ids: Dict[str, str] = {}
+        self.id_key = os.urandom(16)
+
+    def start(self, db, index, score_buffer):
+        self.db = db
+        self.index = index
+        self.score_buffer = score_buffer
+        self.changed = asyncio.Event()
+        self.task = asyncio.create_task(self._run())
+
+    def notify(self):
+        self.changed.set()
+
+    def subscribe(self, scope: str, exercise: Optional[str]) -> Subscriber:
+        """Register a client; its first message should be `subscriber.channel.snapshot()`."""
+        if self.subscriber_count >= self.max_subscribers:
+            raise OverflowError("Too many leaderboard subscribers")
+        channel = self.channels.get((scope, exercise))
+        if channel is None:
+            channel = self.channels[(scope, exercise)] = Channel(scope, exercise)
+            self._refresh(channel)
+        subscriber = Subscriber(channel, self.queue_size)
+        channel.subscribers.add(subscriber)
+        self.subscriber_count += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        channel = subscriber.channel
+        if subscriber in channel.subscribers:
+            channel.subscribers.discard(subscriber)
+            self.subscriber_count -= 1
+        if not channel.subscribers:
+            self.channels.pop((channel.scope, channel.exercise), None)
+
+    def row_id(self, email: str) -> str:
+        """Stable id for a user's row that does not reveal the email."""
+        row_id = self.row_ids.get(email)
+        if row_id is None:
+            row_id = self.row_ids[email] = hmac.new(self.id_key, email.encode("utf-8"), hashlib.blake2b).hexdigest()[:12]
+        return row_id
+
+    def _refresh(self, channel: Channel) -> Optional[PushMessage]:
+        rows = [(self.row_id(email), row) for email, row in self.index.top_by_email(channel.scope, channel.exercise, self.top)]
+        return channel.update(rows, len(self.index.board(channel.scope, channel.exercise)), self.index.version)
+
+    def publish(self):
+        if self.index.version == self.published_version:
+            return
+        self.published_version = self.index.version
+        for channel in list(self.channels.values()):
+            message = self._refresh(channel)
+            if message is None:
+                continue
+            for subscriber in channel.subscribers:
+                subscriber.offer(message)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.changed.wait(), self.tick_seconds)
+                await asyncio.sleep(self.interval_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self.changed.clear()
+            if not self.channels:
+                continue
+            try:
+                await self.index.ensure_loaded(self.db, local_today(), self.score_buffer)
+                self.publish()
+            except Exception:
+                logger.exception("Leaderboard push failed")
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
@@ -0,0 +1,62 @@
+import asyncio
+import logging
+from typing import Optional
+from leaderboard.main import local_today, shift_day, seconds_until_next_day
+from config.settings.main import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderboardRollover:
+    """Finalizes each leaderboard day once it ends in APP_TIMEZONE.
+
+    At startup and `grace_seconds` after every local midnight it flushes
+    the score buffer, runs `roll_over_leaderboard` for the day that
+    just ended and makes the index reload the rebuilt period totals. The
+    rollover recomputes the periods from the history table, so every
+    worker may run it without coordination.
+    """
+
+    grace_seconds = settings.leaderboard_rollover_grace_seconds
+    retry_seconds = settings.leaderboard_rollover_retry_seconds
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.db = None
+        self.score_buffer = None
+        self.index = None
+        self.last_day: Optional[str] = None
+
+    def start(self, db, score_buffer, index):
+        self.db = db
+        self.score_buffer = score_buffer
+        self.index = index
+        self.task = asyncio.create_task(self._run())
+
+    async def roll_over(self, day: Optional[str] = None):
+        """Finalize `day` (default: yesterday) and rebuild the 7-day, 30-day and month totals."""
+        day = day or shift_day(local_today(), -1)
+        await self.score_buffer.flush()
+        await self.db.roll_over_leaderboard(day)
+        self.last_day = day
+        self.index.invalidate()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.roll_over()
+                delay = seconds_until_next_day() + self.grace_seconds
+            except Exception:
+                logger.exception("Leaderboard rollover failed, retrying")
+                delay = self.retry_seconds
+            await asyncio.sleep(delay)
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
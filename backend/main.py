@@ -1,170 +1,384 @@
-from fastapi import FastAPI, HTTPException, Depends
-from fastapi.responses import JSONResponse
-from fastapi.encoders import jsonable_encoder
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Annotated
 from pydantic import BaseModel
-import jwt
-from jwt import PyJWTError
-import bcrypt
-from database.main import Database
-from schema.main import TokenData, UserRegister, UserLogin, UserProfile, UserUpdateProfile, LeaderboardEntry
+from starlette.background import BackgroundTask
+from database.main import create_database
+from schema.main import TokenData, UserRegister, UserLogin, UserProfile, UserUpdateProfile, LeaderboardEntry, WorkoutFrames
 from template.mail.main import MAIL_TEMPLATE
 from config.mail.main import MAIL_SERVER
 from config.bot.main import GROQ_SERVER
+from config.auth.main import AUTH_SERVER
+from config.password.main import PASSWORD_SERVER
+from config.settings.main import settings
 from utils.main import Utils
-import os
-from dotenv import load_dotenv
-from bson import ObjectId
-import json
-from fastapi.middleware.cors import CORSMiddleware
+from utils.cache.main import RowCache
+from utils.stream.main import server_sent_event
+from utils.response.main import FastJSONResponse, conditional_response, dumps, etag
+from utils.metrics.main import Metrics, MetricsMiddleware, SamplingProfiler
+from utils.limiter.main import Limiter, MemoryBackend, RedisBackend, ConcurrencyLimit, LimitExceeded, Overloaded
+from leaderboard.main import LeaderboardIndex, EXERCISES, SCOPES, local_today, shift_day, parse_month
+from leaderboard.buffer.main import ScoreBuffer
+from leaderboard.rollover.main import LeaderboardRollover
+from leaderboard.push.main import LeaderboardPush
+from recommendation.main import RecommendationService
+from recommendation.worker.main import PlanPrecomputer
+from workout.engine.main import RepEngine
+from workout.codec.main import encode_session, decode_session, LandmarkCodecError
+from workout.store.main import SessionStore, SessionStoreError, SessionLive
+from export.main import DATASETS, FORMATS, export
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import hmac
+import logging
+import time
+import numpy as np
 
 
 
-load_dotenv()
-app = FastAPI()
-db = Database()
+logger = logging.getLogger(__name__)
+db = create_database()
 mail = MAIL_SERVER()
 mail_template = MAIL_TEMPLATE()
 groq = GROQ_SERVER()
+auth = AUTH_SERVER()
+passwords = PASSWORD_SERVER()
+leaderboard_index = LeaderboardIndex()
+score_buffer = ScoreBuffer()
+leaderboard_rollover = LeaderboardRollover()
+leaderboard_push = LeaderboardPush()
 utility = Utils()
+recommendations = RecommendationService(groq, utility)
+plan_precomputer = PlanPrecomputer(recommendations)
+rep_engine = RepEngine(min_visibility=settings.workout_min_visibility)
+session_store = SessionStore()
+profile_rows = RowCache(maxsize=settings.row_cache_size, ttl=settings.row_cache_ttl)
+leaderboard_rows = RowCache(maxsize=settings.row_cache_size, ttl=settings.row_cache_ttl)
+metrics = Metrics()
+profiler = SamplingProfiler(interval=settings.profiler_interval_ms / 1000)
+
+
+def bearer_email(request: Request) -> Optional[str]:
+    """Email in a valid bearer token, used to key per-user rate limits."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    token_data = auth.verify_token(token) if scheme.lower() == "bearer" and token else None
+    return token_data and token_data.email
+
+
+limiter = Limiter(
+    backend=RedisBackend(settings.limiter_redis_url) if settings.limiter_redis_url else MemoryBackend(),
+    classes={
+        "bcrypt": ConcurrencyLimit("bcrypt", settings.limit_bcrypt_concurrency, settings.limit_queue_timeout, settings.limit_max_waiting),
+        "llm": ConcurrencyLimit("llm", settings.limit_llm_concurrency, settings.limit_queue_timeout, settings.limit_max_waiting),
+    },
+    identify=bearer_email,
+    trust_forwarded=settings.limiter_trust_forwarded,
+)
+
+
+def index_leaderboard_rows(rows: List[Dict]):
+    today = local_today()
+    for row in rows:
+        leaderboard_rows.set(row)
+        leaderboard_index.upsert(score_buffer.merge(row), today)
+    leaderboard_push.notify()
+
+
+def cache_profile_rows(rows: List[Dict]):
+    for row in rows:
+        profile_rows.set(row)
+
+
+class PayloadTooLarge(Exception):
+    pass
+
+
+async def read_body(request: Request, limit: int) -> bytes:
+    """The request body, refused as soon as the declared or received size passes `limit` bytes."""
+    declared = request.headers.get("content-length")
+    if declared is not None and declared.isdigit() and int(declared) > limit:
+        raise PayloadTooLarge(f"Payload is larger than {limit} bytes")
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise PayloadTooLarge(f"Payload is larger than {limit} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+async def compact_sessions_periodically():
+    """Fold stored workout sessions older than WORKOUT_SESSION_COMPACT_AFTER_DAYS into month segments, once a day."""
+    while True:
+        cutoff = shift_day(local_today(), -settings.workout_session_compact_after_days)
+        try:
+            await run_in_threadpool(session_store.compact, cutoff)
+        except Exception:
+            pass
+        await asyncio.sleep(24 * 60 * 60)
+
+
+async def warm_up():
+    """Open a pooled database connection before traffic arrives.
+
+    A failure is logged rather than raised, so a misconfigured service
+    shows up in /api/check/ready instead of keeping the app from starting.
+    """
+    try:
+        await asyncio.wait_for(db.check_connection(), settings.startup_warmup_timeout)
+    except Exception:
+        logger.exception("Database warm-up failed")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await warm_up()
+    mail.start()
+    score_buffer.start(db, on_rows=index_leaderboard_rows)
+    leaderboard_rollover.start(db, score_buffer, leaderboard_index)
+    plan_precomputer.start(db, on_rows=cache_profile_rows)
+    leaderboard_push.start(db, leaderboard_index, score_buffer)
+    compaction = asyncio.create_task(compact_sessions_periodically())
+    yield
+    compaction.cancel()
+    await leaderboard_rollover.stop()
+    await leaderboard_push.stop()
+    await plan_precomputer.stop()
+    await score_buffer.drain()
+    await mail.drain()
+    await db.close()
+    await groq.close()
+    await limiter.close()
+    passwords.shutdown()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 
 origins = ["http://localhost:3001", "http://localhost:3000"]
 
 app.add_middleware(CORSMiddleware, allow_origins=origins, allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware, metrics=metrics, server_timing=settings.metrics_server_timing)
+
+
+@app.exception_handler(LimitExceeded)
+async def limit_exceeded_handler(request: Request, exc: LimitExceeded):
+    return FastJSONResponse(content={"message": f"{str(exc)}", "status": "error"}, status_code=exc.status_code, headers=exc.headers)
 
 
 @app.get("/")
 async def read_root():
     try :
-        return JSONResponse(content={"message": "Welcome to the Posture Perfect", "status": "success"}, status_code=200)
+        return FastJSONResponse(content={"message": "Welcome to the Posture Perfect", "status": "success"}, status_code=200)
     except Exception as e:
-        return JSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
 
     
-def verify_token(token: str, credentials_exception):
-    try:
-        payload = jwt.decode(token, os.getenv("JWT_SECRET"), algorithms=[os.getenv("JWT_ALGORITHM")])
-        username: str = payload.get("sub")
-        role: str = payload.get("role")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username, role=role)
-        return token_data
-    except PyJWTError:
-        raise credentials_exception
-    
-def get_current_user(token: str = Depends(OAuth2PasswordBearer(tokenUrl="api/auth/cms/login"))):
-    credentials_exception = HTTPException(
-        status_code=401, 
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"}
-        )
-    token_data = verify_token(token, credentials_exception)
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+
+def get_current_user(token: str = Depends(oauth2_scheme)) -> TokenData:
+    token_data = auth.verify_token(token)
     if token_data is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=401, 
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"}
+            )
     return token_data
 
-def generate_access_token(data: Dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire, "sub": data["sub"], "iss": "techverse", "iat": datetime.utcnow(), "nbf": datetime.utcnow()})
-    encoded_jwt = jwt.encode(to_encode, os.getenv("JWT_SECRET"), algorithm=os.getenv("JWT_ALGORITHM"), headers={"typ": "JWT", "alg": os.getenv("JWT_ALGORITHM")})
-    return encoded_jwt
+CurrentUser = Annotated[TokenData, Depends(get_current_user)]
 
 
 @app.get("/api/check/connection")
 async def check_connection():
     try:
-        db.check_connection()
-        return JSONResponse(content={"message": "successfully connected", "status": "success"}, status_code=200)
+        await db.check_connection()
+        return FastJSONResponse(content={"message": "successfully connected", "status": "success"}, status_code=200)
     except Exception as e:
-        return JSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
     
 
-@app.post("/api/auth/register")
+async def timed_check(check) -> Dict:
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(check(), settings.readiness_timeout)
+        result = {"status": "ok"}
+    except Exception as e:
+        result = {"status": "error", "error": f"{str(e) or type(e).__name__}"}
+    result["latency_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return result
+
+
+def task_running(task: Optional[asyncio.Task]) -> bool:
+    return task is not None and not task.done()
+
+
+@app.get("/api/check/ready")
+async def check_ready():
+    """Per-dependency readiness; 503 unless the database and the score writer are up."""
+    try:
+        database = await timed_check(db.check_connection)
+        dependencies = {
+            "database": database,
+            "score_buffer": {"status": "ok" if task_running(score_buffer.task) else "error", "pending": score_buffer.pending_count},
+            "leaderboard_rollover": {"status": "ok" if task_running(leaderboard_rollover.task) else "error", "last_day": leaderboard_rollover.last_day},
+            "mail": {"status": "ok" if mail.host and task_running(mail.task) else "error",
+                     "queued": mail.queue.qsize() if mail.queue else 0, "sent": mail.sent, "failed": mail.failed},
+            "llm": {"status": "ok" if groq.groq_api_key else "error", "client": "created" if groq.client else "lazy"},
+            "recommendations": {"status": "ok" if plan_precomputer.tasks and all(task_running(task) for task in plan_precomputer.tasks) else "error",
+                                "queued": len(plan_precomputer.queued), "generated": plan_precomputer.generated, "failed": plan_precomputer.failed},
+            "passwords": {"status": "ok", "pending": passwords.pending},
+            "leaderboard_push": {"status": "ok" if task_running(leaderboard_push.task) else "error",
+                                 "subscribers": leaderboard_push.subscriber_count, "channels": len(leaderboard_push.channels)},
+            "row_cache": {"status": "ok", "user-profile": profile_rows.stats(), "leaderboard": leaderboard_rows.stats()},
+            "limiter": {"status": "ok", "rate_limited": limiter.rejected,
+                        **{name: {"active": cap.active, "waiting": cap.waiting, "shed": cap.shed} for name, cap in limiter.classes.items()}},
+        }
+        ready = all(dependencies[name]["status"] == "ok" for name in ("database", "score_buffer"))
+        return FastJSONResponse(content={"message": "ready" if ready else "not ready", "data": dependencies, "status": "success" if ready else "error"},
+                                status_code=200 if ready else 503)
+    except Exception as e:
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Request and per-phase histograms in the Prometheus text format."""
+    if not settings.metrics_enabled:
+        return FastJSONResponse(content={"message": "Metrics are disabled", "status": "error"}, status_code=404)
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def admin_credentials_error(request: Request) -> Optional[FastJSONResponse]:
+    """The 401 to answer unless the request carries `Authorization: Bearer <EXPORT_TOKEN>`."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode("utf-8"), settings.export_token.encode("utf-8")):
+        return FastJSONResponse(content={"message": "Could not validate credentials", "status": "error"}, status_code=401,
+                                headers={"WWW-Authenticate": "Bearer"})
+    return None
+
+
+@app.get("/metrics/profile", include_in_schema=False)
+async def profile_endpoint(request: Request, seconds: float = Query(10, gt=0)):
+    """Sample the event loop for `seconds` and return collapsed stacks for a flame graph; admin only, like the export."""
+    try:
+        if not settings.profiler_enabled or not settings.export_token:
+            return FastJSONResponse(content={"message": "Profiler is disabled", "status": "error"}, status_code=404)
+        unauthorized = admin_credentials_error(request)
+        if unauthorized:
+            return unauthorized
+        if profiler.running:
+            return FastJSONResponse(content={"message": "A profile is already being taken", "status": "error"}, status_code=409)
+        profiler.start()
+        try:
+            await asyncio.sleep(min(seconds, settings.profiler_max_seconds))
+        finally:
+            profiler.stop()
+        return Response(content=profiler.collapsed(), media_type="text/plain")
+    except Exception as e:
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+
+
+@app.get("/api/admin/export/{dataset}", include_in_schema=False)
+async def export_dataset(request: Request, dataset: str, format: str = Query("ndjson"), since: Optional[str] = Query(None),
+                         page_size: int = Query(settings.export_page_size, gt=0, le=10000)):
+    """Stream profiles, plans or points as NDJSON or CSV; X-Export-Watermark is the `since` of the next incremental run."""
+    try:
+        if not settings.export_token:
+            return FastJSONResponse(content={"message": "Export is disabled", "status": "error"}, status_code=404)
+        unauthorized = admin_credentials_error(request)
+        if unauthorized:
+            return unauthorized
+        if dataset not in DATASETS:
+            return FastJSONResponse(content={"message": f"Unknown dataset {dataset}", "status": "error"}, status_code=404)
+        if format not in FORMATS:
+            return FastJSONResponse(content={"message": f"Unknown format {format}", "status": "error"}, status_code=400)
+        watermark = DATASETS[dataset].watermark()
+        return StreamingResponse(export(db, DATASETS[dataset], format, since, page_size), media_type=FORMATS[format],
+                                 headers={"X-Export-Watermark": watermark, "Cache-Control": "no-store",
+                                          "Content-Disposition": f'attachment; filename="{dataset}.{format}"'})
+    except Exception as e:
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+
+
+@app.post("/api/auth/register", dependencies=[limiter.limit("auth", per_ip=settings.limit_auth_per_ip, cost="bcrypt")])
 async def register_user(user: UserRegister):
     try:
         if user.email is None or user.username is None or user.password is None:
-            return JSONResponse(content={"message": "Please provide all required fields", "status": "error"}, status_code=400)
-        hashed_password = bcrypt.hashpw(user.password.encode("utf-8"), bcrypt.gensalt())
+            return FastJSONResponse(content={"message": "Please provide all required fields", "status": "error"}, status_code=400)
         user_data = {
             "email": str(user.email),
             "username": str(user.username),
-            "password": hashed_password.decode("utf-8"),
         }
-        get_user = (db.db.table("auth-users")
-                    .select("email")
-                    .eq("email", user_data["email"])
-                    .execute())
-        if get_user.data:
-            return JSONResponse(content={"message": "User already exists", "status": "error"}, status_code=400)
+        get_user = await db.user_by_email(user_data["email"])
+        if get_user:
+            return FastJSONResponse(content={"message": "User already exists", "status": "error"}, status_code=400)
+        user_data["password"] = await passwords.hash_password(user.password)
         try:
-            response = (db.db.table("auth-users")
-                        .insert({"email": user_data["email"], "username": user_data["username"], "password": user_data["password"]})
-                        .execute())
+            response = await db.create_user({"email": user_data["email"], "username": user_data["username"], "password": user_data["password"]})
             if response:
-                return JSONResponse(content={"message": "User registered successfully", "status": "success"}, status_code=201)
+                return FastJSONResponse(content={"message": "User registered successfully", "status": "success"}, status_code=201)
             else:
-                return JSONResponse(content={"message": "Failed to register user", "status": "error"}, status_code=500)
+                return FastJSONResponse(content={"message": "Failed to register user", "status": "error"}, status_code=500)
         except Exception as e:
-            return JSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+            return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
     except Exception as e:
-        return JSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
     
     
 
-@app.post("/api/auth/login")
+@app.post("/api/auth/login", dependencies=[limiter.limit("auth", per_ip=settings.limit_auth_per_ip, cost="bcrypt")])
 async def login_user(user: UserLogin):
     try:
         if user.email is None or user.password is None:
-            return JSONResponse(content={"message": "Please provide all required fields", "status": "error"}, status_code=400)
+            return FastJSONResponse(content={"message": "Please provide all required fields", "status": "error"}, status_code=400)
         user_data = {
             "email": str(user.email),
             "password": str(user.password)
         }
-        get_user = (db.db.table("auth-users")
-                    .select("*")
-                    .eq("email", user_data["email"])
-                    .execute())
-        if not get_user.data:
-            return JSONResponse(content={"message": "User does not exist", "status": "error"}, status_code=400)
+        get_user = await db.user_by_email(user_data["email"])
+        if not get_user:
+            return FastJSONResponse(content={"message": "User does not exist", "status": "error"}, status_code=400)
         
-        get_user = get_user.data[0]
-        if bcrypt.checkpw(user_data["password"].encode("utf-8"), get_user["password"].encode("utf-8")):
-            access_token_expires = timedelta(minutes=int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES")))
-            access_token = generate_access_token(data={"sub": get_user["id"]}, expires_delta=access_token_expires)
-            return JSONResponse(content={"message": "User Loginned successfully", "data": access_token, "status" : "success"}, status_code=200)
+        if await passwords.verify_password(user_data["password"], get_user["password"]):
+            rehash = None
+            if passwords.needs_rehash(get_user["password"]):
+                rehash = BackgroundTask(rehash_password, get_user["email"], user_data["password"])
+            access_token = auth.generate_access_token(data={"sub": get_user["id"],
+                                                            "email": get_user["email"],
+                                                            "username": get_user["username"],
+                                                            "created_at": get_user.get("created_at")})
+            return FastJSONResponse(content={"message": "User Loginned successfully", "data": access_token, "status" : "success"}, status_code=200, background=rehash)
         else:
-            return JSONResponse(content={"message": "Invalid credentials", "status": "error"}, status_code=400)
+            return FastJSONResponse(content={"message": "Invalid credentials", "status": "error"}, status_code=400)
     except Exception as e:
-        return JSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+
+
+async def rehash_password(email: str, password: str):
+    """Re-hash a password with the configured bcrypt cost after a successful login."""
+    try:
+        # Runs after the login response, outside the route's own bcrypt slot.
+        async with limiter.classes["bcrypt"].slot():
+            hashed_password = await passwords.hash_password(password)
+        await db.update_user(email, {"password": hashed_password})
+    except Overloaded:
+        pass
     
 
 
 @app.post("/api/auth/personalize")
-async def personalize_user_profile(user: UserProfile, token: str = Depends(OAuth2PasswordBearer(tokenUrl="api/auth/login"))):
+async def personalize_user_profile(user: UserProfile, current_user: CurrentUser):
     try:
-        token_data = get_current_user(token)
-        get_user = (db.db.table("auth-users")
-                    .select("email", "username")
-                    .eq("id", token_data.username)
-                    .execute())
-        if not get_user.data:
-            return JSONResponse(content={"message": "User does not exist", "status": "error"}, status_code=400)
-        get_user_email = get_user.data[0]["email"]
-        get_username = get_user.data[0]["username"]
-        search_user = (db.db.table("user-profile")
-                          .select("email")
-                            .eq("email", get_user_email)
-                            .execute())
-        if search_user.data and search_user.data[0]:
-            return JSONResponse(content={"message": "User profile already exists", "status": "error"}, status_code=400)
+        get_user_email = current_user.email
+        get_username = current_user.username
+        search_user = await profile_rows.get(db.get_profile, get_user_email)
+        if search_user:
+            return FastJSONResponse(content={"message": "User profile already exists", "status": "error"}, status_code=400)
         user_data = {
             "your_gender": user.your_gender,
             "weight": user.weight,
@@ -178,233 +392,420 @@ async def personalize_user_profile(user: UserProfile, token: str = Depends(OAuth
             "what_time_of_day_you_will_workout": user.what_time_of_day_you_will_workout,
             "email": get_user_email
         }
-        points_schema = { "Pushups" : 0, "Squats" : 0, "Crunches" : 0, "Bicep Curls" : 0 }
+        points_schema = { exercise : 0 for exercise in EXERCISES }
         try:
-            response = (db.db.table("user-profile")
-                        .insert(user_data)
-                        .execute())
-            leaderboard = (db.db.table("leaderboard")
-                           .insert({"email": get_user_email,
-                                    "username": get_username,
-                                    "total_points": points_schema, 
-                                    "today_points": points_schema, 
-                                    "created_on": datetime.now().strftime("%Y-%m-%d"), 
-                                    "last_updated": datetime.now().strftime("%Y-%m-%d")})
-                           .execute())
-            if response.data and leaderboard.data and response.data[0] and leaderboard.data[0]:
-                return JSONResponse(content={"message": "User profile added successfully", "status": "success"}, status_code=201)
+            response, leaderboard = await asyncio.gather(
+                db.create_profile(user_data),
+                db.create_leaderboard({"email": get_user_email,
+                                        "username": get_username,
+                                        "total_points": points_schema, 
+                                        "today_points": points_schema, 
+                                        "created_on": local_today(), 
+                                        "last_updated": local_today()}))
+            if response and leaderboard and response[0] and leaderboard[0]:
+                profile_rows.set(response[0])
+                leaderboard_rows.set(leaderboard[0])
+                leaderboard_index.upsert(leaderboard[0], local_today())
+                plan_precomputer.enqueue(get_user_email)
+                return FastJSONResponse(content={"message": "User profile added successfully", "status": "success"}, status_code=201)
             else:
-                return JSONResponse(content={"message": "Failed to personalize user profile", "status": "error"}, status_code=500)
+                return FastJSONResponse(content={"message": "Failed to personalize user profile", "status": "error"}, status_code=500)
         except Exception as e:
-            return JSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+            return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
     except Exception as e:
-        return JSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
     
 
 
-@app.get("/api/auth/workout/recommendation")
-async def get_workout_recommendation(token: str = Depends(OAuth2PasswordBearer(tokenUrl="api/auth/login"))):
+@app.get("/api/auth/workout/recommendation", dependencies=[limiter.limit("recommendation", per_user=settings.limit_recommendation_per_user)])
+async def get_workout_recommendation(current_user: CurrentUser):
     try:
-        token_data = get_current_user(token)
-        get_user = (db.db.table("auth-users")
-                    .select("email")
-                    .eq("id", token_data.username)
-                    .execute())
-        if not get_user.data[0]:
-            return JSONResponse(content={"message": "User does not exist", "status": "error"}, status_code=400)
-        get_user_email = get_user.data[0]["email"]
-        
-        search_user = (db.db.table("user-profile")
-                          .select("*")
-                            .eq("email", get_user_email)
-                            .execute())
-        if not search_user.data[0]:
-            return JSONResponse(content={"message": "User profile does not exist", "status": "error"}, status_code=400)
-        user_data = search_user.data[0]
-        dob = user_data['date_of_birth']
-        user_age = utility.calculate_age(dob)
-        query = f'''
-        A few questions were asked to personalize your workout recommendation. Here are the details:
-        1. User Gender: {user_data["your_gender"]}
-        2. User Weight: {user_data["weight"]}
-        3. User Height: {user_data["height"]}
-        4. User Age: {user_age}
-        5. Primary Goal for Exercising: {user_data["primary_goal_for_exercising"]}
-        6. How often user exercised at past: {user_data["how_often_exercised_at_past"]}
-        7. Workout Intensity user prefers: {user_data["workout_intensity"]}
-        8. Workout Duration user prefers: {user_data["workout_duration"]}
-        9. Days a week user will workout: {user_data["what_days_a_week_you_will_workout"]}
-        10. Time of day user will prefer for workout: {user_data["what_time_of_day_you_will_workout"]}
-        
-        Based on the above details, give how many 
-        1. Bicep Curls should user do in a day?
-        2. Pushups should user do in a day?
-        3. Squats should user do in a day?
-        4. Crunches should user do in a day?
-        
-        Use the below format for response:
-        {'{ "exercise_name": "name of the exercise", "exercise_reps": "number of reps", "exercise_sets": "number of sets", "duration": "duration of the exercise", "day": "day(s) of the week this exercise should be done"}'}
-        Make sure that the total workout duration for all exercises combined is equal to the user's preferred workout duration and add suitable unit to it. 
-        Give in an array format for each exercise. Only the exercises and no other details.
-        '''
-        response = await groq.ask(query)
-        try :
-            exercise_list = json.loads(response)
-            add_exercise = (db.db.table("user-profile")
-                            .update({"recommended_exercise_plan": exercise_list})
-                            .eq("email", get_user_email)
-                            .execute())
-            if add_exercise.data[0]['recommended_exercise_plan']:
-                return JSONResponse(content={"message": "Recommendation plan fetched successfully", "data": exercise_list, "status": "success"}, status_code=200)
-            else:
-                return JSONResponse(content={"message": "Failed to get workout recommendation", "status": "error"}, status_code=500)
-        except Exception as e:
-            return JSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+        get_user_email = current_user.email
+        user_data = await profile_rows.get(db.get_profile, get_user_email)
+        if not user_data:
+            return FastJSONResponse(content={"message": "User profile does not exist", "status": "error"}, status_code=400)
+        stored_plan = recommendations.stored_plan(user_data)
+        if stored_plan:
+            return FastJSONResponse(content={"message": "Recommendation plan fetched successfully", "data": stored_plan, "status": "success"}, status_code=200)
+        # Plans are made by the background precomputer; a miss only makes sure one is on its way.
+        if plan_precomputer.enqueue(get_user_email):
+            return FastJSONResponse(content={"message": "Recommendation plan is being generated", "status": "pending"}, status_code=202, headers={"Retry-After": "5"})
+        else:
+            return FastJSONResponse(content={"message": "Recommendation queue is full", "status": "error"}, status_code=503, headers={"Retry-After": "60"})
     except Exception as e:
-        return JSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
     
 
 
+@app.get("/api/auth/workout/recommendation/stream", dependencies=[limiter.limit("recommendation", per_user=settings.limit_recommendation_per_user)])
+async def stream_workout_recommendation(current_user: CurrentUser):
+    try:
+        get_user_email = current_user.email
+        user_data = await profile_rows.get(db.get_profile, get_user_email)
+        if not user_data:
+            return FastJSONResponse(content={"message": "User profile does not exist", "status": "error"}, status_code=400)
+    except Exception as e:
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+
+    async def events():
+        try:
+            stored_plan = recommendations.stored_plan(user_data)
+            if stored_plan:
+                for exercise in stored_plan:
+                    yield server_sent_event("exercise", exercise)
+                yield server_sent_event("done", {"message": "Recommendation plan fetched successfully", "status": "success"})
+                return
+            exercise_list = []
+            # The slot is held while the completion streams, which outlives the route's dependencies.
+            async with limiter.classes["llm"].slot():
+                async for exercise in recommendations.stream_plan(user_data):
+                    exercise_list.append(exercise)
+                    yield server_sent_event("exercise", exercise)
+            cache_profile_rows(await db.update_profile(get_user_email, {"recommended_exercise_plan": exercise_list, "recommendation_key": recommendations.key_for(user_data)}))
+            yield server_sent_event("done", {"message": "Recommendation plan fetched successfully", "status": "success"})
+        except Exception as e:
+            yield server_sent_event("error", {"message": f"{str(e)}", "status": "error"})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+
 @app.get("/api/auth/user/profile")
-async def get_user_profile(token: str = Depends(OAuth2PasswordBearer(tokenUrl="api/auth/login"))):
+async def get_user_profile(request: Request, current_user: CurrentUser):
     try:
-        token_data = get_current_user(token)
-        get_user = (db.db.table("auth-users")
-                    .select("email", "username", "created_at")
-                    .eq("id", token_data.username)
-                    .execute())
-        if not get_user.data:
-            return JSONResponse(content={"message": "User does not exist", "status": "error"}, status_code=400)
-        get_user_data = get_user.data[0]
-        get_leaderboard = (db.db.table("leaderboard")
-                           .select("total_points", "today_points")
-                           .eq("email", get_user_data["email"])
-                           .execute())
-        get_user_data["total_points"] = get_leaderboard.data and get_leaderboard.data[0]["total_points"]
-        get_user_data["today_points"] = get_leaderboard.data and get_leaderboard.data[0]["today_points"]        
-        return JSONResponse(content={"message": "User profile fetched successfully", "data": get_user_data, "status": "success"}, status_code=200)
+        get_user_data = {"email": current_user.email, "username": current_user.username, "created_at": current_user.created_at}
+        get_leaderboard = await score_buffer.read(leaderboard_rows.get, db.get_leaderboard, get_user_data["email"])
+        get_leaderboard = get_leaderboard and score_buffer.merge(get_leaderboard)
+        get_user_data["total_points"] = get_leaderboard and get_leaderboard["total_points"]
+        get_user_data["today_points"] = get_leaderboard and get_leaderboard["today_points"]
+        return conditional_response(request, {"message": "User profile fetched successfully", "data": get_user_data, "status": "success"})
     except Exception as e:
-        return JSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
     
 
 
 @app.get("/api/auth/user/workout/profile")
-async def get_user_profile(token: str = Depends(OAuth2PasswordBearer(tokenUrl="api/auth/login"))):
+async def get_user_profile(request: Request, current_user: CurrentUser):
     try:
-        token_data = get_current_user(token)
-        get_user = (db.db.table("auth-users")
-                    .select("email")
-                    .eq("id", token_data.username)
-                    .execute())
-        if not get_user.data:
-            return JSONResponse(content={"message": "User does not exist", "status": "error"}, status_code=400)
-        get_user_email = get_user.data[0]["email"]
-        profile_response = (db.db.table("user-profile")
-                            .select("*")
-                            .eq("email", get_user_email)
-                            .execute())
-        if not profile_response.data:
-            return JSONResponse(content={"message": "User profile does not exist", "status": "error"}, status_code=400)
-        user_profile = profile_response.data[0]
-        return JSONResponse(content={"message": "User profile fetched successfully", "data": user_profile, "status": "success"}, status_code=200)
+        get_user_email = current_user.email
+        user_profile = await profile_rows.get(db.get_profile, get_user_email)
+        if not user_profile:
+            return FastJSONResponse(content={"message": "User profile does not exist", "status": "error"}, status_code=400)
+        return conditional_response(request, {"message": "User profile fetched successfully", "data": user_profile, "status": "success"})
     except Exception as e:
-        return JSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
 
 
 
 @app.patch("/api/auth/profile/update")
-async def update_user_profile(user: UserUpdateProfile, token: str = Depends(OAuth2PasswordBearer(tokenUrl="api/auth/login"))):
+async def update_user_profile(user: UserUpdateProfile, current_user: CurrentUser):
     try:
-        token_data = get_current_user(token)
-        get_user = (db.db.table("auth-users")
-                    .select("email")
-                    .eq("id", token_data.username)
-                    .execute())
-        if not get_user.data:
-            return JSONResponse(content={"message": "User does not exist", "status": "error"}, status_code=400)
-        get_user_email = get_user.data[0]["email"]
-        profile_response = (db.db.table("user-profile")
-                            .select("*")
-                            .eq("email", get_user_email)
-                            .execute())
-        if not profile_response.data:
-            return JSONResponse(content={"message": "User profile does not exist", "status": "error"}, status_code=400)
+        get_user_email = current_user.email
+        # Read past the row cache: its copy can be a write behind, and both the
+        # no-op check and the recommendation key compare against what is stored.
+        profile_response = await db.get_profile(get_user_email)
+        if not profile_response:
+            return FastJSONResponse(content={"message": "User profile does not exist", "status": "error"}, status_code=400)
         user_data = user.model_dump()
-        updated_data = { k: v for k, v in user_data.items() if v is not None }
-        update_profile = (db.db.table("user-profile")
-                        .update(updated_data)
-                        .eq("email", get_user_email)
-                        .execute())
-        if update_profile.data:
-            return JSONResponse(content={"message": "User profile updated successfully", "data" : update_profile.data[0], "status": "success"}, status_code=200)
+        updated_data = { k: v for k, v in user_data.items() if v is not None and profile_response.get(k) != v }
+        if not updated_data:
+            return FastJSONResponse(content={"message": "User profile updated successfully", "data" : profile_response, "status": "success"}, status_code=200)
+        update_profile = await db.update_profile(get_user_email, updated_data)
+        profile_rows.invalidate(get_user_email)
+        if update_profile and recommendations.key_for(update_profile[0]) != recommendations.key_for(profile_response):
+            plan_precomputer.enqueue(get_user_email)
+        if update_profile:
+            return FastJSONResponse(content={"message": "User profile updated successfully", "data" : update_profile[0], "status": "success"}, status_code=200)
         else:
-            return JSONResponse(content={"message": "Failed to update user profile", "status": "error"}, status_code=500)
+            return FastJSONResponse(content={"message": "Failed to update user profile", "status": "error"}, status_code=500)
         
     except Exception as e:
-        return JSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+
+
 
+def encode_leaderboard_snapshot():
+    """Encoded legacy leaderboard body and its ETag, or (None, None) when the boards are empty."""
+    snapshot = leaderboard_index.snapshot()
+    if not (snapshot["overall_leaderboard"] or snapshot["today_leaderboard"]):
+        return None, None
+    body = dumps({"message": "Leaderboard fetched successfully", "data" : snapshot, "status": "success"})
+    return body, etag(body)
 
 
 @app.get("/api/auth/leaderboard")
-async def get_leaderboard(token: str = Depends(OAuth2PasswordBearer(tokenUrl="api/auth/login"))):
+async def get_leaderboard(request: Request,
+                          current_user: CurrentUser,
+                          scope: Optional[str] = Query(None, description="overall, today, week (last 7 days) or month (last 30 days)"),
+                          period: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Calendar month (YYYY-MM), finalized days only; overrides scope"),
+                          exercise: Optional[str] = Query(None, description="Exercise name; omit for the combined score"),
+                          limit: Optional[int] = Query(None, ge=1, le=100),
+                          page: int = Query(1, ge=1),
+                          around_me: bool = Query(False),
+                          neighbours: int = Query(5, ge=0, le=50)):
     try:
-        overall_leaderboard = (db.db.table("leaderboard")
-                               .select("username", "total_points")
-                               .order("total_points")
-                               .execute())
-        today = datetime.now().strftime("%Y-%m-%d")
-        today_leaderboard = (db.db.table("leaderboard")
-                             .select("username", "today_points")
-                             .eq("last_updated", today)
-                             .order("today_points")
-                             .execute())
-        if overall_leaderboard.data or today_leaderboard.data:
-            return JSONResponse(content={"message": "Leaderboard fetched successfully", "data" : {"overall_leaderboard" : overall_leaderboard.data, "today_leaderboard" : today_leaderboard.data } , "status": "success"}, status_code=200)
+        today = local_today()
+        await leaderboard_index.ensure_loaded(db, today, score_buffer)
+        if scope is None and period is None and exercise is None and limit is None and not around_me:
+            body, tag = leaderboard_index.memo("snapshot", encode_leaderboard_snapshot)
+            if body:
+                return conditional_response(request, body=body, tag=tag)
+            else:
+                return FastJSONResponse(content={"message": "Failed to fetch leaderboard", "status": "error"}, status_code=500)
+        scope = scope or "overall"
+        if scope not in SCOPES:
+            return FastJSONResponse(content={"message": f"Unknown scope {scope}", "status": "error"}, status_code=400)
+        if exercise is not None and exercise not in EXERCISES:
+            return FastJSONResponse(content={"message": f"Unknown exercise {exercise}", "status": "error"}, status_code=400)
+        if period is not None:
+            try:
+                period = parse_month(period, today)
+            except ValueError as e:
+                return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=422)
+            await leaderboard_index.ensure_period(db, period)
+            scope = period
+        limit = limit or 10
+        if around_me:
+            entries = leaderboard_index.around(current_user.email, scope, exercise, neighbours)
         else:
-            return JSONResponse(content={"message": "Failed to fetch leaderboard", "status": "error"}, status_code=500)
+            entries = leaderboard_index.top(scope, exercise, limit, (page - 1) * limit)
+        data = {
+            "scope": scope,
+            "exercise": exercise,
+            "page": page,
+            "limit": limit,
+            "total": len(leaderboard_index.board(scope, exercise)),
+            "entries": entries,
+            "me": leaderboard_index.rank(current_user.email, scope, exercise),
+        }
+        return conditional_response(request, {"message": "Leaderboard fetched successfully", "data" : data, "status": "success"})
     except Exception as e:
-        return JSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+
+
+async def subscribe_leaderboard(scope: str, exercise: Optional[str]):
+    """Validate a live-leaderboard subscription and register it; raises ValueError or OverflowError."""
+    if scope not in SCOPES:
+        raise ValueError(f"Unknown scope {scope}")
+    if exercise is not None and exercise not in EXERCISES:
+        raise ValueError(f"Unknown exercise {exercise}")
+    await leaderboard_index.ensure_loaded(db, local_today(), score_buffer)
+    return leaderboard_push.subscribe(scope, exercise)
+
+
+@app.get("/api/auth/leaderboard/live")
+async def stream_leaderboard(current_user: CurrentUser,
+                             scope: str = Query("overall", description="overall, today, week or month"),
+                             exercise: Optional[str] = Query(None, description="Exercise name; omit for the combined score")):
+    """Server-sent events: a `snapshot` of the top rows, then `diff` events with the new order and the rows that changed."""
+    try:
+        subscriber = await subscribe_leaderboard(scope, exercise)
+    except ValueError as e:
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=400)
+    except OverflowError as e:
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=503, headers={"Retry-After": "30"})
+    except Exception as e:
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+    snapshot = subscriber.channel.snapshot()
+
+    async def events():
+        try:
+            yield snapshot.sse
+            while True:
+                message = await subscriber.next(leaderboard_push.heartbeat_seconds)
+                yield message.sse if message else b": keep-alive\n\n"
+        finally:
+            leaderboard_push.unsubscribe(subscriber)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.websocket("/api/auth/leaderboard/ws")
+async def leaderboard_socket(websocket: WebSocket, token: str = Query(...), scope: str = Query("overall"), exercise: Optional[str] = Query(None)):
+    """The live leaderboard over a WebSocket; browsers cannot set headers here, so the token comes as a query parameter."""
+    if auth.verify_token(token) is None:
+        await websocket.close(code=1008, reason="Could not validate credentials")
+        return
+    try:
+        subscriber = await subscribe_leaderboard(scope, exercise)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    except OverflowError as e:
+        await websocket.close(code=1013, reason=str(e))
+        return
+    snapshot = subscriber.channel.snapshot()
+    try:
+        await websocket.accept()
+        await websocket.send_text(snapshot.text)
+        while True:
+            message = await subscriber.next(leaderboard_push.heartbeat_seconds)
+            await websocket.send_text(message.text if message else '{"type":"ping"}')
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        leaderboard_push.unsubscribe(subscriber)
 
 
 @app.patch("/api/auth/leaderboard/update")
-async def update_leaderboard_entry(leaderboard: LeaderboardEntry, token: str = Depends(OAuth2PasswordBearer(tokenUrl="api/auth/login"))):
+async def update_leaderboard_entry(leaderboard: LeaderboardEntry, current_user: CurrentUser):
+    return await submit_leaderboard_entries([leaderboard], current_user)
+
+
+@app.patch("/api/auth/leaderboard/update/bulk")
+async def update_leaderboard_entries(leaderboard: List[LeaderboardEntry], current_user: CurrentUser):
+    return await submit_leaderboard_entries(leaderboard, current_user)
+
+
+async def submit_leaderboard_entries(entries: List[LeaderboardEntry], current_user: TokenData):
+    """Buffer score submissions for write-behind and return the caller's updated totals."""
     try:
-        token_data = get_current_user(token)
-        get_user = (db.db.table("auth-users")
-                    .select("email", "username")
-                    .eq("id", token_data.username)
-                    .execute())
-        if not get_user.data[0]:
-            return JSONResponse(content={"message": "User does not exist", "status": "error"}, status_code=400)
-        get_user_email = get_user.data[0]["email"]
-        get_current_leaderboard = (db.db.table("leaderboard")
-                                   .select("*")
-                                   .eq("email", get_user.data[0]["email"])
-                                    .execute())
-        if not get_current_leaderboard.data and not get_current_leaderboard.data[0]:
-            return JSONResponse(content={"message": "Leaderboard entry does not exist", "status": "error"}, status_code=400)
-        
-        today = datetime.now().strftime("%Y-%m-%d")
-        if get_current_leaderboard.data[0]["last_updated"] == today:
-            if leaderboard.exercise in get_current_leaderboard.data[0]["today_points"]:
-                get_current_leaderboard.data[0]["today_points"][leaderboard.exercise] += leaderboard.score
-                get_current_leaderboard.data[0]["total_points"][leaderboard.exercise] += leaderboard.score
-                update_leaderboard = (db.db.table("leaderboard")
-                                      .update({"today_points": get_current_leaderboard.data[0]["today_points"], "total_points": get_current_leaderboard.data[0]["total_points"]})
-                                      .eq("email", get_user_email)
-                                      .execute())
-        else:
-            if leaderboard.exercise in get_current_leaderboard.data[0]["today_points"]:
-                get_current_leaderboard.data[0]["today_points"][leaderboard.exercise] = leaderboard.score
-                get_current_leaderboard.data[0]["total_points"][leaderboard.exercise] += leaderboard.score
-                update_leaderboard = (db.db.table("leaderboard")
-                                      .update({"today_points": get_current_leaderboard.data[0]["today_points"], "total_points": get_current_leaderboard.data[0]["total_points"], "last_updated": today})
-                                      .eq("email", get_user_email)
-                                      .execute())
-
-        if update_leaderboard.data and update_leaderboard.data[0]:
-            return JSONResponse(content={"message": "Leaderboard updated successfully", "data" : update_leaderboard.data[0], "status": "success"}, status_code=200)
-        else:
-            return JSONResponse(content={"message": "Failed to update leaderboard", "status": "error"}, status_code=500)
+        get_user_email = current_user.email
+        if not entries:
+            return FastJSONResponse(content={"message": "Please provide at least one entry", "status": "error"}, status_code=400)
+        for entry in entries:
+            if entry.exercise not in EXERCISES:
+                return FastJSONResponse(content={"message": f"Unknown exercise {entry.exercise}", "status": "error"}, status_code=400)
+            if entry.frames is not None:
+                try:
+                    verified = rep_engine.analyze(entry.exercise, np.asarray(entry.frames, dtype=np.float32))
+                except ValueError as e:
+                    return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=400)
+                if entry.score > verified["reps"]:
+                    return FastJSONResponse(content={"message": "Score does not match the recorded workout", "data": verified, "status": "error"}, status_code=400)
+        today = local_today()
+        await leaderboard_index.ensure_loaded(db, today, score_buffer)
+        if get_user_email not in leaderboard_index.entries:
+            get_current_leaderboard = await score_buffer.read(leaderboard_rows.get, db.get_leaderboard, get_user_email)
+            if not get_current_leaderboard:
+                return FastJSONResponse(content={"message": "Leaderboard entry does not exist", "status": "error"}, status_code=400)
+            leaderboard_index.upsert(score_buffer.merge(get_current_leaderboard), today)
+        for entry in entries:
+            score_buffer.add(get_user_email, entry.exercise, entry.score, today)
+            update_leaderboard = leaderboard_index.apply(get_user_email, entry.exercise, entry.score, today)
+        leaderboard_push.notify()
+        return FastJSONResponse(content={"message": "Leaderboard updated successfully", "data" : update_leaderboard, "status": "success"}, status_code=200)
+    except Exception as e:
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+
+
+@app.post("/api/auth/workout/verify")
+async def verify_workout(workout: WorkoutFrames, current_user: CurrentUser):
+    try:
+        if workout.exercise not in EXERCISES:
+            return FastJSONResponse(content={"message": f"Unknown exercise {workout.exercise}", "status": "error"}, status_code=400)
+        try:
+            frames = np.asarray(workout.frames, dtype=np.float32)
+            result = rep_engine.analyze(workout.exercise, frames)
+        except ValueError as e:
+            return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=400)
+        return FastJSONResponse(content={"message": "Workout verified successfully", "data": result, "status": "success"}, status_code=200)
+    except Exception as e:
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+
+
+@app.post("/api/auth/workout/session")
+async def upload_workout_session(request: Request, current_user: CurrentUser, exercise: str = Query(..., examples=["Pushups"]), store: bool = Query(False)):
+    """Verify a workout uploaded in the binary landmark session format (workout/codec)."""
+    try:
+        if exercise not in EXERCISES:
+            return FastJSONResponse(content={"message": f"Unknown exercise {exercise}", "status": "error"}, status_code=400)
+        try:
+            body = await read_body(request, settings.workout_max_session_bytes)
+        except PayloadTooLarge as e:
+            return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=413)
+        try:
+            frames, header = decode_session(body)
+            result = rep_engine.analyze(exercise, frames)
+        except ValueError as e:
+            return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=400)
+        result["fps"] = header.fps
+        if store:
+            try:
+                result["session_id"] = await run_in_threadpool(session_store.store_session, current_user.email, exercise, header.fps, frames, local_today())
+            except SessionLive as e:
+                return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=409)
+        return FastJSONResponse(content={"message": "Workout session verified successfully", "data": result, "status": "success"}, status_code=200)
+    except Exception as e:
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+
+
+@app.post("/api/auth/workout/session/live")
+async def open_live_workout_session(current_user: CurrentUser, exercise: str = Query(..., examples=["Pushups"]), fps: float = Query(30.0, gt=0)):
+    try:
+        if exercise not in EXERCISES:
+            return FastJSONResponse(content={"message": f"Unknown exercise {exercise}", "status": "error"}, status_code=400)
+        session_id = await run_in_threadpool(session_store.open_session, current_user.email, exercise, fps, local_today())
+        return FastJSONResponse(content={"message": "Workout session started", "data": {"session_id": session_id}, "status": "success"}, status_code=201)
+    except Exception as e:
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+
+
+@app.post("/api/auth/workout/session/live/{session_id}/frames")
+async def append_live_workout_frames(session_id: str, request: Request, current_user: CurrentUser):
+    """Append a chunk of frames, encoded with workout/codec, to a live session."""
+    try:
+        try:
+            body = await read_body(request, settings.workout_max_session_bytes)
+        except PayloadTooLarge as e:
+            return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=413)
+        try:
+            frames, _ = decode_session(body)
+            total = await run_in_threadpool(session_store.append, current_user.email, session_id, frames)
+        except ValueError as e:
+            return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=400)
+        return FastJSONResponse(content={"message": "Frames stored", "data": {"session_id": session_id, "frames": total}, "status": "success"}, status_code=200)
+    except Exception as e:
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+
+
+@app.post("/api/auth/workout/session/live/{session_id}/close")
+async def close_live_workout_session(session_id: str, current_user: CurrentUser):
+    try:
+        try:
+            session = await run_in_threadpool(session_store.close_session, current_user.email, session_id)
+            frames, _ = await run_in_threadpool(session_store.replay, current_user.email, session_id)
+        except SessionStoreError as e:
+            return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=404)
+        result = rep_engine.analyze(session["exercise"], frames)
+        result["session_id"] = session_id
+        return FastJSONResponse(content={"message": "Workout session closed", "data": result, "status": "success"}, status_code=200)
+    except Exception as e:
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+
+
+@app.get("/api/auth/workout/sessions")
+async def list_workout_sessions(current_user: CurrentUser, day: Optional[str] = Query(None, examples=["2025-01-01"])):
+    try:
+        sessions = await run_in_threadpool(session_store.list_sessions, current_user.email, day)
+        return FastJSONResponse(content={"message": "Workout sessions fetched successfully", "data": sessions, "status": "success"}, status_code=200)
+    except Exception as e:
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+
+
+@app.get("/api/auth/workout/session/{session_id}/replay")
+async def replay_workout_session(session_id: str, current_user: CurrentUser, start: Optional[float] = Query(None, ge=0), end: Optional[float] = Query(None, ge=0)):
+    """Stream back a window of a stored session (seconds) in the workout/codec format."""
+    try:
+        try:
+            frames, session = await run_in_threadpool(session_store.replay, current_user.email, session_id, start, end)
+        except SessionStoreError as e:
+            return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=404)
+        return Response(content=encode_session(frames, fps=session["fps"], float16=False, delta=False), media_type="application/octet-stream")
+    except Exception as e:
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+
+
+@app.post("/api/auth/workout/session/{session_id}/rescore")
+async def rescore_workout_session(session_id: str, current_user: CurrentUser):
+    """Run the current rep engine over a stored session again."""
+    try:
+        try:
+            frames, session = await run_in_threadpool(session_store.replay, current_user.email, session_id)
+        except SessionStoreError as e:
+            return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=404)
+        result = rep_engine.analyze(session["exercise"], frames)
+        result["session_id"] = session_id
+        return FastJSONResponse(content={"message": "Workout session rescored", "data": result, "status": "success"}, status_code=200)
     except Exception as e:
-        return JSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
+        return FastJSONResponse(content={"message": f"{str(e)}", "status": "error"}, status_code=500)
@@ -0,0 +1,152 @@
+import json
+import asyncio
+import hashlib
+from typing import Optional, Tuple, List, Dict, AsyncIterator
+from utils.cache.main import TTLCache, SingleFlight
+from utils.stream.main import JsonArrayStream
+from config.settings.main import settings
+
+
+# Profile fields that feed the prompt; a plan stays valid while these are unchanged.
+PROMPT_FIELDS = (
+    "your_gender",
+    "weight",
+    "height",
+    "primary_goal_for_exercising",
+    "how_often_exercised_at_past",
+    "workout_intensity",
+    "workout_duration",
+    "what_days_a_week_you_will_workout",
+    "what_time_of_day_you_will_workout",
+)
+
+
+class PlanAbandoned(Exception):
+    """The streamed generation being waited on was abandoned by its client; retry."""
+
+
+class RecommendationService:
+    """Workout plans from the LLM, cached by a hash of the prompt inputs.
+
+    Profiles that normalise to the same inputs share one cached plan, and
+    concurrent requests for the same inputs share one in-flight LLM call.
+    """
+
+    cache_size = settings.recommendation_cache_size
+    cache_ttl = settings.recommendation_cache_ttl
+
+    def __init__(self, groq, utility):
+        self.groq = groq
+        self.utility = utility
+        self.cache = TTLCache(maxsize=self.cache_size, ttl=self.cache_ttl)
+        self.flight = SingleFlight()
+
+    def prompt_inputs(self, profile: Dict) -> Dict:
+        inputs = {}
+        for field in PROMPT_FIELDS:
+            value = profile.get(field)
+            if isinstance(value, str):
+                value = " ".join(value.lower().split())
+            elif isinstance(value, (int, float)):
+                value = round(float(value), 1)
+            inputs[field] = value
+        inputs["age"] = self.utility.calculate_age(profile["date_of_birth"])
+        return inputs
+
+    def key_for(self, profile: Dict) -> str:
+        encoded = json.dumps(self.prompt_inputs(profile), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def stored_plan(self, profile: Dict) -> Optional[List[Dict]]:
+        """The plan saved on the profile, if it was generated from the current inputs."""
+        if profile.get("recommended_exercise_plan") and profile.get("recommendation_key") == self.key_for(profile):
+            return profile["recommended_exercise_plan"]
+        return None
+
+    def build_query(self, user_data: Dict) -> str:
+        user_age = self.utility.calculate_age(user_data["date_of_birth"])
+        return f'''
+        A few questions were asked to personalize your workout recommendation. Here are the details:
+        1. User Gender: {user_data["your_gender"]}
+        2. User Weight: {user_data["weight"]}
+        3. User Height: {user_data["height"]}
+        4. User Age: {user_age}
+        5. Primary Goal for Exercising: {user_data["primary_goal_for_exercising"]}
+        6. How often user exercised at past: {user_data["how_often_exercised_at_past"]}
+        7. Workout Intensity user prefers: {user_data["workout_intensity"]}
+        8. Workout Duration user prefers: {user_data["workout_duration"]}
+        9. Days a week user will workout: {user_data["what_days_a_week_you_will_workout"]}
+        10. Time of day user will prefer for workout: {user_data["what_time_of_day_you_will_workout"]}
+        
+        Based on the above details, give how many 
+        1. Bicep Curls should user do in a day?
+        2. Pushups should user do in a day?
+        3. Squats should user do in a day?
+        4. Crunches should user do in a day?
+        
+        Use the below format for response:
+        {'{ "exercise_name": "name of the exercise", "exercise_reps": "number of reps", "exercise_sets": "number of sets", "duration": "duration of the exercise", "day": "day(s) of the week this exercise should be done"}'}
+        Make sure that the total workout duration for all exercises combined is equal to the user's preferred workout duration and add suitable unit to it. 
+        Give in an array format for each exercise. Only the exercises and no other details.
+        '''
+
+    async def get_plan(self, profile: Dict) -> Tuple[List[Dict], str]:
+        """Return (plan, key) for a profile, calling the LLM only on a cache miss."""
+        key = self.key_for(profile)
+        while True:
+            plan = self.cache.get(key)
+            if plan is not None:
+                return plan, key
+            try:
+                return await self.flight.do(key, lambda: self._generate(profile, key)), key
+            except PlanAbandoned:
+                pass
+
+    async def _generate(self, profile: Dict, key: str) -> List[Dict]:
+        response = await self.groq.ask(self.build_query(profile))
+        plan = json.loads(response)
+        self.cache.set(key, plan)
+        return plan
+
+    async def stream_plan(self, profile: Dict) -> AsyncIterator[Dict]:
+        """Yield a profile's plan one exercise at a time as the LLM streams it.
+
+        Only one completion runs per key: cached plans, and plans already
+        being generated by `get_plan` or another stream, are replayed once
+        ready. If the stream being waited on is abandoned by its client, a
+        waiter takes over and streams the plan itself.
+        """
+        key = self.key_for(profile)
+        while True:
+            plan = self.cache.get(key)
+            if plan is not None:
+                for exercise in plan:
+                    yield exercise
+                return
+            flight = self.flight.claim(key)
+            if flight is not None:
+                break
+            try:
+                await asyncio.shield(self.flight.calls[key])
+            except PlanAbandoned:
+                pass
+        try:
+            parser = JsonArrayStream()
+            plan = []
+            async for chunk in self.groq.ask_stream(self.build_query(profile)):
+                for exercise in parser.feed(chunk):
+                    plan.append(exercise)
+                    yield exercise
+            if not plan:
+                raise ValueError("Recommendation response contained no exercises")
+            self.cache.set(key, plan)
+            flight.set_result(plan)
+        except Exception as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            if not flight.done():
+                # The client went away mid-stream (GeneratorExit or cancellation).
+                flight.set_exception(PlanAbandoned(key))
+            # Marks the outcome retrieved, so a failure nobody waited for is not reported as unhandled.
+            flight.exception()
@@ -0,0 +1,185 @@
+import time
+import uuid
+import asyncio
+import logging
+from typing import Optional, Callable, Set, List, Dict
+from recommendation.main import PROMPT_FIELDS
+from config.settings.main import settings
+
+
+logger = logging.getLogger(__name__)
+
+SCAN_COLUMNS = ("email", "date_of_birth", "recommendation_key") + PROMPT_FIELDS
+
+
+class RateLimit:
+    """Spaces calls at least 60 / `per_minute` seconds apart within this process."""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self.next_at = 0.0
+
+    async def wait(self):
+        now = time.monotonic()
+        slot = max(now, self.next_at)
+        self.next_at = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def pause(self, seconds: float):
+        """Hold every caller back for `seconds`, e.g. after the provider answered 429."""
+        self.next_at = max(self.next_at, time.monotonic() + seconds)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds from the Retry-After header of a rate-limited LLM response, if any."""
+    if getattr(error, "status_code", None) != 429:
+        return None
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", 0)) or None
+    except ValueError:
+        return None
+
+
+class PlanPrecomputer:
+    """Generates workout plans in the background so reads never wait on the LLM.
+
+    Emails are queued by profile writes (`enqueue`) and by a periodic scan
+    for profiles whose stored plan is missing or was made from other
+    inputs. `workers` tasks take emails off the queue; LLM calls share one
+    `rate_per_minute` budget, split evenly between the `processes` server
+    processes, and plans already in the recommendation cache are written
+    without a call. A plan is only stored if the profile still has the
+    inputs it was generated from.
+
+    Only the process holding the "recommendation-scan" lease runs the scan.
+    It renews the lease every scan, and another process takes over once a
+    lease has gone unrenewed for two scan periods.
+    """
+
+    workers = settings.recommendation_workers
+    rate_per_minute = settings.recommendation_rate_per_minute
+    queue_size = settings.recommendation_queue_size
+    scan_seconds = settings.recommendation_scan_seconds
+    max_retries = settings.recommendation_max_retries
+    retry_base_seconds = settings.recommendation_retry_base_seconds
+    processes = settings.web_concurrency
+    scan_lease = "recommendation-scan"
+
+    def __init__(self, recommendations):
+        self.recommendations = recommendations
+        self.db = None
+        self.on_rows: Optional[Callable[[List[Dict]], None]] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self.queued: Set[str] = set()
+        self.tasks: List[asyncio.Task] = []
+        self.retries: set = set()
+        self.limit = RateLimit(self.rate_per_minute / max(self.processes, 1))
+        self.holder = uuid.uuid4().hex
+        self.generated = 0
+        self.failed = 0
+
+    def start(self, db, on_rows: Optional[Callable[[List[Dict]], None]] = None):
+        """Start the workers; `on_rows` receives the profile rows they update."""
+        self.db = db
+        self.on_rows = on_rows
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        if self.scan_seconds > 0:
+            self.tasks.append(asyncio.create_task(self._scan_periodically()))
+
+    def enqueue(self, email: str, attempt: int = 0) -> bool:
+        """Queue a plan for `email`; False when the queue is full (the next scan picks it up)."""
+        if self.queue is None:
+            return False
+        if email in self.queued:
+            return True
+        try:
+            self.queue.put_nowait((email, attempt))
+        except asyncio.QueueFull:
+            logger.warning("Recommendation queue full, deferring %s to the next scan", email)
+            return False
+        self.queued.add(email)
+        return True
+
+    async def scan(self) -> int:
+        """Queue every profile whose stored plan is missing or stale; return how many were queued."""
+        rows = await self.db.list_profiles(*SCAN_COLUMNS)
+        count = 0
+        for row in rows:
+            try:
+                key = self.recommendations.key_for(row)
+            except Exception:
+                logger.exception("Skipping the profile of %s in the recommendation scan", row.get("email"))
+                continue
+            if row.get("recommendation_key") != key and self.enqueue(row["email"]):
+                count += 1
+        return count
+
+    async def _scan_periodically(self):
+        while True:
+            try:
+                if await self.db.acquire_lease(self.scan_lease, self.holder, 2 * self.scan_seconds):
+                    queued = await self.scan()
+                    if queued:
+                        logger.info("Queued %d workout plans for precomputation", queued)
+            except Exception:
+                logger.exception("Recommendation scan failed")
+            await asyncio.sleep(self.scan_seconds)
+
+    async def generate(self, email: str):
+        profile = await self.db.get_profile(email)
+        if profile is None:
+            return
+        key = self.recommendations.key_for(profile)
+        if profile.get("recommendation_key") == key:
+            return
+        if self.recommendations.cache.get(key) is None:
+            await self.limit.wait()
+        plan, key = await self.recommendations.get_plan(profile)
+        current = await self.db.get_profile(email)
+        if current is None or self.recommendations.key_for(current) != key:
+            # Edited while generating; that edit queued a fresh run.
+            return
+        rows = await self.db.update_profile(email, {"recommended_exercise_plan": plan, "recommendation_key": key})
+        self.generated += 1
+        if self.on_rows:
+            self.on_rows(rows)
+
+    def _retry(self, email: str, attempt: int, delay: Optional[float]):
+        if attempt >= self.max_retries:
+            self.failed += 1
+            logger.error("Giving up on the workout plan for %s after %d attempts", email, attempt + 1)
+            return
+        task = asyncio.create_task(self._requeue(email, attempt + 1, delay or self.retry_base_seconds * 2 ** attempt))
+        self.retries.add(task)
+        task.add_done_callback(self.retries.discard)
+
+    async def _requeue(self, email: str, attempt: int, delay: float):
+        await asyncio.sleep(delay)
+        self.enqueue(email, attempt)
+
+    async def _work(self):
+        while True:
+            email, attempt = await self.queue.get()
+            # Dropped before generating, so an edit made meanwhile queues another run.
+            self.queued.discard(email)
+            try:
+                await self.generate(email)
+            except Exception as e:
+                delay = retry_after(e)
+                if delay:
+                    self.limit.pause(delay)
+                logger.exception("Generating the workout plan for %s failed", email)
+                self._retry(email, attempt, delay)
+            finally:
+                self.queue.task_done()
+
+    async def stop(self):
+        tasks = self.tasks + list(self.retries)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.tasks = []
+        self.retries = set()
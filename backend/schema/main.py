@@ -2,7 +2,11 @@ from pydantic import BaseModel, Field, ValidationError, EmailStr
 from typing import Optional, List, Dict, Any
 
 class TokenData(BaseModel):
-    username: str = None
+    id: Any = None
+    email: Optional[str] = None
+    username: Optional[str] = None
+    created_at: Optional[str] = None
+    role: Optional[str] = None
     
 class UserRegister(BaseModel):
     email: EmailStr = Field(..., example="example@domain.com")
@@ -41,4 +45,10 @@ class UserUpdateProfile(BaseModel):
 class LeaderboardEntry(BaseModel):
     date: str = Field(..., example="2021-01-01")
     exercise: str = Field(..., example="Pushups")
-    score: int = Field(..., example=100)
\ No newline at end of file
+    score: int = Field(..., example=100)
+    frames: Optional[List[List[List[float]]]] = Field(None, description="MediaPipe pose landmarks per frame (33 x [x, y, z, visibility]) used to verify the score")
+
+
+class WorkoutFrames(BaseModel):
+    exercise: str = Field(..., example="Pushups")
+    frames: List[List[List[float]]] = Field(..., description="MediaPipe pose landmarks per frame (33 x [x, y, z, visibility])")
\ No newline at end of file
@@ -1,4 +1,5 @@
 class MAIL_TEMPLATE:
+    """HTML mail bodies. The f-strings are compiled with the module, so a render is only the string join."""
     
     def send_cms_registration_invite(self, mail_recepient, mail_body, registration_link):
         return f'''
@@ -0,0 +1,45 @@
+"""Shared setup for the backend tests.
+
+Run from backend/ with `python -m pytest tests`. Settings are read from the
+environment at import, so test values are set before any app module loads;
+the app runs on MemoryDatabase or SqliteDatabase and the fake LLM, so no
+Supabase, Groq or SMTP server is needed.
+"""
+import os
+import sys
+
+for name, value in {"JWT_SECRET": "test", "JWT_ALGORITHM": "HS256", "PASSWORD_BCRYPT_ROUNDS": "4",
+                    "LIMIT_AUTH_PER_IP": "1000/minute", "MAIL_USER": "test@example.com", "MAIL_SECRET": "x",
+                    "MAIL_PORT": "1025", "MAIL_HOST": "localhost", "APP_DB_URL": "http://localhost:1",
+                    "APP_DB_PASS": "x", "APP_LLM_KEY": "x"}.items():
+    os.environ.setdefault(name, value)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import pytest
+
+
+PROFILE = {"your_gender": "Female", "weight": 60, "height": 165, "date_of_birth": "1995-05-05",
+           "primary_goal_for_exercising": "strength", "how_often_exercised_at_past": "weekly",
+           "workout_intensity": "Low", "workout_duration": "30 minutes",
+           "what_days_a_week_you_will_workout": "Mon", "what_time_of_day_you_will_workout": "Morning"}
+
+
+async def register(client: httpx.AsyncClient, email: str) -> dict:
+    """Register, log in and personalize `email`; returns its auth headers."""
+    await client.post("/api/auth/register", json={"email": email, "username": email.split("@")[0], "password": "pw"})
+    token = (await client.post("/api/auth/login", json={"email": email, "password": "pw"})).json()["data"]
+    headers = {"Authorization": f"Bearer {token}"}
+    response = await client.post("/api/auth/personalize", json=PROFILE, headers=headers)
+    assert response.json()["status"] == "success"
+    return headers
+
+
+@pytest.fixture
+def profile() -> dict:
+    return dict(PROFILE)
+
+
+@pytest.fixture
+def sign_up():
+    return register
@@ -0,0 +1,96 @@
+"""Exports walk the store in keyset pages, and incremental runs pick up from the saved watermark."""
+import argparse
+import asyncio
+import csv
+import io
+import json
+
+import pytest
+import database.main
+from database.memory.main import MemoryDatabase
+from database.sqlite.main import SqliteDatabase
+from export.main import DATASETS, export, pages, run
+from leaderboard.main import EXERCISES
+
+
+USERS = 7
+
+
+async def seed(db):
+    for n in range(USERS):
+        email = f"u{n}@example.com"
+        await db.create_profile({"email": email, "your_gender": "Female", "weight": 60 + n,
+                                 "recommended_exercise_plan": [{"exercise_name": "Squats", "exercise_reps": str(n)}] if n % 2 else None})
+        await db.create_leaderboard({"email": email, "username": f"u{n}",
+                                     "total_points": {exercise: n for exercise in EXERCISES},
+                                     "today_points": {exercise: 0 for exercise in EXERCISES},
+                                     "created_on": "2026-10-01", "last_updated": f"2026-10-0{1 + n % 5}"})
+
+
+async def collect(db, dataset: str, **kwargs):
+    return [page async for page in pages(db, DATASETS[dataset], **kwargs)]
+
+
+async def read(db, dataset: str, format: str, **kwargs) -> str:
+    return b"".join([chunk async for chunk in export(db, DATASETS[dataset], format, **kwargs)]).decode("utf-8")
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def db(request, tmp_path):
+    db = MemoryDatabase() if request.param == "memory" else SqliteDatabase(str(tmp_path / "app.db"))
+    yield db
+    asyncio.run(db.close())
+
+
+def test_keyset_pages_cover_every_row_once(db):
+    async def go():
+        await seed(db)
+        return (await collect(db, "profiles", page_size=3), await collect(db, "plans", page_size=2),
+                await collect(db, "points", page_size=3, since="2026-10-04"))
+
+    profiles, plans, points = asyncio.run(go())
+    assert [len(page) for page in profiles] == [3, 3, 1]
+    assert [row["email"] for page in profiles for row in page] == [f"u{n}@example.com" for n in range(USERS)]
+    assert all(tuple(row) == DATASETS["profiles"].columns for page in profiles for row in page)
+    # Plans skip profiles without one; a page can come back short or empty and paging goes on.
+    assert [row["email"] for page in plans for row in page] == ["u1@example.com", "u3@example.com", "u5@example.com"]
+    assert [(row["email"], row["total_pushups"]) for page in points for row in page] == [
+        ("u3@example.com", 3), ("u4@example.com", 4)]
+
+
+def test_ndjson_and_csv_encoding(db):
+    async def go():
+        await seed(db)
+        return await read(db, "plans", "ndjson", page_size=2), await read(db, "points", "csv", page_size=4)
+
+    plans, points = asyncio.run(go())
+    rows = [json.loads(line) for line in plans.splitlines()]
+    assert rows[0]["recommended_exercise_plan"] == [{"exercise_name": "Squats", "exercise_reps": "1"}]
+    table = list(csv.reader(io.StringIO(points)))
+    assert tuple(table[0]) == DATASETS["points"].columns
+    assert len(table) == USERS + 1
+    assert table[2][table[0].index("total_bicep_curls")] == "1"
+
+
+async def change(path: str, write):
+    db = SqliteDatabase(path)
+    await write(db)
+    await db.close()
+
+
+def test_run_resumes_from_the_watermark_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "app.db")
+    asyncio.run(change(path, seed))
+    monkeypatch.setattr(database.main, "create_database", lambda: SqliteDatabase(path))
+    watermark_file, output = tmp_path / "profiles.watermark", tmp_path / "profiles.ndjson"
+    args = argparse.Namespace(dataset="profiles", format="ndjson", since=None, watermark_file=str(watermark_file),
+                              output=str(output), page_size=2)
+
+    first = asyncio.run(run(args))
+    assert watermark_file.read_text().strip() == first
+    assert len(output.read_text().splitlines()) == USERS
+
+    asyncio.run(change(path, lambda db: db.update_profile("u4@example.com", {"weight": 99})))
+    second = asyncio.run(run(args))
+    assert second >= first
+    assert [json.loads(line)["email"] for line in output.read_text().splitlines()] == ["u4@example.com"]
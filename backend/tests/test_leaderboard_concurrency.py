@@ -0,0 +1,76 @@
+"""Concurrent score submissions must add up exactly, in the index and in the store."""
+import asyncio
+import random
+
+import httpx
+import pytest
+import main
+from config.bot.fake.main import FAKE_GROQ_SERVER
+from database.memory.main import MemoryDatabase
+from leaderboard.main import EXERCISES
+
+
+USERS = 4
+SUBMISSIONS = 50
+
+
+async def submit_concurrently(tag: str, sign_up):
+    rng = random.Random(tag)
+    expected = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            users = {f"{tag}{n}@example.com": None for n in range(USERS)}
+            for email in users:
+                users[email] = await sign_up(client, email)
+                expected[email] = {exercise: 0 for exercise in EXERCISES}
+            requests = []
+            for email, headers in users.items():
+                for _ in range(SUBMISSIONS):
+                    exercise, score = rng.choice(EXERCISES), rng.randint(1, 9)
+                    expected[email][exercise] += score
+                    requests.append((email, score, client.patch("/api/auth/leaderboard/update", headers=headers,
+                                                                json={"date": "x", "exercise": exercise, "score": score})))
+            rng.shuffle(requests)
+            responses = await asyncio.gather(*(request for _, _, request in requests))
+            assert all(response.status_code == 200 for response in responses), [r.json() for r in responses if r.status_code != 200]
+
+            # Each response shows the totals right after its own points were applied, so a
+            # user's responses ordered by total must step up by exactly their own scores.
+            # A reload that double counted or dropped a batch in flight breaks the chain.
+            steps = {email: [] for email in users}
+            for (email, score, _), response in zip(requests, responses):
+                steps[email].append((sum(response.json()["data"]["total_points"].values()), score))
+            for email, totals in steps.items():
+                previous = 0
+                for total, score in sorted(totals):
+                    assert total == previous + score, (email, sorted(totals))
+                    previous = total
+
+            # Reads served from the index, with points still in the buffer overlaid.
+            for email in users:
+                assert main.leaderboard_index.entries[email]["total_points"] == expected[email]
+                assert main.leaderboard_index.entries[email]["today_points"] == expected[email]
+    # The lifespan drained the buffer on exit, so the store has everything.
+    stored = {row["email"]: row for row in main.db.tables["leaderboard"]}
+    for email in users:
+        assert stored[email]["total_points"] == expected[email]
+        assert stored[email]["today_points"] == expected[email]
+    assert not main.score_buffer.pending and not main.score_buffer.outbox
+
+
+@pytest.mark.parametrize("refresh_seconds, flush_max_entries", [
+    (300, 500),  # index loaded once, buffer flushed on its timer or at shutdown
+    (0, 3),      # index reloaded from the store on every request, racing small flushes
+])
+def test_concurrent_leaderboard_updates_add_up(monkeypatch, sign_up, refresh_seconds, flush_max_entries):
+    monkeypatch.setattr(main, "db", MemoryDatabase(latency=0.002))
+    fake = FAKE_GROQ_SERVER()
+    monkeypatch.setattr(main, "groq", fake)
+    monkeypatch.setattr(main.recommendations, "groq", fake)
+    monkeypatch.setattr(main.leaderboard_index, "refresh_seconds", refresh_seconds)
+    monkeypatch.setattr(main.score_buffer, "flush_max_entries", flush_max_entries)
+    # Each test runs its own event loop; a lock a previous loop waited on stays bound to it.
+    monkeypatch.setattr(main.leaderboard_index, "lock", asyncio.Lock())
+    main.leaderboard_index.invalidate()
+    asyncio.run(submit_concurrently(f"r{refresh_seconds}f{flush_max_entries}u", sign_up))
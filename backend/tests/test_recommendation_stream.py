@@ -0,0 +1,90 @@
+"""Streamed plans share one LLM completion per prompt, and survive the streaming client going away."""
+import asyncio
+import json
+
+import httpx
+import main
+from config.bot.fake.main import FAKE_GROQ_SERVER
+from database.memory.main import MemoryDatabase
+from recommendation.main import RecommendationService
+from utils.cache.main import TTLCache
+from utils.main import Utils
+
+
+async def collect(stream) -> list:
+    return [exercise async for exercise in stream]
+
+
+def test_concurrent_streams_share_one_completion(profile):
+    fake = FAKE_GROQ_SERVER(first_token_latency=0.05, chunk_size=8)
+    service = RecommendationService(fake, Utils())
+
+    async def run():
+        plans = await asyncio.gather(*(collect(service.stream_plan(profile)) for _ in range(5)))
+        # Once cached, a later stream replays the plan without calling the LLM.
+        plans.append(await collect(service.stream_plan(profile)))
+        return plans
+
+    assert asyncio.run(run()) == [FAKE_GROQ_SERVER.plan] * 6
+    assert fake.calls == 1
+
+
+def test_waiter_takes_over_an_abandoned_stream(profile):
+    fake = FAKE_GROQ_SERVER(chunk_size=8, chunk_delay=0.001)
+    service = RecommendationService(fake, Utils())
+
+    async def run():
+        leader = service.stream_plan(profile)
+        first = await leader.__anext__()
+        waiter = asyncio.create_task(collect(service.stream_plan(profile)))
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        # The leader's client disconnects after one exercise.
+        await leader.aclose()
+        return first, await waiter
+
+    first, plan = asyncio.run(run())
+    assert first == FAKE_GROQ_SERVER.plan[0]
+    assert plan == FAKE_GROQ_SERVER.plan
+    assert fake.calls == 2
+    assert service.cache.get(service.key_for(profile)) == FAKE_GROQ_SERVER.plan
+
+
+def events(body: str) -> list:
+    parsed = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        parsed.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return parsed
+
+
+def test_sse_endpoint_streams_and_stores_the_plan(monkeypatch, sign_up):
+    monkeypatch.setattr(main, "db", MemoryDatabase())
+    fake = FAKE_GROQ_SERVER(first_token_latency=0.05, chunk_size=8)
+    monkeypatch.setattr(main, "groq", fake)
+    monkeypatch.setattr(main.recommendations, "groq", fake)
+    monkeypatch.setattr(main.recommendations, "cache", TTLCache(maxsize=16, ttl=60))
+    # Keep the background precomputer from generating the plan before the streams ask for it.
+    monkeypatch.setattr(main.plan_precomputer, "enqueue", lambda email: False)
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with main.lifespan(main.app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                headers = [await sign_up(client, f"sse{n}@example.com") for n in range(2)]
+                responses = await asyncio.gather(*(client.get("/api/auth/workout/recommendation/stream", headers=h)
+                                                   for h in headers))
+                stored = await main.db.get_profile("sse0@example.com")
+                replayed = await client.get("/api/auth/workout/recommendation/stream", headers=headers[0])
+                return responses, stored, replayed
+
+    responses, stored, replayed = asyncio.run(run())
+    for response in [*responses, replayed]:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        parsed = events(response.text)
+        assert [data for event, data in parsed if event == "exercise"] == FAKE_GROQ_SERVER.plan
+        assert parsed[-1][0] == "done"
+    # Both users have the same prompt inputs, so one completion served both streams.
+    assert fake.calls == 1
+    assert stored["recommended_exercise_plan"] == FAKE_GROQ_SERVER.plan
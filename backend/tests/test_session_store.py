@@ -0,0 +1,89 @@
+"""Landmark sessions append to day segments, replay as views, and survive compaction and restarts."""
+import os
+
+import numpy as np
+import pytest
+from workout.engine.main import NUM_LANDMARKS, NUM_CHANNELS
+from workout.store.main import SessionStore, SessionStoreError, SessionLive
+
+
+EMAIL = "store@example.com"
+
+
+def frames(count: int, start: float = 0.0) -> np.ndarray:
+    values = start + np.arange(count * NUM_LANDMARKS * NUM_CHANNELS, dtype=np.float32)
+    return values.reshape(count, NUM_LANDMARKS, NUM_CHANNELS)
+
+
+def test_append_and_replay(tmp_path):
+    store = SessionStore(str(tmp_path))
+    session_id = store.open_session(EMAIL, "Pushups", 10.0, "2026-01-05")
+    assert session_id == "2026-01-05.1"
+    assert store.append(EMAIL, session_id, frames(20)) == 20
+    assert store.append(EMAIL, session_id, frames(10, start=1e5)) == 30
+    assert store.close_session(EMAIL, session_id)["closed"]
+
+    replayed, session = store.replay(EMAIL, session_id)
+    np.testing.assert_array_equal(replayed, np.concatenate([frames(20), frames(10, start=1e5)]))
+    assert session["frames"] == 30 and not replayed.flags.writeable
+    # 1.5s to 2.5s at 10 fps is frames 15 to 24.
+    window, _ = store.replay(EMAIL, session_id, start=1.5, end=2.5)
+    np.testing.assert_array_equal(window, replayed[15:25])
+    assert len(store.replay(EMAIL, session_id, start=5)[0]) == 0
+
+    with pytest.raises(SessionStoreError):
+        store.append(EMAIL, session_id, frames(1))
+    with pytest.raises(SessionStoreError):
+        store.replay(EMAIL, "2026-01-05.9")
+
+
+def test_sessions_share_a_segment_and_reload_from_disk(tmp_path):
+    store = SessionStore(str(tmp_path))
+    first = store.open_session(EMAIL, "Squats", 30.0, "2026-01-05")
+    store.append(EMAIL, first, frames(5))
+    # Opening a new session closes the previous one.
+    second = store.open_session(EMAIL, "Crunches", 30.0, "2026-01-05")
+    store.append(EMAIL, second, frames(3, start=7.0))
+    assert [(s["session_id"], s["offset"], s["frames"], s["closed"]) for s in store.list_sessions(EMAIL)] == [
+        (first, 0, 5, True), (second, 5, 3, False)]
+
+    reopened = SessionStore(str(tmp_path))
+    assert reopened.list_sessions(EMAIL, "2026-01-05") == store.list_sessions(EMAIL)
+    np.testing.assert_array_equal(reopened.replay(EMAIL, second)[0], frames(3, start=7.0))
+    assert reopened.list_sessions("other@example.com") == []
+
+
+def test_store_session_refuses_while_live(tmp_path):
+    store = SessionStore(str(tmp_path))
+    live = store.open_session(EMAIL, "Pushups", 30.0, "2026-01-05")
+    with pytest.raises(SessionLive):
+        store.store_session(EMAIL, "Squats", 30.0, frames(4), "2026-01-05")
+    assert store.live[store.user_key(EMAIL)] == live
+
+    store.close_session(EMAIL, live)
+    stored = store.store_session(EMAIL, "Squats", 30.0, frames(4), "2026-01-05")
+    assert store.close_session(EMAIL, stored)["frames"] == 4
+    with pytest.raises(SessionStoreError):
+        store.store_session(EMAIL, "Squats", 30.0, np.zeros((4, NUM_LANDMARKS, 2)))
+
+
+def test_compact_folds_old_days_into_the_month(tmp_path):
+    store = SessionStore(str(tmp_path))
+    recorded = {}
+    for day, count in (("2026-01-05", 4), ("2026-01-05", 6), ("2026-01-06", 3)):
+        recorded[store.store_session(EMAIL, "Pushups", 30.0, frames(count, start=count * 1000.0), day)] = count
+    live = store.open_session(EMAIL, "Squats", 30.0, "2026-01-07")
+    store.append(EMAIL, live, frames(2))
+
+    # The 7th holds the live session and is kept even though it is before the cutoff.
+    assert store.compact("2026-01-08") == 2
+    user_dir = tmp_path / store.user_key(EMAIL)
+    assert sorted(os.listdir(user_dir)) == ["2026-01-07.idx", "2026-01-07.seg", "2026-01.idx", "2026-01.seg"]
+    for session_id, count in recorded.items():
+        np.testing.assert_array_equal(store.replay(EMAIL, session_id)[0], frames(count, start=count * 1000.0))
+    assert store.open_session(EMAIL, "Pushups", 30.0, "2026-01-05") == "2026-01-05.3"
+
+    reopened = SessionStore(str(tmp_path))
+    assert sorted(session["session_id"] for session in reopened.list_sessions(EMAIL, "2026-01-05")) == [
+        "2026-01-05.1", "2026-01-05.2", "2026-01-05.3"]
+    np.testing.assert_array_equal(reopened.replay(EMAIL, "2026-01-06.1")[0], frames(3, start=3000.0))
@@ -0,0 +1,93 @@
+"""SqliteDatabase applies each score batch exactly once, however often it is resent."""
+import asyncio
+
+import pytest
+from database.sqlite.main import SqliteDatabase
+from leaderboard.main import EXERCISES
+
+
+DAY = "2026-10-18"
+
+
+def row(email: str) -> dict:
+    zero = {exercise: 0 for exercise in EXERCISES}
+    return {"email": email, "username": email.split("@")[0], "total_points": dict(zero), "today_points": dict(zero),
+            "created_on": DAY, "last_updated": DAY}
+
+
+def entries(*scores, today: str = DAY) -> list:
+    return [{"email": email, "exercise": exercise, "score": score, "today": today} for email, exercise, score in scores]
+
+
+def totals(rows: list) -> dict:
+    return {r["email"]: r["total_points"] for r in rows}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "app.db")
+
+
+def test_resent_batch_is_applied_once(path):
+    async def go():
+        db = SqliteDatabase(path)
+        for email in ("a@example.com", "b@example.com"):
+            await db.create_leaderboard(row(email))
+        batch = entries(("a@example.com", "Pushups", 5), ("a@example.com", "Squats", 2), ("b@example.com", "Pushups", 1))
+        first = await db.increment_leaderboard(batch, batch_id="batch-1")
+        again = await db.increment_leaderboard(batch, batch_id="batch-1")
+        await db.close()
+        # A new connection, as after a restart: the id was committed with the increments.
+        db = SqliteDatabase(path)
+        resent = await db.increment_leaderboard(batch, batch_id="batch-1")
+        other = await db.increment_leaderboard(entries(("a@example.com", "Pushups", 1)), batch_id="batch-2")
+        unkeyed = [await db.increment_leaderboard(entries(("b@example.com", "Crunches", 3))) for _ in range(2)]
+        stored = {email: await db.get_leaderboard(email) for email in ("a@example.com", "b@example.com")}
+        await db.close()
+        return first, again, resent, other, unkeyed, stored
+
+    first, again, resent, other, unkeyed, stored = asyncio.run(go())
+    # A skipped batch still returns the final rows of the users it names.
+    assert totals(first) == totals(again) == totals(resent)
+    assert totals(first)["a@example.com"] == {"Pushups": 5, "Squats": 2, "Crunches": 0, "Bicep Curls": 0}
+    assert other[0]["total_points"]["Pushups"] == 6
+    # Without a batch id every call is applied.
+    assert [r[0]["total_points"]["Crunches"] for r in unkeyed] == [3, 6]
+    assert stored["a@example.com"]["today_points"] == {"Pushups": 6, "Squats": 2, "Crunches": 0, "Bicep Curls": 0}
+    assert stored["b@example.com"]["total_points"] == {"Pushups": 1, "Squats": 0, "Crunches": 6, "Bicep Curls": 0}
+
+
+def test_increment_rolls_today_over_on_a_new_day(path):
+    async def go():
+        db = SqliteDatabase(path)
+        await db.create_leaderboard(row("a@example.com"))
+        await db.increment_leaderboard(entries(("a@example.com", "Squats", 4)), batch_id="day-1")
+        rows = await db.increment_leaderboard(entries(("a@example.com", "Squats", 1), today="2026-10-19"), batch_id="day-2")
+        await db.close()
+        return rows[0]
+
+    stored = asyncio.run(go())
+    assert stored["total_points"]["Squats"] == 5
+    assert stored["today_points"]["Squats"] == 1
+    assert stored["last_updated"] == "2026-10-19"
+
+
+def test_rank_and_leases(path):
+    async def go():
+        db = SqliteDatabase(path)
+        for email in ("a@example.com", "b@example.com", "c@example.com"):
+            await db.create_leaderboard(row(email))
+        await db.increment_leaderboard(entries(("a@example.com", "Pushups", 5), ("a@example.com", "Squats", 1),
+                                               ("b@example.com", "Pushups", 5), ("c@example.com", "Squats", 9)))
+        ranks = [await db.leaderboard_rank(email) for email in ("a@example.com", "b@example.com", "c@example.com", "z@example.com")]
+        pushup_ranks = [await db.leaderboard_rank(email, "Pushups") for email in ("a@example.com", "b@example.com", "c@example.com")]
+        leases = [await db.acquire_lease("scan", "one", 60), await db.acquire_lease("scan", "two", 60),
+                  await db.acquire_lease("scan", "one", 60), await db.acquire_lease("other", "two", 60)]
+        await db.close()
+        return ranks, pushup_ranks, leases
+
+    ranks, pushup_ranks, leases = asyncio.run(go())
+    assert ranks == [2, 3, 1, None]
+    # Equal scores share a rank.
+    assert pushup_ranks == [1, 1, 3]
+    assert leases == [True, False, True, True]
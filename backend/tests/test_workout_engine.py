@@ -0,0 +1,94 @@
+"""Rep counts on known landmark sequences, and the binary session codec."""
+import numpy as np
+import pytest
+from workout.engine.main import RepEngine, POSE_LANDMARKS, NUM_LANDMARKS, NUM_CHANNELS
+from workout.codec.main import encode_session, decode_session, read_header, LandmarkCodecError, HEADER
+
+
+def frames_with_angles(angles, vertex: str, start: str, end: str, **fixed) -> np.ndarray:
+    """Frames whose angle at `vertex` between `start` and `end` follows `angles`, fully visible."""
+    frames = np.zeros((len(angles), NUM_LANDMARKS, NUM_CHANNELS), dtype=np.float32)
+    frames[:, :, 3] = 1.0
+    for name, point in fixed.items():
+        frames[:, POSE_LANDMARKS[name], :2] = point
+    frames[:, POSE_LANDMARKS[vertex], :2] = (0.5, 0.5)
+    frames[:, POSE_LANDMARKS[start], :2] = (0.5, 0.3)
+    radians = np.radians(angles)
+    frames[:, POSE_LANDMARKS[end], 0] = 0.5 + 0.2 * np.sin(radians)
+    frames[:, POSE_LANDMARKS[end], 1] = 0.5 - 0.2 * np.cos(radians)
+    return frames
+
+
+def curls(angles) -> np.ndarray:
+    return frames_with_angles(angles, "LEFT_ELBOW", "LEFT_SHOULDER", "LEFT_WRIST")
+
+
+def pushups(angles, hip=(0.9, 0.3)) -> np.ndarray:
+    # The hip beside the shoulder keeps hip-shoulder-elbow at 90 degrees, above the 30 the form check wants.
+    return frames_with_angles(angles, "LEFT_ELBOW", "LEFT_SHOULDER", "LEFT_WRIST", LEFT_HIP=hip)
+
+
+def test_bicep_curls_count_each_curl_up():
+    # Arm down, curl, down, curl, down, halfway (no change), curl.
+    result = RepEngine().analyze("Bicep Curls", curls([170, 20, 170, 20, 170, 100, 20]))
+    assert result == {"exercise": "Bicep Curls", "frames": 7, "reps": 3, "form_flags": {}}
+
+
+def test_pushups_count_half_reps_and_flag_form():
+    engine = RepEngine()
+    # Starting at the bottom: up, down, up, down is two reps, each half worth 0.5.
+    assert engine.analyze("Pushups", pushups([80, 160, 80, 160, 80]))["reps"] == 2.0
+    assert engine.analyze("Pushups", pushups([80, 160, 80, 160]))["reps"] == 1.5
+    # Hip in line with the elbow: bad form, so nothing counts and every frame is flagged.
+    sagging = engine.analyze("Pushups", pushups([160, 80, 160], hip=(0.5, 0.7)))
+    assert sagging["reps"] == 0
+    assert sagging["form_flags"] == {"Keep your core tight": {"frames": 3, "ratio": 1.0}}
+
+
+def test_low_visibility_frames_are_ignored():
+    frames = curls([170, 20, 170, 20])
+    frames[1, POSE_LANDMARKS["LEFT_WRIST"], 3] = 0.1
+    assert RepEngine().analyze("Bicep Curls", frames)["reps"] == 2
+    assert RepEngine(min_visibility=0.5).analyze("Bicep Curls", frames)["reps"] == 1
+
+
+def test_analyze_rejects_bad_input():
+    engine = RepEngine()
+    with pytest.raises(ValueError):
+        engine.analyze("Jumping Jacks", curls([170]))
+    with pytest.raises(ValueError):
+        engine.analyze("Pushups", np.zeros((4, 10, 4)))
+    assert engine.analyze("Squats", np.zeros((0, NUM_LANDMARKS, NUM_CHANNELS)))["reps"] == 0
+
+
+@pytest.mark.parametrize("float16, delta", [(False, False), (False, True), (True, False), (True, True)])
+def test_codec_round_trip(float16, delta):
+    rng = np.random.default_rng(7)
+    # A slow random walk, like landmarks moving between frames.
+    frames = (0.5 + np.cumsum(rng.normal(0, 0.002, (300, NUM_LANDMARKS, NUM_CHANNELS)), axis=0)).astype(np.float32)
+    data = encode_session(frames, fps=24.0, float16=float16, delta=delta)
+    decoded, header = decode_session(data)
+    assert (header.frames, header.landmarks, header.channels, header.fps) == (300, NUM_LANDMARKS, NUM_CHANNELS, 24.0)
+    assert read_header(data) == header
+    assert decoded.dtype == np.float32 and decoded.shape == frames.shape
+    if float16:
+        # Deltas are taken against the decoded frames, so the error stays at float16 precision to the end.
+        assert np.abs(decoded - frames).max() < 1e-3
+    else:
+        np.testing.assert_allclose(decoded, frames, atol=1e-6)
+
+
+@pytest.mark.parametrize("float16", [False, True])
+def test_rep_counts_survive_encoding(float16):
+    frames = curls(np.tile(np.linspace(170, 20, 15), 4))
+    decoded, _ = decode_session(encode_session(frames, float16=float16))
+    assert RepEngine().analyze("Bicep Curls", decoded)["reps"] == RepEngine().analyze("Bicep Curls", frames)["reps"] == 4
+
+
+def test_codec_rejects_malformed_payloads():
+    data = encode_session(curls([170, 20]))
+    for payload in (data[:HEADER.size - 1], b"XXXX" + data[4:], data[:-2], data + b"\x00\x00"):
+        with pytest.raises(LandmarkCodecError):
+            decode_session(payload)
+    with pytest.raises(LandmarkCodecError):
+        encode_session(np.zeros((2, 33)))
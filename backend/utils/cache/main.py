@@ -0,0 +1,133 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+import asyncio
+import time
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire at a per-entry deadline."""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None):
+        """Store `value`; `expires_at` (epoch seconds) overrides the default ttl."""
+        if expires_at is None and self.ttl is not None:
+            expires_at = time.time() + self.ttl
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        self._entries.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_MISSING = object()
+
+
+class SingleFlight:
+    """Share one in-flight coroutine between concurrent callers of the same key."""
+
+    def __init__(self):
+        self.calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        future = self.calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self.calls[key] = future
+            future.add_done_callback(lambda _: self.calls.pop(key, None))
+        # A cancelled waiter must not cancel the call the others are waiting on.
+        return await asyncio.shield(future)
+
+    def claim(self, key: Hashable) -> Optional[asyncio.Future]:
+        """Become the in-flight call for `key` when none is running.
+
+        Returns the future the caller must resolve (others wait on it), or
+        None when another call already holds the key.
+        """
+        if key in self.calls:
+            return None
+        future = asyncio.get_running_loop().create_future()
+        self.calls[key] = future
+        future.add_done_callback(lambda _: self.calls.pop(key, None) if self.calls.get(key) is future else None)
+        return future
+
+
+class RowCache:
+    """Read-through cache of whole rows of one table, keyed by a unique column.
+
+    Rows are read with the loader passed to `get`, such as `db.get_profile`.
+
+    Writers keep it current with `set` (the row the write returned) or
+    `invalidate`. A read that races a write for the same key does not
+    store what it fetched, so the cache never goes back to an older row.
+    Missing rows are not cached. Returned rows are shared; do not mutate them.
+    """
+
+    def __init__(self, key: str = "email", maxsize: int = 10000, ttl: Optional[float] = 60):
+        self.key = key
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # key -> (reads in flight, writes seen while they were)
+        self.reads: Dict[Hashable, list] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, load: Callable[[Hashable], Awaitable[Optional[Dict]]], value: Hashable) -> Optional[Dict]:
+        row = self.cache.get(value)
+        if row is not None:
+            self.hits += 1
+            return row
+        self.misses += 1
+        reads = self.reads.setdefault(value, [0, 0])
+        reads[0] += 1
+        writes = reads[1]
+        try:
+            row = await load(value)
+            if row is not None and reads[1] == writes:
+                self.cache.set(value, row)
+            return row
+        finally:
+            reads[0] -= 1
+            if not reads[0]:
+                del self.reads[value]
+
+    def _written(self, value: Hashable):
+        if value in self.reads:
+            self.reads[value][1] += 1
+
+    def set(self, row: Dict):
+        value = row[self.key]
+        self._written(value)
+        self.cache.set(value, row)
+
+    def invalidate(self, value: Hashable):
+        self._written(value)
+        self.cache.pop(value)
+
+    def stats(self) -> Dict:
+        return {"size": len(self.cache), "hits": self.hits, "misses": self.misses}
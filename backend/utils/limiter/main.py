@@ -0,0 +1,210 @@
+import math
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional, Callable, Dict, Tuple
+from fastapi import Depends, Request
+
+
+logger = logging.getLogger(__name__)
+
+UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class LimitExceeded(Exception):
+    """A request turned away by the limiter; answered with `status_code` and Retry-After."""
+
+    status_code = 429
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {"Retry-After": str(max(1, math.ceil(self.retry_after)))}
+
+
+class RateLimited(LimitExceeded):
+    status_code = 429
+
+
+class Overloaded(LimitExceeded):
+    status_code = 503
+
+
+def parse_rate(rate: Optional[str]) -> Optional[Tuple[float, float]]:
+    """"20/minute" -> (capacity 20, refill 20/60 tokens per second); empty or "0" disables."""
+    if not rate or rate.strip() == "0":
+        return None
+    count, _, unit = rate.partition("/")
+    return float(count), float(count) / UNITS[unit.strip().rstrip("s") or "second"]
+
+
+class MemoryBackend:
+    """Token buckets kept in this process; each worker counts on its own."""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        # key -> (tokens, updated_at, full_at)
+        self.buckets: Dict[str, Tuple[float, float, float]] = {}
+
+    async def take(self, key: str, capacity: float, per_second: float, cost: float = 1.0) -> float:
+        """Take `cost` tokens; return 0 when allowed, else the seconds until they would be."""
+        now = time.monotonic()
+        tokens, updated_at, _ = self.buckets.get(key, (capacity, now, now))
+        tokens = min(capacity, tokens + (now - updated_at) * per_second)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / per_second
+        self.buckets[key] = (tokens, now, now + (capacity - tokens) / per_second)
+        if len(self.buckets) > self.max_keys:
+            self._prune(now)
+        return wait
+
+    def _prune(self, now: float):
+        # A bucket that has refilled is the same as no bucket.
+        for key in [key for key, (_, _, full_at) in self.buckets.items() if full_at <= now]:
+            del self.buckets[key]
+
+    async def close(self):
+        pass
+
+
+class RedisBackend:
+    """Token buckets in Redis, shared by every worker; needs the `redis` package.
+
+    Each take is one atomic script call using the server clock. When Redis
+    cannot be reached requests are let through rather than failed.
+    """
+
+    script = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local cost = tonumber(ARGV[3])
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    local wait = 0
+    if tokens >= cost then tokens = tokens - cost else wait = (cost - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str, prefix: str = "limiter:"):
+        from redis.asyncio import from_url
+        self.client = from_url(url)
+        self.prefix = prefix
+        self.take_script = self.client.register_script(self.script)
+
+    async def take(self, key: str, capacity: float, per_second: float, cost: float = 1.0) -> float:
+        try:
+            wait = await self.take_script(keys=[self.prefix + key], args=[capacity, per_second, cost])
+        except Exception:
+            logger.warning("Rate limit backend unavailable, allowing request", exc_info=True)
+            return 0.0
+        return float(wait)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class ConcurrencyLimit:
+    """At most `limit` requests of one cost class at a time in this process.
+
+    Requests wait up to `queue_timeout` seconds for a slot; past that, or
+    when `max_waiting` are already waiting, they are shed with a 503.
+    """
+
+    def __init__(self, name: str, limit: int, queue_timeout: float, max_waiting: int):
+        self.name = name
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self.max_waiting = max_waiting
+        self.semaphore = asyncio.Semaphore(limit)
+        self.active = 0
+        self.waiting = 0
+        self.shed = 0
+
+    def _overloaded(self) -> Overloaded:
+        self.shed += 1
+        return Overloaded(f"Too many {self.name} requests in progress, try again shortly", self.queue_timeout)
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.semaphore.locked() and self.waiting >= self.max_waiting:
+            raise self._overloaded()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise self._overloaded()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.semaphore.release()
+
+
+class Limiter:
+    """Per-route admission control: token buckets per client and caps per cost class.
+
+    `limit` builds a route dependency. Buckets are named, so routes that
+    share a name share a budget. Users are told apart by `identify` (the
+    bearer token's email) and clients by IP; X-Forwarded-For is only
+    believed with `trust_forwarded`, as set by a proxy in front of the app.
+    """
+
+    def __init__(self, backend=None, classes: Optional[Dict[str, ConcurrencyLimit]] = None,
+                 identify: Optional[Callable[[Request], Optional[str]]] = None, trust_forwarded: bool = False):
+        self.backend = backend or MemoryBackend()
+        self.classes = classes or {}
+        self.identify = identify
+        self.trust_forwarded = trust_forwarded
+        self.rejected = 0
+
+    def client_ip(self, request: Request) -> str:
+        if self.trust_forwarded:
+            forwarded = request.headers.get("x-forwarded-for")
+            if forwarded:
+                # The proxy appends the address it saw; earlier entries come from the client.
+                return forwarded.split(",")[-1].strip()
+        return request.client.host if request.client else "unknown"
+
+    async def _take(self, key: str, rate: Tuple[float, float]):
+        wait = await self.backend.take(key, *rate)
+        if wait > 0:
+            self.rejected += 1
+            raise RateLimited("Too many requests, slow down", wait)
+
+    def limit(self, name: str, per_ip: Optional[str] = None, per_user: Optional[str] = None, cost: Optional[str] = None):
+        """Dependency enforcing the `per_ip`/`per_user` rates ("10/minute") and the `cost` class cap."""
+        ip_rate, user_rate = parse_rate(per_ip), parse_rate(per_user)
+        concurrency = self.classes[cost] if cost else None
+
+        async def dependency(request: Request):
+            if ip_rate:
+                await self._take(f"{name}:ip:{self.client_ip(request)}", ip_rate)
+            identity = self.identify(request) if user_rate and self.identify else None
+            if identity:
+                await self._take(f"{name}:user:{identity}", user_rate)
+            if concurrency is None:
+                yield
+                return
+            async with concurrency.slot():
+                yield
+
+        return Depends(dependency)
+
+    async def close(self):
+        await self.backend.close()
@@ -0,0 +1,214 @@
+import sys
+import time
+import threading
+import contextvars
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+from typing import Optional, Dict, List, Tuple
+
+# Upper bounds in seconds for durations and in bytes for payload sizes.
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram, one series per label set."""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [count per bucket (+Inf last), sum]
+        self.series: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, *label_values: str):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, (counts, total) in self.series.items():
+            labels = ",".join(f'{name}="{value}"' for name, value in zip(self.labels, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+class RequestTimings:
+    """Time spent per phase (db, llm, bcrypt, serialize, ...) within one request.
+
+    Calls awaited together with asyncio.gather each add their full
+    duration, so a phase can add up to more than the request's wall time.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, List[float]] = {}
+
+    def add(self, phase: str, seconds: float):
+        entry = self.phases.setdefault(phase, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+    def count(self, phase: str) -> int:
+        return self.phases.get(phase, (0.0, 0))[1]
+
+
+current_timings: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar("current_timings", default=None)
+
+
+@contextmanager
+def timed(phase: str):
+    """Add the duration of the block to the current request's `phase`."""
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - start)
+
+
+def instrument(phase: str):
+    """Decorator form of `timed` for coroutine methods."""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with timed(phase):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Metrics:
+    """Request histograms fed by `MetricsMiddleware`, rendered for /metrics."""
+
+    def __init__(self):
+        self.requests = Histogram("http_request_duration_seconds", "Request duration.", ("method", "route", "status"), DURATION_BUCKETS)
+        self.phases = Histogram("http_request_phase_seconds", "Time per request spent in each phase.", ("route", "phase"), DURATION_BUCKETS)
+        self.db_round_trips = Histogram("http_request_db_round_trips", "Database round-trips per request.", ("route",), COUNT_BUCKETS)
+        self.request_bytes = Histogram("http_request_size_bytes", "Request body size.", ("route",), SIZE_BUCKETS)
+        self.response_bytes = Histogram("http_response_size_bytes", "Response body size.", ("route",), SIZE_BUCKETS)
+
+    def record(self, method: str, route: str, status: int, seconds: float, timings: RequestTimings, request_size: int, response_size: int):
+        self.requests.observe(seconds, method, route, f"{status // 100}xx")
+        for phase, (phase_seconds, _) in timings.phases.items():
+            self.phases.observe(phase_seconds, route, phase)
+        self.db_round_trips.observe(timings.count("db"), route)
+        self.request_bytes.observe(request_size, route)
+        self.response_bytes.observe(response_size, route)
+
+    def render(self) -> str:
+        lines = []
+        for histogram in (self.requests, self.phases, self.db_round_trips, self.request_bytes, self.response_bytes):
+            lines.extend(histogram.render())
+        return "\n".join(lines) + "\n"
+
+
+def server_timing(timings: RequestTimings, total: float) -> str:
+    entries = [f"{phase};dur={seconds * 1000:.2f}" for phase, (seconds, _) in timings.phases.items()]
+    entries.append(f"app;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+class MetricsMiddleware:
+    """ASGI middleware that times every HTTP request and its phases.
+
+    Route labels are the matched path templates, so user ids in paths do
+    not create new series. With `server_timing` the phases are also sent
+    in a Server-Timing header; a streamed response reports what had been
+    spent when its headers went out.
+    """
+
+    def __init__(self, app, metrics: Metrics, server_timing: bool = False):
+        self.app = app
+        self.metrics = metrics
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+        state = {"status": 500, "response_size": 0}
+        request_size = int(dict(scope["headers"]).get(b"content-length", 0) or 0)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                if self.server_timing:
+                    header = server_timing(timings, time.perf_counter() - start).encode("latin-1")
+                    message = {**message, "headers": list(message.get("headers", [])) + [(b"server-timing", header)]}
+            elif message["type"] == "http.response.body":
+                state["response_size"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_timings.reset(token)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            self.metrics.record(scope["method"], route, state["status"], time.perf_counter() - start,
+                                timings, request_size, state["response_size"])
+
+
+class SamplingProfiler:
+    """Samples the stack of one thread (the event loop) at a fixed interval.
+
+    Samples are kept as collapsed stacks ("a;b;c count" lines), the input
+    format of flamegraph.pl and speedscope. Sampling runs in a background
+    thread and costs nothing while the profiler is stopped.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.thread: Optional[threading.Thread] = None
+        self.stopping = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, thread_id: Optional[int] = None):
+        if self.running:
+            raise RuntimeError("Profiler is already running")
+        target = thread_id or threading.get_ident()
+        self.samples = Counter()
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._sample, args=(target,), name="sampling-profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def _sample(self, target: int):
+        while not self.stopping.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
@@ -0,0 +1,45 @@
+import hashlib
+from typing import Any, Optional
+import orjson
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from utils.metrics.main import timed
+
+OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def dumps(content: Any) -> bytes:
+    with timed("serialize"):
+        return orjson.dumps(content, option=OPTIONS)
+
+
+def etag(body: bytes) -> str:
+    """Strong ETag from a hash of the encoded body."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson; the app's default response class."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def not_modified(request: Request, tag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    # Weak comparison, as RFC 9110 asks for If-None-Match.
+    return "*" in candidates or tag in candidates or f"W/{tag}" in candidates
+
+
+def conditional_response(request: Request, content: Any = None, body: Optional[bytes] = None,
+                         tag: Optional[str] = None, status_code: int = 200) -> Response:
+    """Encode `content` (or send pre-encoded `body`) with an ETag, answering 304 when the client has it."""
+    body = dumps(content) if body is None else body
+    tag = tag or etag(body)
+    headers = {"ETag": tag, "Cache-Control": "private, no-cache"}
+    if not_modified(request, tag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
@@ -0,0 +1,49 @@
+import json
+from typing import Any, List, Dict
+
+
+class JsonArrayStream:
+    """Incrementally pull complete objects out of a streamed JSON array.
+
+    Text is fed in arbitrary chunks; every top-level `{...}` object is
+    returned as soon as its closing brace arrives. Anything outside those
+    objects (the array brackets, commas, code fences or stray prose) is
+    skipped.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.current: List[str] = []
+
+    def feed(self, text: str) -> List[Dict]:
+        objects = []
+        for char in text:
+            if self.depth == 0:
+                if char == "{":
+                    self.depth = 1
+                    self.current = [char]
+                continue
+            self.current.append(char)
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                self.depth += 1
+            elif char == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    objects.append(json.loads("".join(self.current)))
+                    self.current = []
+        return objects
+
+
+def server_sent_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,81 @@
+import struct
+from typing import NamedTuple, Tuple
+import numpy as np
+
+# Session layout (little-endian):
+#   magic "PPLM" | version u8 | flags u8 | landmarks u8 | channels u8 | frames u32 | fps f32
+# followed by frames * landmarks * channels values, float32 or float16. With
+# FLAG_DELTA every frame after the first stores the difference to the
+# previous reconstructed frame.
+MAGIC = b"PPLM"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBBIf")
+FLAG_FLOAT16 = 0x01
+FLAG_DELTA = 0x02
+
+
+class LandmarkCodecError(ValueError):
+    """Raised when a landmark session payload is malformed."""
+
+
+class SessionHeader(NamedTuple):
+    version: int
+    flags: int
+    landmarks: int
+    channels: int
+    frames: int
+    fps: float
+
+
+def encode_session(frames: np.ndarray, fps: float = 30.0, float16: bool = True, delta: bool = True) -> bytes:
+    """Pack a (frames, landmarks, channels) array into the binary session format."""
+    frames = np.asarray(frames, dtype=np.float32)
+    if frames.ndim != 3:
+        raise LandmarkCodecError(f"Expected a (frames, landmarks, channels) array, got {frames.shape}")
+    count, landmarks, channels = frames.shape
+    flags = (FLAG_FLOAT16 if float16 else 0) | (FLAG_DELTA if delta else 0)
+    dtype = np.float16 if float16 else np.float32
+    if delta and count:
+        # Deltas are taken against what the decoder will reconstruct, so
+        # quantisation error does not accumulate over the session.
+        body = np.empty(frames.shape, dtype=dtype)
+        body[0] = frames[0]
+        previous = body[0].astype(np.float32)
+        for index in range(1, count):
+            body[index] = frames[index] - previous
+            previous = previous + body[index].astype(np.float32)
+    else:
+        body = frames.astype(dtype, copy=False)
+    header = HEADER.pack(MAGIC, VERSION, flags, landmarks, channels, count, fps)
+    return header + np.ascontiguousarray(body).astype(np.dtype(dtype).newbyteorder("<"), copy=False).tobytes()
+
+
+def read_header(data: bytes) -> SessionHeader:
+    if len(data) < HEADER.size:
+        raise LandmarkCodecError("Payload is shorter than the session header")
+    magic, version, flags, landmarks, channels, frames, fps = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise LandmarkCodecError("Payload is not a landmark session")
+    if version != VERSION:
+        raise LandmarkCodecError(f"Unsupported session version {version}")
+    return SessionHeader(version, flags, landmarks, channels, frames, fps)
+
+
+def decode_session(data: bytes) -> Tuple[np.ndarray, SessionHeader]:
+    """Decode a session into a float32 (frames, landmarks, channels) array.
+
+    Uncompressed float32 sessions are returned as a read-only view over
+    `data`; float16 and delta sessions cost one vectorised conversion.
+    """
+    header = read_header(data)
+    dtype = np.dtype("<f2" if header.flags & FLAG_FLOAT16 else "<f4")
+    count = header.frames * header.landmarks * header.channels
+    if len(data) != HEADER.size + count * dtype.itemsize:
+        raise LandmarkCodecError("Payload size does not match its header")
+    values = np.frombuffer(data, dtype=dtype, count=count, offset=HEADER.size)
+    values = values.reshape(header.frames, header.landmarks, header.channels)
+    if header.flags & FLAG_DELTA:
+        values = np.cumsum(values, axis=0, dtype=np.float32)
+    elif dtype != np.float32:
+        values = values.astype(np.float32)
+    return values, header
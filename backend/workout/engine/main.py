@@ -0,0 +1,127 @@
+import numpy as np
+from typing import Dict, Tuple
+
+# MediaPipe pose landmark indices, mirroring frontend/src/lib/landmarkUtils.js
+POSE_LANDMARKS = {
+    "LEFT_SHOULDER": 11,
+    "LEFT_ELBOW": 13,
+    "LEFT_WRIST": 15,
+    "RIGHT_SHOULDER": 12,
+    "RIGHT_ELBOW": 14,
+    "RIGHT_WRIST": 16,
+    "LEFT_HIP": 23,
+    "RIGHT_HIP": 24,
+    "RIGHT_KNEE": 26,
+    "LEFT_KNEE": 25,
+    "LEFT_ANKLE": 27,
+}
+NUM_LANDMARKS = 33
+# x, y, z, visibility
+NUM_CHANNELS = 4
+UP, DOWN = 1, -1
+
+
+def joint_angles(frames: np.ndarray, a: int, b: int, c: int) -> np.ndarray:
+    """Angle in degrees at landmark `b` for every frame, as `calculateAngle` does."""
+    ba = frames[:, a, :2] - frames[:, b, :2]
+    bc = frames[:, c, :2] - frames[:, b, :2]
+    angle = np.abs(np.degrees(np.arctan2(bc[:, 1], bc[:, 0]) - np.arctan2(ba[:, 1], ba[:, 0])))
+    return np.where(angle > 180.0, 360.0 - angle, angle)
+
+
+def hold_states(events: np.ndarray, initial: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Forward-fill UP/DOWN events (0 = no change) into per-frame states.
+
+    Returns (state after each frame, state before each frame).
+    """
+    positions = np.where(events != 0, np.arange(len(events)), -1)
+    np.maximum.accumulate(positions, out=positions)
+    after = np.where(positions >= 0, events[np.maximum(positions, 0)], initial)
+    before = np.concatenate(([initial], after[:-1]))
+    return after, before
+
+
+class RepEngine:
+    """Server-side rep counting and form checks over whole landmark sequences.
+
+    Frames are a (frames, 33, 4) array of MediaPipe landmarks. Angles are
+    computed for the whole sequence at once and the up/down state machines
+    from the workout components are evaluated with array operations, so the
+    counts match what the browser shows for the same frames.
+    """
+
+    def __init__(self, min_visibility: float = 0.0):
+        self.min_visibility = min_visibility
+        self.counters = {
+            "Pushups": self._pushups,
+            "Squats": self._squats,
+            "Crunches": self._crunches,
+            "Bicep Curls": self._bicep_curls,
+        }
+
+    def _visible(self, frames: np.ndarray, *landmarks: int) -> np.ndarray:
+        if self.min_visibility <= 0 or frames.shape[2] < NUM_CHANNELS:
+            return np.ones(len(frames), dtype=bool)
+        return (frames[:, list(landmarks), 3] >= self.min_visibility).all(axis=1)
+
+    def analyze(self, exercise: str, frames: np.ndarray) -> Dict:
+        if exercise not in self.counters:
+            raise ValueError(f"Unknown exercise {exercise}")
+        frames = np.asarray(frames, dtype=np.float32)
+        if frames.ndim != 3 or frames.shape[1] != NUM_LANDMARKS or frames.shape[2] < 2:
+            raise ValueError(f"Expected frames shaped (n, {NUM_LANDMARKS}, {NUM_CHANNELS}), got {frames.shape}")
+        if len(frames) == 0:
+            return {"exercise": exercise, "frames": 0, "reps": 0, "form_flags": {}}
+        reps, form_flags = self.counters[exercise](frames)
+        return {"exercise": exercise, "frames": int(len(frames)), "reps": reps, "form_flags": form_flags}
+
+    @staticmethod
+    def _flag(mask: np.ndarray, message: str) -> Dict:
+        count = int(mask.sum())
+        if count == 0:
+            return {}
+        return {message: {"frames": count, "ratio": round(count / len(mask), 4)}}
+
+    def _pushups(self, frames):
+        lm = POSE_LANDMARKS
+        visible = self._visible(frames, lm["LEFT_SHOULDER"], lm["LEFT_ELBOW"], lm["LEFT_WRIST"], lm["LEFT_HIP"])
+        elbow = joint_angles(frames, lm["LEFT_SHOULDER"], lm["LEFT_ELBOW"], lm["LEFT_WRIST"])
+        shoulder = joint_angles(frames, lm["LEFT_HIP"], lm["LEFT_SHOULDER"], lm["LEFT_ELBOW"])
+        proper = visible & (shoulder > 30)
+        events = np.where(proper & (elbow > 150), UP, np.where(proper & (elbow < 90), DOWN, 0))
+        after, before = hold_states(events, DOWN)
+        # Every half of the movement is worth half a rep.
+        reps = 0.5 * int((after != before).sum())
+        return reps, self._flag(visible & ~proper, "Keep your core tight")
+
+    def _squats(self, frames):
+        lm = POSE_LANDMARKS
+        visible = self._visible(frames, lm["LEFT_SHOULDER"], lm["LEFT_HIP"], lm["LEFT_KNEE"], lm["LEFT_ANKLE"])
+        shoulder_hip_knee = joint_angles(frames, lm["LEFT_SHOULDER"], lm["LEFT_HIP"], lm["LEFT_KNEE"])
+        hip_knee_ankle = joint_angles(frames, lm["LEFT_HIP"], lm["LEFT_KNEE"], lm["LEFT_ANKLE"])
+        standing = visible & (shoulder_hip_knee > 170)
+        squatting = visible & (hip_knee_ankle < 100)
+        # A frame that is both standing and squatting first scores, then goes down.
+        events = np.where(squatting, DOWN, np.where(standing, UP, 0))
+        after, before = hold_states(events, UP)
+        reps = int((standing & (before == DOWN)).sum())
+        return reps, self._flag(visible & (hip_knee_ankle < 80), "Squat Lower")
+
+    def _crunches(self, frames):
+        lm = POSE_LANDMARKS
+        visible = self._visible(frames, lm["RIGHT_SHOULDER"], lm["RIGHT_HIP"], lm["RIGHT_KNEE"])
+        angle = joint_angles(frames, lm["RIGHT_KNEE"], lm["RIGHT_HIP"], lm["RIGHT_SHOULDER"])
+        percentage = np.clip(np.floor((117 - angle) / (117 - 114) * 100 + 0.5), 0, 100)
+        events = np.where(visible & (percentage >= 95), UP, np.where(visible & (percentage <= 5), DOWN, 0))
+        after, before = hold_states(events, DOWN)
+        reps = 0.5 * int((after != before).sum())
+        return reps, {}
+
+    def _bicep_curls(self, frames):
+        lm = POSE_LANDMARKS
+        visible = self._visible(frames, lm["LEFT_SHOULDER"], lm["LEFT_ELBOW"], lm["LEFT_WRIST"])
+        angle = joint_angles(frames, lm["LEFT_SHOULDER"], lm["LEFT_ELBOW"], lm["LEFT_WRIST"])
+        events = np.where(visible & (angle < 30), UP, np.where(visible & (angle > 160), DOWN, 0))
+        after, before = hold_states(events, DOWN)
+        reps = int(((before == DOWN) & (after == UP)).sum())
+        return reps, {}
@@ -0,0 +1,243 @@
+import os
+import json
+import mmap
+import hashlib
+import threading
+from collections import defaultdict
+from typing import Optional, List, Dict, Tuple
+import numpy as np
+from workout.engine.main import NUM_LANDMARKS, NUM_CHANNELS
+from leaderboard.main import local_today
+from config.settings.main import settings
+
+
+FRAME_VALUES = NUM_LANDMARKS * NUM_CHANNELS
+FRAME_BYTES = FRAME_VALUES * 4
+
+
+class SessionStoreError(ValueError):
+    """Raised for unknown sessions or frames that do not fit the store layout."""
+
+
+class SessionLive(SessionStoreError):
+    """Raised when a finished recording is stored while the user has a live session."""
+
+
+class SessionStore:
+    """Append-only landmark session store on local disk.
+
+    Every user gets a directory holding one segment per day
+    (`YYYY-MM-DD.seg`, raw float32 frames) and a JSON-lines index next to
+    it (`YYYY-MM-DD.idx`). A user has at most one live session, so each
+    session occupies a contiguous run of frames in its segment and replay
+    is a NumPy view over the memory-mapped file. `compact` folds old day
+    segments into one segment per month. Live-session state is held in
+    memory, so a store directory belongs to a single worker process.
+    Methods block on file I/O and are meant to run in a thread pool; `lock`
+    keeps them and `compact` from interleaving.
+    """
+
+    root = settings.workout_session_dir
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or self.root
+        # (user_key, segment name) -> {session_id: session}
+        self.indexes: Dict[Tuple[str, str], Dict[str, Dict]] = {}
+        self.live: Dict[str, str] = {}
+        self.maps: Dict[str, mmap.mmap] = {}
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def user_key(email: str) -> str:
+        return hashlib.sha256(email.lower().encode("utf-8")).hexdigest()[:24]
+
+    def _path(self, user_key: str, segment: str, suffix: str) -> str:
+        return os.path.join(self.root, user_key, f"{segment}.{suffix}")
+
+    def _index(self, user_key: str, segment: str) -> Dict[str, Dict]:
+        key = (user_key, segment)
+        if key not in self.indexes:
+            sessions: Dict[str, Dict] = {}
+            path = self._path(user_key, segment, "idx")
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as index_file:
+                    for line in index_file:
+                        record = json.loads(line)
+                        if record["type"] == "session":
+                            sessions[record["session_id"]] = {k: v for k, v in record.items() if k != "type"}
+                            sessions[record["session_id"]].setdefault("frames", 0)
+                            sessions[record["session_id"]].setdefault("closed", False)
+                        elif record["type"] == "append":
+                            sessions[record["session_id"]]["frames"] += record["frames"]
+                        elif record["type"] == "close":
+                            sessions[record["session_id"]]["closed"] = True
+            self.indexes[key] = sessions
+        return self.indexes[key]
+
+    def _log(self, user_key: str, segment: str, record: Dict):
+        with open(self._path(user_key, segment, "idx"), "a", encoding="utf-8") as index_file:
+            index_file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def _locate(self, email: str, session_id: str) -> Tuple[str, str, Dict]:
+        user_key = self.user_key(email)
+        day = session_id.split(".")[0]
+        for segment in (day, day[:7]):
+            session = self._index(user_key, segment).get(session_id)
+            if session is not None:
+                return user_key, segment, session
+        raise SessionStoreError(f"Unknown session {session_id}")
+
+    def _next_number(self, user_key: str, day: str) -> int:
+        # Sessions of a compacted day live on in the month segment, so count those too.
+        numbers = [int(session_id.rsplit(".", 1)[1]) for segment in (day, day[:7])
+                   for session_id in self._index(user_key, segment) if session_id.startswith(day + ".")]
+        return max(numbers, default=0) + 1
+
+    def open_session(self, email: str, exercise: str, fps: float, day: Optional[str] = None) -> str:
+        """Start a live session, closing the user's previous one; returns its id."""
+        with self.lock:
+            user_key = self.user_key(email)
+            if user_key in self.live:
+                self.close_session(email, self.live[user_key])
+            day = day or local_today()
+            os.makedirs(os.path.join(self.root, user_key), exist_ok=True)
+            sessions = self._index(user_key, day)
+            segment_path = self._path(user_key, day, "seg")
+            offset = os.path.getsize(segment_path) // FRAME_BYTES if os.path.exists(segment_path) else 0
+            session_id = f"{day}.{self._next_number(user_key, day)}"
+            session = {"session_id": session_id, "exercise": exercise, "fps": fps, "offset": offset}
+            self._log(user_key, day, {"type": "session", **session})
+            sessions[session_id] = {**session, "frames": 0, "closed": False}
+            self.live[user_key] = session_id
+            return session_id
+
+    @staticmethod
+    def _frames(frames: np.ndarray) -> np.ndarray:
+        frames = np.ascontiguousarray(frames, dtype="<f4")
+        if frames.ndim != 3 or frames.shape[1:] != (NUM_LANDMARKS, NUM_CHANNELS):
+            raise SessionStoreError(f"Expected frames shaped (n, {NUM_LANDMARKS}, {NUM_CHANNELS}), got {frames.shape}")
+        return frames
+
+    def append(self, email: str, session_id: str, frames: np.ndarray) -> int:
+        """Append frames to a live session and return its total frame count."""
+        with self.lock:
+            user_key, segment, session = self._locate(email, session_id)
+            if session["closed"] or self.live.get(user_key) != session_id:
+                raise SessionStoreError(f"Session {session_id} is not live")
+            frames = self._frames(frames)
+            with open(self._path(user_key, segment, "seg"), "ab") as segment_file:
+                segment_file.write(frames.tobytes())
+            self._log(user_key, segment, {"type": "append", "session_id": session_id, "frames": len(frames)})
+            session["frames"] += len(frames)
+            return session["frames"]
+
+    def store_session(self, email: str, exercise: str, fps: float, frames: np.ndarray, day: Optional[str] = None) -> str:
+        """Store a finished recording as a closed session and return its id.
+
+        Raises SessionLive while the user has a live session: its frames
+        must stay contiguous in the segment, and it is not ours to close.
+        """
+        with self.lock:
+            live_session = self.live.get(self.user_key(email))
+            if live_session is not None:
+                raise SessionLive(f"Session {live_session} is live; close it before storing a recording")
+            frames = self._frames(frames)
+            session_id = self.open_session(email, exercise, fps, day)
+            self.append(email, session_id, frames)
+            self.close_session(email, session_id)
+            return session_id
+
+    def close_session(self, email: str, session_id: str) -> Dict:
+        with self.lock:
+            user_key, segment, session = self._locate(email, session_id)
+            if not session["closed"]:
+                self._log(user_key, segment, {"type": "close", "session_id": session_id})
+                session["closed"] = True
+            if self.live.get(user_key) == session_id:
+                del self.live[user_key]
+            return dict(session)
+
+    def list_sessions(self, email: str, day: Optional[str] = None) -> List[Dict]:
+        with self.lock:
+            user_key = self.user_key(email)
+            directory = os.path.join(self.root, user_key)
+            if not os.path.isdir(directory):
+                return []
+            segments = sorted(name[:-4] for name in os.listdir(directory) if name.endswith(".idx"))
+            if day:
+                segments = [segment for segment in segments if segment in (day, day[:7])]
+            sessions = [dict(session) for segment in segments for session in self._index(user_key, segment).values()]
+            return [session for session in sessions if not day or session["session_id"].startswith(day + ".")]
+
+    def _map(self, path: str) -> Optional[mmap.mmap]:
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size == 0:
+            return None
+        mapped = self.maps.get(path)
+        if mapped is None or len(mapped) < size:
+            # Old maps stay alive while replayed views still reference them.
+            with open(path, "rb") as segment_file:
+                mapped = mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.maps[path] = mapped
+        return mapped
+
+    def replay(self, email: str, session_id: str, start: Optional[float] = None, end: Optional[float] = None) -> Tuple[np.ndarray, Dict]:
+        """Frames of a session between `start` and `end` seconds, as a read-only view."""
+        with self.lock:
+            user_key, segment, session = self._locate(email, session_id)
+            first = 0 if start is None else max(int(start * session["fps"]), 0)
+            last = session["frames"] if end is None else min(int(end * session["fps"]), session["frames"])
+            if last <= first:
+                return np.empty((0, NUM_LANDMARKS, NUM_CHANNELS), dtype=np.float32), dict(session)
+            mapped = self._map(self._path(user_key, segment, "seg"))
+            frames = np.frombuffer(mapped, dtype="<f4", count=(last - first) * FRAME_VALUES,
+                                   offset=(session["offset"] + first) * FRAME_BYTES)
+            return frames.reshape(last - first, NUM_LANDMARKS, NUM_CHANNELS), dict(session)
+
+    def compact(self, before: str) -> int:
+        """Fold closed day segments older than `before` (YYYY-MM-DD) into month segments.
+
+        Returns the number of day segments removed.
+        """
+        removed = 0
+        if not os.path.isdir(self.root):
+            return removed
+        for user_key in os.listdir(self.root):
+            # Per user, so sessions of other users are not held up for the whole pass.
+            with self.lock:
+                directory = os.path.join(self.root, user_key)
+                days = sorted(name[:-4] for name in os.listdir(directory)
+                              if name.endswith(".idx") and len(name) == len("YYYY-MM-DD.idx") and name[:-4] < before)
+                live_session = self.live.get(user_key, "")
+                by_month = defaultdict(list)
+                for day in days:
+                    if not live_session.startswith(day + "."):
+                        by_month[day[:7]].append(day)
+                for month, month_days in by_month.items():
+                    month_path = self._path(user_key, month, "seg")
+                    offset = os.path.getsize(month_path) // FRAME_BYTES if os.path.exists(month_path) else 0
+                    records = []
+                    with open(month_path, "ab") as month_file:
+                        for day in month_days:
+                            day_path = self._path(user_key, day, "seg")
+                            mapped = self._map(day_path)
+                            for session in self._index(user_key, day).values():
+                                if session["frames"] == 0:
+                                    continue
+                                start = session["offset"] * FRAME_BYTES
+                                month_file.write(mapped[start:start + session["frames"] * FRAME_BYTES])
+                                records.append({"type": "session", **session, "offset": offset, "closed": True})
+                                offset += session["frames"]
+                        month_file.flush()
+                        os.fsync(month_file.fileno())
+                    for record in records:
+                        self._log(user_key, month, record)
+                    self.indexes.pop((user_key, month), None)
+                    for day in month_days:
+                        self.maps.pop(self._path(user_key, day, "seg"), None)
+                        self.indexes.pop((user_key, day), None)
+                        for suffix in ("seg", "idx"):
+                            if os.path.exists(self._path(user_key, day, suffix)):
+                                os.remove(self._path(user_key, day, suffix))
+                        removed += 1
+        return removed
@@ -0,0 +1,115 @@
+// Binary landmark session encoder, matching backend/workout/codec/main.py.
+//
+// Layout (little-endian): "PPLM" | version u8 | flags u8 | landmarks u8 |
+// channels u8 | frames u32 | fps f32, followed by every frame's
+// [x, y, z, visibility] values as float32 or float16. With delta encoding each
+// frame after the first stores its difference to the previous frame.
+
+export const SESSION_MAGIC = "PPLM";
+export const SESSION_VERSION = 1;
+export const FLAG_FLOAT16 = 0x01;
+export const FLAG_DELTA = 0x02;
+export const HEADER_SIZE = 16;
+export const NUM_LANDMARKS = 33;
+export const NUM_CHANNELS = 4;
+
+const floatView = new Float32Array(1);
+const bitsView = new Uint32Array(floatView.buffer);
+
+// Round a number to the nearest float16 and return its bit pattern.
+export const toFloat16Bits = (value) => {
+  floatView[0] = value;
+  const bits = bitsView[0];
+  const sign = (bits >>> 16) & 0x8000;
+  let exponent = ((bits >>> 23) & 0xff) - 127 + 15;
+  let mantissa = bits & 0x7fffff;
+
+  if (((bits >>> 23) & 0xff) === 0xff) {
+    return sign | 0x7c00 | (mantissa ? 0x200 : 0);
+  }
+  if (exponent >= 0x1f) return sign | 0x7c00;
+  if (exponent <= 0) {
+    if (exponent < -10) return sign;
+    mantissa |= 0x800000;
+    const shift = 14 - exponent;
+    let half = mantissa >>> shift;
+    const remainder = mantissa & ((1 << shift) - 1);
+    const halfway = 1 << (shift - 1);
+    if (remainder > halfway || (remainder === halfway && half & 1)) half += 1;
+    return sign | half;
+  }
+  let half = (exponent << 10) | (mantissa >>> 13);
+  const remainder = mantissa & 0x1fff;
+  if (remainder > 0x1000 || (remainder === 0x1000 && half & 1)) half += 1;
+  return sign | half;
+};
+
+export const fromFloat16Bits = (bits) => {
+  const sign = bits & 0x8000 ? -1 : 1;
+  const exponent = (bits >>> 10) & 0x1f;
+  const fraction = bits & 0x3ff;
+  if (exponent === 0) return sign * fraction * 2 ** -24;
+  if (exponent === 0x1f) return fraction ? NaN : sign * Infinity;
+  return sign * (1 + fraction / 1024) * 2 ** (exponent - 15);
+};
+
+const landmarkValues = (landmarks) => {
+  const values = new Float32Array(NUM_LANDMARKS * NUM_CHANNELS);
+  for (let i = 0; i < NUM_LANDMARKS; i++) {
+    const landmark = landmarks[i];
+    if (!landmark) continue;
+    values[i * NUM_CHANNELS] = landmark.x;
+    values[i * NUM_CHANNELS + 1] = landmark.y;
+    values[i * NUM_CHANNELS + 2] = landmark.z;
+    values[i * NUM_CHANNELS + 3] = landmark.visibility ?? 0;
+  }
+  return values;
+};
+
+// Encode an array of MediaPipe pose results (each an array of 33 landmarks)
+// into an ArrayBuffer for POST /api/auth/workout/session.
+export const encodeLandmarkSession = (
+  frames,
+  { fps = 30, float16 = true, delta = true } = {}
+) => {
+  const valuesPerFrame = NUM_LANDMARKS * NUM_CHANNELS;
+  const itemSize = float16 ? 2 : 4;
+  const buffer = new ArrayBuffer(
+    HEADER_SIZE + frames.length * valuesPerFrame * itemSize
+  );
+  const view = new DataView(buffer);
+
+  for (let i = 0; i < SESSION_MAGIC.length; i++) {
+    view.setUint8(i, SESSION_MAGIC.charCodeAt(i));
+  }
+  view.setUint8(4, SESSION_VERSION);
+  view.setUint8(5, (float16 ? FLAG_FLOAT16 : 0) | (delta ? FLAG_DELTA : 0));
+  view.setUint8(6, NUM_LANDMARKS);
+  view.setUint8(7, NUM_CHANNELS);
+  view.setUint32(8, frames.length, true);
+  view.setFloat32(12, fps, true);
+
+  // Deltas are taken against the values the server will reconstruct, so
+  // float16 rounding does not accumulate over a long session.
+  const previous = new Float32Array(valuesPerFrame);
+  let offset = HEADER_SIZE;
+  frames.forEach((landmarks, frameIndex) => {
+    const values = landmarkValues(landmarks);
+    for (let i = 0; i < valuesPerFrame; i++) {
+      const target =
+        delta && frameIndex > 0 ? Math.fround(values[i] - previous[i]) : values[i];
+      let stored = target;
+      if (float16) {
+        const bits = toFloat16Bits(target);
+        view.setUint16(offset, bits, true);
+        stored = fromFloat16Bits(bits);
+      } else {
+        view.setFloat32(offset, target, true);
+      }
+      previous[i] =
+        delta && frameIndex > 0 ? Math.fround(previous[i] + stored) : Math.fround(stored);
+      offset += itemSize;
+    }
+  });
+  return buffer;
+};